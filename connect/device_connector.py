@@ -1,39 +1,81 @@
 # connect/device_connector.py
 
+import io
 import logging
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
+import paramiko
 from netmiko import ConnectHandler
 from netmiko.exceptions import NetMikoTimeoutException, NetMikoAuthenticationException
+from connect.exceptions import ConnectionError, TimeoutError, CommandError
+from connect.jump_host import get_jump_host
+from connect.reachability import classify_exception
+from utils.settings import COMMAND_BATCH_SETTINGS
 
 
 class DeviceConnector:
     def __init__(self, device_info: Dict[str, Any]):
         self.device_info = device_info
         self.connection = None
+        self.tunnel = None
         self.logger = logging.getLogger('connect.device_connector')
         self.max_retries = 3
         self.retry_interval = 5
 
     def connect(self) -> None:
-        """Create a connection to the device"""
+        """Create a connection to the device
+
+        Authentication failures and hosts that refuse or cannot route the
+        connection fail immediately; only timeouts and unexpected errors are
+        retried. Devices with a 'jump_host' are reached over a channel of the
+        bastion's shared transport.
+        """
+        last_error = None
         for attempt in range(self.max_retries):
             try:
-                self.connection = ConnectHandler(**self.device_info)
+                self.connection = self._open_connection()
                 return
-            except NetMikoTimeoutException:
+            except NetMikoTimeoutException as e:
                 self.logger.error(f"Connection timeout to {self.device_info['host']}")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_interval)
-            except NetMikoAuthenticationException:
+                last_error = classify_exception(e, self.device_info['host'])
+            except NetMikoAuthenticationException as e:
                 self.logger.error(f"Authentication failed for {self.device_info['host']}")
-                raise
+                raise classify_exception(e, self.device_info['host'])
             except Exception as e:
                 self.logger.error(f"Failed to connect to {self.device_info['host']}: {str(e)}")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_interval)
+                last_error = classify_exception(e, self.device_info['host'])
+                if last_error.details.get('kind') in ('refused', 'unreachable', 'auth'):
+                    raise last_error
+            if attempt < self.max_retries - 1:
+                time.sleep(self.retry_interval)
+
+        if isinstance(last_error, TimeoutError):
+            raise last_error
+        raise ConnectionError(
+            f"Failed to connect to {self.device_info['host']} after {self.max_retries} attempts",
+            last_error.details if last_error else None
+        )
+
+    def _open_connection(self):
+        # jump_host is not a netmiko argument; the channel through it is passed as the socket
+        params = {key: value for key, value in self.device_info.items() if key != 'jump_host'}
+        jump_host = self.device_info.get('jump_host')
+        if not jump_host:
+            return ConnectHandler(**params)
+        bastion = get_jump_host(jump_host)
+        self.tunnel = (bastion, bastion.open_channel(params['host'], params.get('port', 22),
+                                                     timeout=params.get('conn_timeout', 10)))
+        try:
+            return ConnectHandler(**params, sock=self.tunnel[1])
+        except Exception:
+            self._close_tunnel()
+            raise
 
-        raise ConnectionError(f"Failed to connect to {self.device_info['host']} after {self.max_retries} attempts")
+    def _close_tunnel(self) -> None:
+        if self.tunnel:
+            bastion, channel = self.tunnel
+            self.tunnel = None
+            bastion.close_channel(channel)
 
     def disconnect(self) -> None:
         """Disconnect from the device"""
@@ -44,6 +86,7 @@ class DeviceConnector:
                 self.logger.error(f"Error disconnecting from {self.device_info['host']}: {str(e)}")
             finally:
                 self.connection = None
+        self._close_tunnel()
 
     def send_command(self, command: str, expect_string: Optional[str] = None) -> str:
         """Send a command to the device and return the output"""
@@ -70,6 +113,155 @@ class DeviceConnector:
         except Exception as e:
             raise Exception(f"{str(e)}")
 
+    def send_commands(self, commands: List[str], read_timeout: float = 120.0) -> Dict[str, str]:
+        """Send several read-only commands with one write per batch
+
+        The commands are written to the channel together and the combined
+        output is split on prompt boundaries, so a batch costs one round trip
+        instead of one per command. Every segment must start with the echo of
+        its command; otherwise the batch is re-run one command at a time.
+        Commands matching COMMAND_BATCH_SETTINGS['exclude'] (large outputs),
+        or all commands when batching is disabled, are sent on their own.
+
+        Args:
+            commands: read-only commands that do not change the prompt
+            read_timeout: seconds to wait for all prompts of a batch
+
+        Returns:
+            dict of command -> output, in the order the commands were given
+        """
+        if not self.connection:
+            raise ConnectionError("Not connected to device")
+
+        outputs = {command: None for command in commands}
+        batch = []
+        for command in commands:
+            if self._is_batchable(command):
+                batch.append(command)
+                if len(batch) == COMMAND_BATCH_SETTINGS['max_batch_size']:
+                    outputs.update(self._send_batch_or_singly(batch, read_timeout))
+                    batch = []
+            else:
+                outputs[command] = self.send_command(command)
+        if batch:
+            outputs.update(self._send_batch_or_singly(batch, read_timeout))
+        return outputs
+
+    @staticmethod
+    def _is_batchable(command: str) -> bool:
+        if not COMMAND_BATCH_SETTINGS['enabled']:
+            return False
+        return not any(command.startswith(prefix) for prefix in COMMAND_BATCH_SETTINGS['exclude'])
+
+    def _send_batch_or_singly(self, batch: List[str], read_timeout: float) -> Dict[str, str]:
+        if len(batch) == 1:
+            return {batch[0]: self.send_command(batch[0])}
+        try:
+            return self._send_batch(batch, read_timeout)
+        except (CommandError, TimeoutError) as e:
+            self.logger.error(f"Batch on {self.device_info['host']} could not be split, "
+                              f"sending commands one by one: {str(e)}")
+            if isinstance(e, TimeoutError):
+                # the typed-ahead commands are still producing output
+                self._drain_channel(read_timeout)
+            return {command: self.send_command(command) for command in batch}
+
+    def _drain_channel(self, read_timeout: float, quiet: float = 2.0) -> None:
+        """Read and discard channel output until it has been quiet for `quiet` seconds"""
+        deadline = time.time() + read_timeout
+        last_data = time.time()
+        while time.time() < deadline and time.time() - last_data < quiet:
+            if self.connection.read_channel():
+                last_data = time.time()
+            else:
+                time.sleep(0.1)
+        self.connection.clear_buffer()
+
+    def _send_batch(self, batch: List[str], read_timeout: float) -> Dict[str, str]:
+        prompt = self.connection.find_prompt()
+        self.connection.clear_buffer()
+        newline = self.connection.RETURN
+        self.connection.write_channel(newline.join(batch) + newline)
+
+        buffer = ""
+        # prompts found so far and the offset after the last one, so each chunk is scanned once
+        found, scanned = 0, 0
+        deadline = time.time() + read_timeout
+        while found < len(batch):
+            if time.time() > deadline:
+                raise TimeoutError(
+                    f"Timed out waiting for {len(batch)} prompts from {self.device_info['host']}",
+                    {'host': self.device_info['host'], 'commands': batch}
+                )
+            chunk = self.connection.read_channel()
+            if not chunk:
+                time.sleep(0.05)
+                continue
+            buffer += chunk
+            index = buffer.find(prompt, scanned)
+            while index != -1:
+                found += 1
+                scanned = index + len(prompt)
+                index = buffer.find(prompt, scanned)
+
+        buffer = self.connection.normalize_linefeeds(buffer)
+        segments = buffer.split(prompt)[:len(batch)]
+        outputs = {}
+        for command, segment in zip(batch, segments):
+            echo, _, output = segment.lstrip("\n").partition("\n")
+            if echo.strip() != command.strip():
+                raise CommandError(
+                    "Output segment does not start with its command",
+                    {'command': command, 'echo': echo[:100]}
+                )
+            outputs[command] = output.rstrip()
+        return outputs
+
+    def send_confirmed(self, command: str, confirm: str = 'y', read_timeout: float = 120.0) -> str:
+        """Send a command that may ask for a [Y/N] confirmation and answer it"""
+        if not self.connection:
+            raise ConnectionError("Not connected to device")
+        output = self.connection.send_command_timing(command, read_timeout=read_timeout)
+        if '[y/n]' in output.lower():
+            output += self.connection.send_command_timing(confirm, read_timeout=read_timeout)
+        return output
+
+    def download_file(self, remote_path: str, protocol: str = 'sftp') -> bytes:
+        """Download a file from the device over the already authenticated SSH transport
+
+        Args:
+            remote_path: file path on the device, relative to the SFTP/SCP root
+            protocol: 'sftp' or 'scp'
+
+        Returns:
+            file content
+        """
+        if not self.connection:
+            raise ConnectionError("Not connected to device")
+
+        transport = self.connection.remote_conn_pre.get_transport()
+        try:
+            if protocol == 'sftp':
+                sftp = paramiko.SFTPClient.from_transport(transport)
+                try:
+                    with sftp.open(remote_path, 'rb') as f:
+                        f.prefetch()
+                        return f.read()
+                finally:
+                    sftp.close()
+            elif protocol == 'scp':
+                from scp import SCPClient
+                buffer = io.BytesIO()
+                with SCPClient(transport) as scp:
+                    scp.getfo(remote_path, buffer)
+                return buffer.getvalue()
+            raise ValueError(f"Unsupported transfer protocol: {protocol}")
+        except Exception as e:
+            raise CommandError(
+                f"Downloading {remote_path} from {self.device_info['host']} failed: {str(e)}",
+                {'host': self.device_info['host'], 'path': remote_path, 'protocol': protocol}
+            )
+
     def check_connection(self) -> bool:
         """check if the connection is still active"""
         if not self.connection:
@@ -0,0 +1,206 @@
+# connect/jump_host.py
+
+import os
+import atexit
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import paramiko
+
+from connect.exceptions import ConnectionError
+from utils.settings import JUMP_HOST_SETTINGS
+
+
+class _Transport:
+    """One SSH connection to the bastion; client stays None until the connecting thread is done"""
+
+    def __init__(self):
+        self.client: Optional[paramiko.SSHClient] = None
+        self.channels = 1
+        self.ready = threading.Event()
+        self.error: Optional[Exception] = None
+
+    @property
+    def usable(self) -> bool:
+        if not self.ready.is_set():
+            return True
+        transport = self.client.get_transport() if self.client else None
+        return bool(transport and transport.is_active())
+
+
+class JumpHost:
+    """
+    A bastion shared by every device session behind it.
+
+    Device sessions are direct-tcpip channels multiplexed over a few SSH
+    transports to the bastion, up to channels_per_transport each, instead of
+    one bastion login per device. At most max_sessions channels are open at
+    once; further sessions wait for a free slot.
+
+    The bastion's host key must be in known_hosts (JUMP_HOST_SETTINGS) unless
+    trust_unknown_host_key is set, in which case an unknown key is recorded
+    there on first use and checked from then on.
+    """
+
+    def __init__(self, name: str, host: str, username: str, password: str, port: int = 22,
+                 max_sessions: Optional[int] = None, trust_unknown_host_key: bool = False):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_sessions = max_sessions or JUMP_HOST_SETTINGS['max_sessions']
+        self.trust_unknown_host_key = trust_unknown_host_key
+        self.logger = logging.getLogger('connect.jump_host')
+        self._transports: List[_Transport] = []
+        self._owners: Dict[paramiko.Channel, _Transport] = {}
+        self._slots = threading.BoundedSemaphore(self.max_sessions)
+        self._lock = threading.Lock()
+
+    def open_channel(self, host: str, port: int = 22, timeout: Optional[float] = None) -> paramiko.Channel:
+        """Open a channel to host:port through the bastion, to be used as the sock of a device session"""
+        if not self._slots.acquire(timeout=JUMP_HOST_SETTINGS['acquire_timeout']):
+            raise ConnectionError(
+                f"No free session on jump host {self.name} for {host}",
+                {'host': host, 'jump_host': self.name, 'kind': 'timeout'}
+            )
+        entry = None
+        try:
+            entry = self._reserve()
+            channel = entry.client.get_transport().open_channel(
+                'direct-tcpip', (host, port), ('127.0.0.1', 0), timeout=timeout
+            )
+        except paramiko.ChannelException as e:
+            self._unreserve(entry)
+            raise ConnectionError(
+                f"{host}:{port} is unreachable through jump host {self.name}",
+                {'host': host, 'jump_host': self.name, 'kind': 'unreachable', 'error': str(e)}
+            )
+        except Exception:
+            self._unreserve(entry)
+            raise
+        with self._lock:
+            self._owners[channel] = entry
+        return channel
+
+    def close_channel(self, channel: paramiko.Channel) -> None:
+        try:
+            channel.close()
+        finally:
+            with self._lock:
+                entry = self._owners.pop(channel, None)
+                if entry:
+                    entry.channels -= 1
+            if entry:
+                self._slots.release()
+
+    def close(self) -> None:
+        """Close every transport to the bastion"""
+        with self._lock:
+            transports, self._transports = self._transports, []
+        for entry in transports:
+            if entry.client:
+                entry.client.close()
+
+    def _reserve(self) -> _Transport:
+        """
+        Pick a live transport with room for one more channel, connecting a new one if needed.
+
+        The connection is made outside the lock; sessions that pick a transport
+        still connecting wait for it, the others are not held up.
+        """
+        connecting = False
+        with self._lock:
+            self._transports = [entry for entry in self._transports if entry.usable]
+            for entry in self._transports:
+                if entry.channels < JUMP_HOST_SETTINGS['channels_per_transport']:
+                    entry.channels += 1
+                    break
+            else:
+                entry = _Transport()
+                self._transports.append(entry)
+                connecting = True
+
+        if connecting:
+            try:
+                entry.client = self._connect()
+            except Exception as e:
+                entry.error = e
+                raise
+            finally:
+                entry.ready.set()
+            return entry
+
+        entry.ready.wait()
+        if entry.error:
+            raise ConnectionError(
+                f"Connecting to jump host {self.name} failed: {str(entry.error)}",
+                {'host': self.host, 'jump_host': self.name, 'error': str(entry.error)}
+            )
+        return entry
+
+    def _unreserve(self, entry: Optional[_Transport]) -> None:
+        if entry:
+            with self._lock:
+                entry.channels -= 1
+        self._slots.release()
+
+    def _connect(self) -> paramiko.SSHClient:
+        client = paramiko.SSHClient()
+        client.load_system_host_keys()
+        known_hosts = os.path.expanduser(JUMP_HOST_SETTINGS['known_hosts'])
+        if self.trust_unknown_host_key:
+            # trust on first use: AutoAddPolicy saves the key to the loaded known_hosts file
+            os.makedirs(os.path.dirname(known_hosts), exist_ok=True)
+            open(known_hosts, 'a').close()
+            client.load_host_keys(known_hosts)
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        else:
+            if os.path.exists(known_hosts):
+                client.load_host_keys(known_hosts)
+            client.set_missing_host_key_policy(paramiko.RejectPolicy())
+        try:
+            client.connect(self.host, port=self.port, username=self.username, password=self.password,
+                           timeout=JUMP_HOST_SETTINGS['connect_timeout'], allow_agent=False, look_for_keys=False)
+        except Exception:
+            client.close()
+            raise
+        client.get_transport().set_keepalive(JUMP_HOST_SETTINGS['keepalive'])
+        self.logger.info(f"Connected to jump host {self.name} ({self.host}:{self.port}), "
+                         f"{len(self._transports)} transports")
+        return client
+
+
+_jump_hosts: Dict[Tuple[str, str, int, str], JumpHost] = {}
+_registry_lock = threading.Lock()
+
+
+def get_jump_host(config: Dict[str, Any]) -> JumpHost:
+    """
+    Return the process-wide JumpHost for a bastion.
+
+    Args:
+        config: the 'jump_host' entry of ConfigLoader.get_device_info
+    """
+    key = (config['name'], config['host'], config.get('port', 22), config['username'])
+    with _registry_lock:
+        jump_host = _jump_hosts.get(key)
+        if jump_host is None:
+            jump_host = JumpHost(config['name'], config['host'], config['username'], config['password'],
+                                 port=config.get('port', 22), max_sessions=config.get('max_sessions'),
+                                 trust_unknown_host_key=bool(config.get('trust_unknown_host_key')))
+            _jump_hosts[key] = jump_host
+        return jump_host
+
+
+def close_jump_hosts() -> None:
+    """Close the connections of every bastion (registered to run at interpreter exit)"""
+    with _registry_lock:
+        jump_hosts = list(_jump_hosts.values())
+        _jump_hosts.clear()
+    for jump_host in jump_hosts:
+        jump_host.close()
+
+
+atexit.register(close_jump_hosts)
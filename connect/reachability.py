@@ -0,0 +1,159 @@
+# connect/reachability.py
+
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+from connect.exceptions import (
+    NetworkAutomationError,
+    ConnectionError,
+    AuthenticationError,
+    TimeoutError,
+)
+from utils.settings import BASE_DIR, REACHABILITY_SETTINGS
+from utils.logger import get_logger
+
+BREAKER_STATE_FILE = os.path.join(BASE_DIR, 'output', 'state', 'circuit_breaker.json')
+
+
+def classify_exception(exc: Exception, host: str = '') -> NetworkAutomationError:
+    """
+    Map a Netmiko/Paramiko/socket exception onto the project's exception classes.
+
+    The returned exception keeps the original error text and records the
+    failure kind in details['kind'] ('auth', 'timeout', 'refused', 'unreachable'
+    or 'error').
+    """
+    if isinstance(exc, NetworkAutomationError):
+        return exc
+
+    name = type(exc).__name__.lower()
+    text = str(exc)
+    details = {'host': host, 'error': text}
+
+    if 'authentication' in name or 'authentication' in text.lower():
+        details['kind'] = 'auth'
+        return AuthenticationError(f"Authentication failed for {host}", details)
+    if isinstance(exc, ConnectionRefusedError):
+        details['kind'] = 'refused'
+        return ConnectionError(f"Connection refused by {host}", details)
+    if isinstance(exc, (socket.timeout, asyncio.TimeoutError)) or 'timeout' in name or 'timed out' in text.lower():
+        details['kind'] = 'timeout'
+        return TimeoutError(f"Connection to {host} timed out", details)
+    if isinstance(exc, OSError):
+        details['kind'] = 'unreachable'
+        return ConnectionError(f"{host} is unreachable", details)
+    details['kind'] = 'error'
+    return ConnectionError(f"Failed to connect to {host}", details)
+
+
+async def probe_host(host: str, port: int = 22, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Open and close a TCP connection to host:port, returning reachability and latency"""
+    timeout = timeout or REACHABILITY_SETTINGS['probe_timeout']
+    start_time = time.time()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=timeout)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
+        return {'host': host, 'reachable': True, 'latency': round(time.time() - start_time, 3), 'error': None}
+    except Exception as e:
+        return {
+            'host': host,
+            'reachable': False,
+            'latency': round(time.time() - start_time, 3),
+            'error': classify_exception(e, host),
+        }
+
+
+async def probe_hosts(hosts: Iterable[str], port: int = 22, timeout: Optional[float] = None,
+                      concurrency: Optional[int] = None,
+                      targets: Optional[Dict[str, Tuple[str, int]]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Probe many hosts at once.
+
+    Args:
+        hosts: host addresses
+        port: TCP port to probe (SSH by default)
+        timeout: seconds to wait for each connection
+        concurrency: maximum probes in flight, bounded to stay under the fd limit
+        targets: host -> (address, port) to probe instead of host:port, e.g. the
+            bastion of a device behind a jump host. Each address is probed once.
+
+    Returns:
+        dict of host -> probe result
+    """
+    semaphore = asyncio.Semaphore(concurrency or REACHABILITY_SETTINGS['probe_concurrency'])
+    targets = targets or {}
+    hosts = list(hosts)
+
+    async def _probe(address: str, target_port: int) -> Dict[str, Any]:
+        async with semaphore:
+            return await probe_host(address, target_port, timeout)
+
+    unique = list(dict.fromkeys(targets.get(host, (host, port)) for host in hosts))
+    results = dict(zip(unique, await asyncio.gather(*[_probe(*target) for target in unique])))
+    return {host: {**results[targets.get(host, (host, port))], 'host': host} for host in hosts}
+
+
+class CircuitBreaker:
+    """
+    Remember hosts that recently failed to connect, across runs.
+
+    After `threshold` consecutive connection failures the circuit for a host
+    opens and the host is skipped until `cooldown` seconds have passed. The
+    next attempt after the cooldown decides whether the circuit closes again.
+    Authentication failures are not counted: the host is reachable.
+    """
+
+    def __init__(self, state_file: str = BREAKER_STATE_FILE,
+                 threshold: Optional[int] = None, cooldown: Optional[int] = None):
+        self.state_file = state_file
+        self.threshold = threshold or REACHABILITY_SETTINGS['breaker_threshold']
+        self.cooldown = cooldown or REACHABILITY_SETTINGS['breaker_cooldown']
+        self.logger = get_logger('connect.circuit_breaker')
+        self._lock = threading.Lock()
+        self.state: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        tmp_file = f"{self.state_file}.tmp"
+        with self._lock:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(tmp_file, self.state_file)
+
+    def is_open(self, host: str) -> bool:
+        entry = self.state.get(host)
+        if not entry or entry['failures'] < self.threshold:
+            return False
+        return time.time() - entry['last_failure'] < self.cooldown
+
+    def record_failure(self, host: str, kind: str = 'error') -> None:
+        """Count a failed connection; kind is the details['kind'] set by classify_exception"""
+        if kind == 'auth':
+            return
+        with self._lock:
+            entry = self.state.setdefault(host, {'failures': 0, 'last_failure': 0, 'kind': kind})
+            entry['failures'] += 1
+            entry['last_failure'] = time.time()
+            entry['kind'] = kind
+        if self.is_open(host):
+            self.logger.info(f"Circuit opened for {host} after {entry['failures']} failures ({kind})")
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            self.state.pop(host, None)
@@ -0,0 +1,71 @@
+# connect/session_pool.py
+
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+from connect.device_connector import DeviceConnector
+
+
+class SessionPool:
+    """
+    SSH sessions kept open between jobs of a long-running process.
+
+    At most one idle session is kept per device. A session is handed out
+    again only if it is younger than idle_timeout, was opened with the same
+    parameters and still answers; otherwise a new one is opened.
+    """
+
+    def __init__(self, idle_timeout: float = 300):
+        self.idle_timeout = idle_timeout
+        self.logger = logging.getLogger('connect.session_pool')
+        self._idle: Dict[str, Tuple[DeviceConnector, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, device_info: Dict[str, Any]) -> DeviceConnector:
+        """Borrow a connected session to the device, opening one if none is idle"""
+        with self._lock:
+            entry = self._idle.pop(device_info['host'], None)
+        if entry:
+            connector, idle_since = entry
+            if (time.time() - idle_since < self.idle_timeout and connector.device_info == device_info
+                    and connector.connection and connector.connection.is_alive()):
+                self.logger.info(f"Reusing idle session to {device_info['host']}")
+                return connector
+            connector.disconnect()
+        connector = DeviceConnector(device_info)
+        connector.connect()
+        return connector
+
+    def release(self, connector: DeviceConnector, reusable: bool = True) -> None:
+        """Return a borrowed session; sessions that are not reusable are closed"""
+        if not reusable or not connector.connection:
+            connector.disconnect()
+            return
+        with self._lock:
+            previous = self._idle.pop(connector.device_info['host'], None)
+            self._idle[connector.device_info['host']] = (connector, time.time())
+        if previous:
+            previous[0].disconnect()
+
+    def prune(self) -> int:
+        """Close sessions idle for longer than idle_timeout; returns how many were closed"""
+        now = time.time()
+        with self._lock:
+            expired = [host for host, (_, idle_since) in self._idle.items() if now - idle_since >= self.idle_timeout]
+            connectors = [self._idle.pop(host)[0] for host in expired]
+        for connector in connectors:
+            connector.disconnect()
+        return len(connectors)
+
+    def close(self, host: Optional[str] = None) -> None:
+        """Close the idle session to one device, or all of them"""
+        with self._lock:
+            hosts = [host] if host else list(self._idle)
+            connectors = [self._idle.pop(h)[0] for h in hosts if h in self._idle]
+        for connector in connectors:
+            connector.disconnect()
+
+    def __len__(self) -> int:
+        return len(self._idle)
@@ -0,0 +1,206 @@
+# inspection/huawei/config_tree.py
+
+import sys
+import json
+import hashlib
+import argparse
+from typing import Dict, Any, List, Tuple, Optional
+
+CONFIG_COMMAND_PREFIX = 'display current-configuration'
+
+# lines that carry no configuration (separators, comments, end marker)
+_IGNORED_PREFIXES = ('#', '!', 'return')
+
+
+class ConfigNode:
+    """
+    One line of a Huawei configuration and the lines nested under it.
+
+    Every node carries a digest of its own line and its children's digests in
+    order (a Merkle hash), so two subtrees with equal digests are identical
+    and can be skipped without being walked.
+    """
+
+    __slots__ = ('line', 'children', 'digest')
+
+    def __init__(self, line: str):
+        self.line = line
+        self.children: List['ConfigNode'] = []
+        self.digest = b''
+
+    def seal(self) -> bytes:
+        sha = hashlib.sha1(self.line.encode('utf-8'))
+        for child in self.children:
+            sha.update(child.seal())
+        self.digest = sha.digest()
+        return self.digest
+
+    def render(self, indent: int = 0) -> List[str]:
+        lines = [' ' * indent + self.line] if self.line else []
+        for child in self.children:
+            lines.extend(child.render(indent + 1 if self.line else 0))
+        return lines
+
+    def find(self, *path: str) -> Optional['ConfigNode']:
+        node = self
+        for line in path:
+            node = next((child for child in node.children if child.line == line), None)
+            if node is None:
+                return None
+        return node
+
+
+def parse_configuration(text: str) -> ConfigNode:
+    """
+    Parse "display current-configuration" output into a block tree.
+
+    Nesting follows indentation: "interface X", "security-policy" and
+    "nat-policy" become blocks, and each "rule name Y" becomes a block under
+    its policy.
+    """
+    root = ConfigNode('')
+    stack: List[Tuple[int, ConfigNode]] = [(-1, root)]
+    for raw in text.splitlines():
+        stripped = raw.strip()
+        if not stripped or stripped.startswith(_IGNORED_PREFIXES):
+            continue
+        indent = len(raw) - len(raw.lstrip(' '))
+        while stack[-1][0] >= indent:
+            stack.pop()
+        node = ConfigNode(stripped)
+        stack[-1][1].children.append(node)
+        stack.append((indent, node))
+    root.seal()
+    return root
+
+
+def diff_trees(old: ConfigNode, new: ConfigNode, path: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+    """
+    Structural diff of two configuration trees.
+
+    Returns:
+        list of changes, each a dict with 'type' ('added', 'removed' or
+        'modified') and 'path' (block lines from the root). Added/removed blocks
+        carry their 'lines'; a modified block lists the 'added' and 'removed'
+        lines directly under it and whether its sub-blocks were 'reordered'
+        (significant for security-policy and nat-policy rules).
+    """
+    if old.digest == new.digest:
+        return []
+
+    changes = []
+    old_children = _keyed(old.children)
+    new_children = _keyed(new.children)
+    added_lines, removed_lines = [], []
+
+    for key, node in new_children.items():
+        previous = old_children.get(key)
+        if previous is None:
+            if node.children:
+                changes.append({'type': 'added', 'path': list(path + (node.line,)), 'lines': node.render()})
+            else:
+                added_lines.append(node.line)
+        elif previous.digest != node.digest:
+            changes.extend(diff_trees(previous, node, path + (node.line,)))
+
+    for key, node in old_children.items():
+        if key not in new_children:
+            if node.children:
+                changes.append({'type': 'removed', 'path': list(path + (node.line,)), 'lines': node.render()})
+            else:
+                removed_lines.append(node.line)
+
+    common_old = [key for key, node in old_children.items() if key in new_children and node.children]
+    common_new = [key for key, node in new_children.items() if key in old_children and node.children]
+    reordered = common_old != common_new
+
+    if added_lines or removed_lines or reordered:
+        changes.insert(0, {
+            'type': 'modified',
+            'path': list(path),
+            'added': added_lines,
+            'removed': removed_lines,
+            'reordered': reordered,
+        })
+    return changes
+
+
+def diff_configurations(old_text: str, new_text: str) -> List[Dict[str, Any]]:
+    return diff_trees(parse_configuration(old_text), parse_configuration(new_text))
+
+
+def format_diff(changes: List[Dict[str, Any]]) -> str:
+    """Render changes as a compact text report (also used as incremental AI input)"""
+    if not changes:
+        return "No configuration changes."
+    lines = []
+    for change in changes:
+        where = ' > '.join(change['path']) or '(global)'
+        if change['type'] in ('added', 'removed'):
+            sign = '+' if change['type'] == 'added' else '-'
+            lines.append(f"[{change['type'].upper()}] {where}")
+            lines.extend(f"  {sign} {line}" for line in change['lines'])
+        else:
+            lines.append(f"[MODIFIED] {where}" + (" (sub-block order changed)" if change['reordered'] else ""))
+            lines.extend(f"  - {line}" for line in change['removed'])
+            lines.extend(f"  + {line}" for line in change['added'])
+    return "\n".join(lines)
+
+
+def diff_against_file(old_path: str, new_text: str) -> Tuple[List[Dict[str, Any]], str]:
+    """Diff new_text against a collected file; returns the changes and their rendering"""
+    changes = diff_configurations(load_configuration(old_path), new_text)
+    return changes, format_diff(changes)
+
+
+def load_configuration(path: str) -> str:
+    """
+    Extract the current configuration from a collected file.
+
+    Accepts a snapshot JSON (output/snapshots), a raw config file
+    (output/raw_configs) or a plain configuration text file.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    if path.endswith('.json'):
+        data = json.loads(text)
+        for commands in data.values():
+            for cmd, entry in commands.items():
+                if cmd.startswith(CONFIG_COMMAND_PREFIX):
+                    return entry['output']
+        raise ValueError(f"No {CONFIG_COMMAND_PREFIX} output in {path}")
+
+    marker = f"{'-' * 10} {CONFIG_COMMAND_PREFIX}"
+    start = text.find(marker)
+    if start < 0:
+        return text
+    body_start = text.find("Output:\n", start)
+    if body_start < 0:
+        raise ValueError(f"Malformed raw config file: {path}")
+    body_start += len("Output:\n")
+    ends = [pos for pos in (text.find(f"\n{'-' * 10} ", body_start), text.find(f"\n{'=' * 20} ", body_start)) if pos >= 0]
+    return text[body_start:min(ends)] if ends else text[body_start:]
+
+
+def _keyed(children: List[ConfigNode]) -> Dict[Tuple[str, int], ConfigNode]:
+    """Key children by line, numbering repeated lines so duplicates still pair up"""
+    keyed = {}
+    seen: Dict[str, int] = {}
+    for child in children:
+        n = seen.get(child.line, 0)
+        seen[child.line] = n + 1
+        keyed[(child.line, n)] = child
+    return keyed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Structural diff of two Huawei configurations")
+    parser.add_argument('old', help="older snapshot JSON, raw config or configuration text")
+    parser.add_argument('new', help="newer snapshot JSON, raw config or configuration text")
+    parser.add_argument('--json', action='store_true', help="print the changes as JSON")
+    args = parser.parse_args()
+
+    result = diff_configurations(load_configuration(args.old), load_configuration(args.new))
+    print(json.dumps(result, indent=2, ensure_ascii=False) if args.json else format_diff(result))
+    sys.exit(0)
@@ -0,0 +1,211 @@
+# inspection/huawei/fleet_coordinator.py
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from connect.reachability import CircuitBreaker
+from inspection.huawei.usg12004_inspection import inspect_device_async, preflight_check, skip_device_async
+from utils.config_loader import ConfigLoader
+from utils.job_queue import JobQueue, get_job_queue
+from utils.logger import get_logger
+from utils.report_renderer import ReportRenderer
+from utils.run_journal import RunJournal
+from utils.settings import BASE_DIR as project_root
+from utils.settings import WORKER_SETTINGS, REPORT_SETTINGS
+from utils.tracing import span
+
+
+async def run_worker(queue: JobQueue, run_id: str, shard: int = 0, concurrency: Optional[int] = None,
+                     worker_id: Optional[str] = None) -> int:
+    """
+    Inspect devices from the queue until the run has no outstanding jobs.
+
+    At most `concurrency` devices are in flight. Leases of running jobs are
+    renewed while they run, so only jobs of a worker that died are stolen.
+
+    Returns:
+        number of jobs this worker finished
+    """
+    logger = get_logger('fleet_worker')
+    concurrency = concurrency or WORKER_SETTINGS['concurrency']
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    poll_interval = WORKER_SETTINGS['poll_interval']
+    renew_interval = WORKER_SETTINGS['lease_seconds'] / 3
+    journals: Dict[str, RunJournal] = {}
+    in_flight: Dict[asyncio.Task, int] = {}
+    finished = 0
+    last_renew = time.time()
+
+    async def inspect(job_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+        journal_path = payload.get('journal')
+        if journal_path and journal_path not in journals:
+            journals[journal_path] = RunJournal(journal_path)
+        return await inspect_device_async(payload['device'], journals.get(journal_path))
+
+    logger.info(f"Worker {worker_id} started on run {run_id}, shard {shard}, concurrency {concurrency}",
+                extra={'print_console': True})
+    while True:
+        for job_id, payload in queue.claim(run_id, worker_id, shard, concurrency - len(in_flight)):
+            in_flight[asyncio.create_task(inspect(job_id, payload))] = job_id
+
+        if not in_flight:
+            if queue.outstanding(run_id) == 0:
+                break
+            # the remaining jobs are leased by other workers; wait in case a lease expires
+            await asyncio.sleep(poll_interval)
+            continue
+
+        done, _ = await asyncio.wait(in_flight, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            job_id = in_flight.pop(task)
+            try:
+                result = task.result()
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {str(e)}")
+                queue.fail(job_id, worker_id, str(e))
+            else:
+                # transient failures go back to the queue until the job has used up its attempts
+                if result['status'] == 'failed' and result.get('error_kind') in WORKER_SETTINGS['retry_kinds']:
+                    logger.warning(f"Job {job_id} failed ({result['error_kind']}), retried while attempts remain: "
+                                   f"{result.get('error')}")
+                    queue.fail(job_id, worker_id, result.get('error') or '', result)
+                else:
+                    queue.complete(job_id, worker_id, result)
+            finished += 1
+
+        if in_flight and time.time() - last_renew >= renew_interval:
+            queue.renew(in_flight.values(), worker_id)
+            last_renew = time.time()
+
+    logger.info(f"Worker {worker_id} finished {finished} jobs", extra={'print_console': True})
+    return finished
+
+
+def start_local_workers(queue_url: str, run_id: str, workers: int, concurrency: int) -> List[subprocess.Popen]:
+    """Start worker processes on this host; other hosts run the same 'worker' command"""
+    return [
+        subprocess.Popen(
+            [sys.executable, '-m', 'inspection.huawei.fleet_coordinator', 'worker',
+             '--queue', queue_url, '--run', run_id, '--shard', str(shard), '--concurrency', str(concurrency)],
+            cwd=project_root,
+        )
+        for shard in range(workers)
+    ]
+
+
+async def coordinate_async(queue_url: Optional[str] = None, workers: Optional[int] = None,
+                           concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Shard the firewall inventory across worker processes and aggregate their results.
+
+    Unreachable devices are filtered by the pre-flight probe first. Results are
+    folded into the fleet summary as workers finish them. If every local
+    worker exits with jobs left (e.g. crashed), the coordinator finishes them
+    itself once their leases expire.
+
+    Returns:
+        one result per device, as returned by inspect_device_async
+    """
+    logger = get_logger('fleet_coordinator')
+    queue_url = queue_url or WORKER_SETTINGS['queue_url']
+    workers = workers or WORKER_SETTINGS['workers']
+    concurrency = concurrency or WORKER_SETTINGS['concurrency']
+    devices = [d for d in ConfigLoader.get_devices('firewall') or [] if d and d.get('ip')]
+
+    journal = RunJournal()
+    breaker = CircuitBreaker()
+    blocked = await preflight_check(devices, journal, breaker)
+
+    queue = get_job_queue(queue_url)
+    run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+    queued = queue.enqueue(
+        run_id,
+        ({'device': device, 'journal': journal.path} for device in devices if device['ip'] not in blocked),
+        shards=workers
+    )
+    logger.info(f"Run {run_id}: {queued} devices queued for {workers} workers ({queue_url}), "
+                f"{len(blocked)} skipped by pre-flight", extra={'print_console': True})
+
+    # device spans are traced by the workers; this trace has the aggregation and report rendering
+    with span('coordinator', run=run_id, devices=queued):
+        renderer = ReportRenderer(REPORT_SETTINGS['render_workers'])
+        results = []
+        for device_ip, error in blocked.items():
+            result = await skip_device_async(device_ip, error, journal)
+            results.append(result)
+            await renderer.add_result(result)
+
+        processes = start_local_workers(queue_url, run_id, workers, concurrency)
+        seen = set()
+        try:
+            while True:
+                for job in queue.finished(run_id):
+                    if job['id'] in seen:
+                        continue
+                    seen.add(job['id'])
+                    result = {'ip': job['payload']['device']['ip'], 'status': 'failed', **job['result'],
+                              'worker': job['worker']}
+                    results.append(result)
+                    if result['status'] == 'success':
+                        breaker.record_success(result['ip'])
+                    elif result.get('error_kind'):
+                        breaker.record_failure(result['ip'], result['error_kind'])
+                    await renderer.add_result(result)
+
+                if queue.outstanding(run_id) == 0 and len(seen) >= queued:
+                    break
+                if all(process.poll() is not None for process in processes):
+                    logger.warning("All local workers exited with jobs left, finishing them in the coordinator",
+                                   extra={'print_console': True})
+                    await run_worker(queue, run_id, concurrency=concurrency, worker_id='coordinator')
+                    processes = []
+                    continue
+                await asyncio.sleep(WORKER_SETTINGS['poll_interval'])
+        finally:
+            for process in processes:
+                process.wait()
+            renderer.close()
+            breaker.save()
+
+    success_count = sum(1 for r in results if r['status'] == 'success')
+    logger.info("=" * 50, extra={'print_console': True})
+    logger.info(f"Run {run_id} done: {len(results)} devices, {success_count} succeeded, "
+                f"{len(results) - success_count} failed", extra={'print_console': True})
+    logger.info(f"Run journal: {journal.path}", extra={'print_console': True})
+    logger.info(f"Fleet summary: {renderer.summary.markdown_path}", extra={'print_console': True})
+    for result in results:
+        if result['status'] != 'success':
+            logger.info(f"Device {result['ip']}: failed: {result.get('error')}", extra={'print_console': True})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed USG12004 fleet inspection")
+    sub = parser.add_subparsers(dest='role', required=True)
+    coordinator = sub.add_parser('coordinator', help="queue the fleet, start local workers and aggregate results")
+    coordinator.add_argument('--queue', default=None, help="job queue URL (default from WORKER_SETTINGS)")
+    coordinator.add_argument('--workers', type=int, default=None, help="local worker processes")
+    coordinator.add_argument('--concurrency', type=int, default=None, help="devices in flight per worker")
+    worker = sub.add_parser('worker', help="inspect devices of a queued run (can run on other hosts)")
+    worker.add_argument('--queue', default=None, help="job queue URL (default from WORKER_SETTINGS)")
+    worker.add_argument('--run', required=True, help="run id printed by the coordinator")
+    worker.add_argument('--shard', type=int, default=0, help="preferred shard")
+    worker.add_argument('--concurrency', type=int, default=None, help="devices in flight")
+    args = parser.parse_args()
+
+    try:
+        if args.role == 'coordinator':
+            asyncio.run(coordinate_async(args.queue, args.workers, args.concurrency))
+        else:
+            asyncio.run(run_worker(get_job_queue(args.queue), args.run, args.shard, args.concurrency))
+    except Exception as e:
+        get_logger("main").error(f"Tasks failed: {str(e)}", exc_info=True, extra={'print_console': True})
+        sys.exit(1)
+    sys.exit(0)
@@ -0,0 +1,214 @@
+# inspection/huawei/health_poller.py
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from connect.device_connector import DeviceConnector
+from connect.reachability import CircuitBreaker
+from connect.exceptions import NetworkAutomationError
+from inspection.huawei.metric_parsers import extract_metrics
+from utils.config_loader import ConfigLoader
+from utils.metrics_store import MetricsStore
+from utils.logger import get_logger
+from utils.settings import BASE_DIR as project_root
+from utils.settings import POLL_SETTINGS
+
+ALERTS_DIR = os.path.join(project_root, 'output', 'alerts')
+# separate from the inspection runs' breaker: polling fails and recovers on its own time scale
+BREAKER_STATE_FILE = os.path.join(project_root, 'output', 'state', 'poll_circuit_breaker.json')
+
+
+class HealthPoller:
+    """
+    Lightweight health polling across the fleet.
+
+    Only the "monitoring" commands of the inspection command set are run, over
+    SSH sessions that stay open between cycles. Parsed figures go to the
+    metrics store, and thresholds are evaluated locally: an alert is raised when
+    a metric crosses its threshold and cleared when it drops back.
+    """
+
+    def __init__(self, devices: List[Dict[str, Any]], device_type: str = 'firewall',
+                 interval: Optional[int] = None, commands: Optional[List[str]] = None):
+        self.devices = [d for d in devices if d and d.get('ip')]
+        self.device_type = device_type
+        self.interval = interval or POLL_SETTINGS['interval']
+        self.commands = commands or self._load_monitoring_commands()
+        self.thresholds = POLL_SETTINGS['thresholds']
+        self.logger = get_logger('health_poller')
+        self.store = MetricsStore()
+        self.breaker = CircuitBreaker(BREAKER_STATE_FILE, POLL_SETTINGS['breaker_threshold'],
+                                      POLL_SETTINGS['breaker_cooldown'])
+        self.sessions: Dict[str, DeviceConnector] = {}
+        self.alert_state: Dict[tuple, bool] = {}
+        self.executor = ThreadPoolExecutor(max_workers=POLL_SETTINGS['max_workers'])
+
+    @staticmethod
+    def _load_monitoring_commands() -> List[str]:
+        commands_file = os.path.join(project_root, 'templates', 'commands', 'usg12004_commands.json')
+        with open(commands_file, 'r', encoding='utf-8') as f:
+            return json.load(f)['monitoring']
+
+    def _session(self, device_ip: str) -> DeviceConnector:
+        connector = self.sessions.get(device_ip)
+        if connector and connector.connection:
+            return connector
+        device_info = ConfigLoader.get_device_info(device_ip, self.device_type)
+        connector = DeviceConnector({**device_info, 'timeout': POLL_SETTINGS['command_timeout']})
+        connector.max_retries = 1
+        connector.connect()
+        self.sessions[device_ip] = connector
+        return connector
+
+    def poll_device(self, device_ip: str) -> Dict[str, float]:
+        """Run the monitoring commands on one device and store the parsed metrics"""
+        timestamp = time.time()
+        try:
+            connector = self._session(device_ip)
+            outputs = connector.send_commands(self.commands)
+        except Exception as e:
+            # drop the session so the next cycle reconnects
+            connector = self.sessions.pop(device_ip, None)
+            if connector:
+                connector.disconnect()
+            kind = e.details.get('kind', 'error') if isinstance(e, NetworkAutomationError) else 'error'
+            self.breaker.record_failure(device_ip, kind)
+            raise
+
+        self.breaker.record_success(device_ip)
+        metrics = extract_metrics({'monitoring': {cmd: {'output': out} for cmd, out in outputs.items()}})
+        self.store.append_many(device_ip, metrics, timestamp)
+        return metrics
+
+    def evaluate_alerts(self, device_ip: str, metrics: Dict[str, float]) -> List[Dict[str, Any]]:
+        """Return alert transitions (raised / cleared) for the given metrics"""
+        events = []
+        for metric, threshold in self.thresholds.items():
+            if metric not in metrics:
+                continue
+            value = metrics[metric]
+            active = value >= threshold
+            key = (device_ip, metric)
+            if active != self.alert_state.get(key, False):
+                self.alert_state[key] = active
+                events.append({
+                    'time': datetime.now().isoformat(),
+                    'device': device_ip,
+                    'metric': metric,
+                    'value': value,
+                    'threshold': threshold,
+                    'state': 'raised' if active else 'cleared',
+                })
+        return events
+
+    def _emit(self, events: List[Dict[str, Any]]) -> None:
+        if not events:
+            return
+        os.makedirs(ALERTS_DIR, exist_ok=True)
+        alerts_file = os.path.join(ALERTS_DIR, f"alerts_{datetime.now().strftime('%Y%m%d')}.jsonl")
+        with open(alerts_file, 'a', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+                self.logger.warning(
+                    f"ALERT {event['state']}: {event['device']} {event['metric']}={event['value']} "
+                    f"(threshold {event['threshold']})",
+                    extra={'print_console': True}
+                )
+
+    async def poll_once(self) -> Dict[str, Any]:
+        """Poll every device once; devices with an open circuit are skipped"""
+        loop = asyncio.get_running_loop()
+        targets = [d['ip'] for d in self.devices if not self.breaker.is_open(d['ip'])]
+        futures = {ip: loop.run_in_executor(self.executor, self.poll_device, ip) for ip in targets}
+
+        summary = {'polled': 0, 'failed': 0, 'skipped': len(self.devices) - len(targets), 'alerts': 0}
+        for device_ip, future in futures.items():
+            try:
+                metrics = await future
+            except Exception as e:
+                summary['failed'] += 1
+                self.logger.error(f"Polling {device_ip} failed: {str(e)}")
+                continue
+            summary['polled'] += 1
+            events = self.evaluate_alerts(device_ip, metrics)
+            summary['alerts'] += len(events)
+            self._emit(events)
+        return summary
+
+    async def run(self, cycles: Optional[int] = None) -> None:
+        """Poll at a fixed rate until cancelled, or for the given number of cycles"""
+        cycle = 0
+        try:
+            while cycles is None or cycle < cycles:
+                started = time.time()
+                summary = await self.poll_once()
+                await self.save_breaker()
+                elapsed = round(time.time() - started, 2)
+                self.logger.info(f"Cycle {cycle + 1}: {summary} in {elapsed} seconds", extra={'print_console': True})
+                cycle += 1
+                if POLL_SETTINGS['compact_every'] and cycle % POLL_SETTINGS['compact_every'] == 0:
+                    await self.compact()
+                    elapsed = round(time.time() - started, 2)
+                if elapsed > self.interval:
+                    self.logger.warning(f"Cycle took {elapsed}s, longer than the {self.interval}s interval")
+                elif cycles is None or cycle < cycles:
+                    await asyncio.sleep(self.interval - elapsed)
+        finally:
+            self.close()
+
+    async def save_breaker(self) -> None:
+        """Persist the circuit breaker state, off the event loop"""
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.breaker.save)
+        except OSError as e:
+            self.logger.error(f"Saving the circuit breaker state failed: {str(e)}")
+
+    async def compact(self) -> Dict[str, int]:
+        """Downsample and expire metrics in the store, off the event loop"""
+        try:
+            stats = await asyncio.get_running_loop().run_in_executor(self.executor, self.store.compact)
+        except Exception as e:
+            self.logger.error(f"Compacting the metrics store failed: {str(e)}")
+            return {}
+        self.logger.info(f"Metrics store compacted: {stats}")
+        return stats
+
+    def close(self) -> None:
+        for connector in self.sessions.values():
+            connector.disconnect()
+        self.sessions.clear()
+        self.breaker.save()
+        self.executor.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lightweight health polling (CPU/memory) with threshold alerts")
+    parser.add_argument('--interval', type=int, default=None, help="seconds between polling cycles")
+    parser.add_argument('--cycles', type=int, default=None, help="stop after this many cycles")
+    parser.add_argument('--device-type', default='firewall', help="inventory to poll (config/<type>.yaml)")
+    sub = parser.add_subparsers(dest='action')
+    sub.add_parser('poll', help="poll the fleet (default)")
+    sub.add_parser('compact', help="downsample raw metrics past retention and drop expired rollups, then exit")
+    args = parser.parse_args()
+
+    logger = get_logger("main")
+    try:
+        if args.action == 'compact':
+            stats = MetricsStore().compact()
+            logger.info(f"Metrics store compacted: {stats}", extra={'print_console': True})
+        else:
+            poller = HealthPoller(ConfigLoader.get_devices(args.device_type) or [], args.device_type, args.interval)
+            asyncio.run(poller.run(args.cycles))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.error(f"Polling failed: {str(e)}", exc_info=True, extra={'print_console': True})
+        sys.exit(1)
+    sys.exit(0)
@@ -0,0 +1,311 @@
+# inspection/huawei/inspection_daemon.py
+
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import asyncio
+import argparse
+import threading
+import http.client
+import socketserver
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+from connect.jump_host import close_jump_hosts
+from connect.session_pool import SessionPool
+from inspection.huawei.usg12004_inspection import (
+    build_llm, inspect_device_async, inspect_fleet_async, load_commands, load_prompt_template
+)
+from utils.config_loader import ConfigLoader
+from utils.logger import get_logger
+from utils.run_journal import RunJournal
+from utils.settings import DAEMON_SETTINGS
+
+
+class InspectionDaemon:
+    """
+    Long-running inspector that keeps its state warm between jobs.
+
+    LangChain and the LLM client, the commands JSON and the prompt template
+    are loaded once, the inventory stays in the inventory cache, and SSH
+    sessions are returned to a pool after each device instead of being closed.
+    Jobs (one firewall or the whole fleet) run on a background event loop.
+    """
+
+    def __init__(self):
+        self.logger = get_logger('inspection_daemon')
+        self.started = time.time()
+        self.sessions = SessionPool(DAEMON_SETTINGS['session_idle_timeout'])
+        self.warm: Dict[str, Any] = {}
+        self.reload()
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._done: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name='inspection-jobs', daemon=True).start()
+
+    def reload(self) -> None:
+        """
+        (Re)load the commands, prompt template and LLM client, e.g. after editing templates.
+
+        Running jobs keep the state they started with; jobs started afterwards use the new one.
+        """
+        self.warm = {
+            'commands': load_commands(),
+            'prompt_template': load_prompt_template(),
+            'llm': build_llm(),
+            'sessions': self.sessions,
+        }
+        self.logger.info("Commands, prompt template and AI model loaded")
+
+    def submit(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue an inspection job.
+
+        Args:
+            request: {'ip': firewall ip} for one device or {'fleet': true} for all firewalls
+
+        Returns:
+            the job record
+        """
+        devices = [d for d in ConfigLoader.get_devices('firewall') or [] if d and d.get('ip')]
+        if request.get('fleet'):
+            kind, targets = 'fleet', devices
+        elif request.get('ip'):
+            kind, targets = 'device', [d for d in devices if d['ip'] == request['ip']]
+            if not targets:
+                raise ValueError(f"{request['ip']} is not in config/firewall.yaml")
+        else:
+            raise ValueError("Request needs 'ip' or 'fleet'")
+
+        job = {
+            'id': uuid.uuid4().hex[:12],
+            'kind': kind,
+            'target': request.get('ip') or 'fleet',
+            'status': 'queued',
+            'submitted': datetime.now().isoformat(),
+            'finished': None,
+            'duration': None,
+            'result': None,
+        }
+        with self._lock:
+            self._prune()
+            self.jobs[job['id']] = job
+            self._done[job['id']] = threading.Event()
+        asyncio.run_coroutine_threadsafe(self._run(job, targets), self.loop)
+        self.logger.info(f"Job {job['id']} queued: {kind} {job['target']}")
+        return job
+
+    async def _run(self, job: Dict[str, Any], devices: List[dict]) -> None:
+        job['status'] = 'running'
+        start_time = time.time()
+        # a /reload during the job must not swap its model or templates half way through
+        warm = dict(self.warm)
+        try:
+            if job['kind'] == 'device':
+                result = await inspect_device_async(devices[0], warm=warm)
+                job['status'] = result['status']
+            else:
+                journal = RunJournal()
+                results, summary_path = await inspect_fleet_async(devices, journal, warm)
+                failed = sum(1 for r in results if r['status'] != 'success')
+                result = {'journal': journal.path, 'summary': summary_path, 'devices': len(results),
+                          'failed': failed, 'results': results}
+                job['status'] = 'success' if not failed else 'failed'
+        except Exception as e:
+            self.logger.error(f"Job {job['id']} failed: {str(e)}", exc_info=True)
+            result = {'error': str(e)}
+            job['status'] = 'failed'
+        # finished jobs may be pruned by a concurrent submit as soon as 'finished' is set
+        with self._lock:
+            job['result'] = result
+            job['duration'] = round(time.time() - start_time, 2)
+            job['finished'] = datetime.now().isoformat()
+            done = self._done[job['id']]
+        done.set()
+        self.logger.info(f"Job {job['id']} {job['status']} in {job['duration']} seconds")
+        self.sessions.prune()
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Return the job record once it finished or the timeout passed; None for unknown jobs"""
+        with self._lock:
+            done = self._done.get(job_id)
+            job = self.jobs.get(job_id)
+        if done is None:
+            return None
+        done.wait(timeout)
+        return job
+
+    def status(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in list(self.jobs.values()):
+            counts[job['status']] = counts.get(job['status'], 0) + 1
+        return {'status': 'ok', 'uptime': round(time.time() - self.started), 'jobs': counts,
+                'idle_sessions': len(self.sessions)}
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job['finished']]
+        for job_id in finished[:max(len(finished) - DAEMON_SETTINGS['max_jobs'], 0)]:
+            del self.jobs[job_id]
+            del self._done[job_id]
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.sessions.close()
+        close_jump_hosts()
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """
+    Job API:
+        POST /jobs      {"ip": "..."} or {"fleet": true}, optional "wait": seconds
+        GET  /jobs      all jobs (without results)
+        GET  /jobs/<id> one job, ?wait=seconds blocks until it finished
+        POST /reload    reload commands, prompt template and AI model
+        GET  /health    uptime, job counts and idle SSH sessions
+    """
+
+    daemon: InspectionDaemon = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split('/') if p]
+        if parts == ['health']:
+            return self._reply(200, self.daemon.status())
+        if parts == ['jobs']:
+            return self._reply(200, [{k: v for k, v in job.items() if k != 'result'}
+                                     for job in list(self.daemon.jobs.values())])
+        if len(parts) == 2 and parts[0] == 'jobs':
+            wait = float(parse_qs(url.query).get('wait', ['0'])[0])
+            job = self.daemon.wait(parts[1], wait) if wait else self.daemon.jobs.get(parts[1])
+            return self._reply(200, job) if job else self._reply(404, {'error': 'unknown job'})
+        return self._reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        parts = [p for p in urlparse(self.path).path.split('/') if p]
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if parts == ['reload']:
+                self.daemon.reload()
+                return self._reply(200, {'status': 'reloaded'})
+            if parts != ['jobs']:
+                return self._reply(404, {'error': 'not found'})
+            job = self.daemon.submit(body)
+        except (ValueError, json.JSONDecodeError) as e:
+            return self._reply(400, {'error': str(e)})
+        if body.get('wait'):
+            return self._reply(200, self.daemon.wait(job['id'], float(body['wait'])))
+        return self._reply(202, job)
+
+    def _reply(self, code: int, payload: Any) -> None:
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        self.daemon.logger.info(f"{self.command} {self.path} - " + format % args)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        # BaseHTTPRequestHandler expects an (address, port) client address
+        request, _ = super().get_request()
+        return request, ('local', 0)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def serve(daemon: Optional[InspectionDaemon] = None) -> None:
+    logger = get_logger('inspection_daemon')
+    JobRequestHandler.daemon = daemon or InspectionDaemon()
+    unix_socket = DAEMON_SETTINGS['unix_socket']
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = UnixHTTPServer(unix_socket, JobRequestHandler)
+        address = unix_socket
+    else:
+        server = ThreadingHTTPServer((DAEMON_SETTINGS['host'], DAEMON_SETTINGS['port']), JobRequestHandler)
+        address = f"http://{DAEMON_SETTINGS['host']}:{DAEMON_SETTINGS['port']}"
+    logger.info(f"Inspection daemon listening on {address}", extra={'print_console': True})
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        JobRequestHandler.daemon.close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
+
+
+def request(method: str, path: str, body: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+    """Call the daemon's job API over TCP or the Unix socket, as configured in DAEMON_SETTINGS"""
+    if DAEMON_SETTINGS['unix_socket']:
+        conn = UnixHTTPConnection(DAEMON_SETTINGS['unix_socket'], timeout=timeout)
+    else:
+        conn = http.client.HTTPConnection(DAEMON_SETTINGS['host'], DAEMON_SETTINGS['port'], timeout=timeout)
+    try:
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        conn.request(method, path, body=data, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        payload = json.loads(response.read() or b'null')
+        if response.status >= 400:
+            raise ValueError(f"{response.status}: {payload.get('error') if isinstance(payload, dict) else payload}")
+        return payload
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="USG12004 inspection daemon and job API client")
+    sub = parser.add_subparsers(dest='action', required=True)
+    sub.add_parser('serve', help="run the daemon")
+    submit = sub.add_parser('submit', help="queue an inspection on a running daemon")
+    target = submit.add_mutually_exclusive_group(required=True)
+    target.add_argument('--ip', help="inspect one firewall")
+    target.add_argument('--fleet', action='store_true', help="inspect every firewall")
+    submit.add_argument('--wait', type=float, default=0, help="seconds to wait for the result")
+    status = sub.add_parser('status', help="show a job, or the daemon health without --job")
+    status.add_argument('--job', default=None)
+    sub.add_parser('reload', help="reload commands, prompt template and AI model")
+    args = parser.parse_args()
+
+    try:
+        if args.action == 'serve':
+            serve()
+        else:
+            if args.action == 'submit':
+                body = {'fleet': True} if args.fleet else {'ip': args.ip}
+                if args.wait:
+                    body['wait'] = args.wait
+                reply = request('POST', '/jobs', body, timeout=args.wait + 30 if args.wait else 30)
+            elif args.action == 'reload':
+                reply = request('POST', '/reload', {}, timeout=60)
+            else:
+                reply = request('GET', f"/jobs/{args.job}" if args.job else '/health', timeout=30)
+            print(json.dumps(reply, indent=2, ensure_ascii=False))
+    except Exception as e:
+        get_logger("main").error(f"Tasks failed: {str(e)}", exc_info=True, extra={'print_console': True})
+        sys.exit(1)
+    sys.exit(0)
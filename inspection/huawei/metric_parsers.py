@@ -0,0 +1,72 @@
+# inspection/huawei/metric_parsers.py
+
+import re
+from typing import Dict, Any, Optional
+
+_CPU_USAGE = re.compile(r'CPU Usage\s*:\s*(\d+(?:\.\d+)?)\s*%', re.IGNORECASE)
+_CPU_MAX = re.compile(r'Max\s*:\s*(\d+(?:\.\d+)?)\s*%', re.IGNORECASE)
+_CPU_FIVE_SECONDS = re.compile(r'five seconds\s*:\s*(\d+(?:\.\d+)?)\s*%', re.IGNORECASE)
+_MEMORY_PERCENT = re.compile(r'Memory Using Percentage[^\d]*(\d+(?:\.\d+)?)\s*%', re.IGNORECASE)
+_MEMORY_TOTAL = re.compile(r'Total Physical Memory[^\d]*(\d+)', re.IGNORECASE)
+_COUNTER_LINE = re.compile(r'^\s*([A-Za-z][A-Za-z0-9 ()/_\-]*?)\s*[:=]\s*(\d+)\s*$')
+
+
+def parse_cpu_usage(output: str) -> Dict[str, float]:
+    """Parse "display cpu-usage" into cpu_usage / cpu_max percentages"""
+    metrics = {}
+    match = _CPU_USAGE.search(output) or _CPU_FIVE_SECONDS.search(output)
+    if match:
+        metrics['cpu_usage'] = float(match.group(1))
+    match = _CPU_MAX.search(output)
+    if match:
+        metrics['cpu_max'] = float(match.group(1))
+    return metrics
+
+
+def parse_memory(output: str) -> Dict[str, float]:
+    """Parse "display memory" into memory_usage percentage and total memory"""
+    metrics = {}
+    match = _MEMORY_PERCENT.search(output)
+    if match:
+        metrics['memory_usage'] = float(match.group(1))
+    match = _MEMORY_TOTAL.search(output)
+    if match:
+        metrics['memory_total'] = float(match.group(1))
+    return metrics
+
+
+def parse_nat_statistics(output: str) -> Dict[str, float]:
+    """Parse the "name : number" counters of "display nat statistics" into nat.<name> metrics"""
+    metrics = {}
+    for line in output.splitlines():
+        match = _COUNTER_LINE.match(line)
+        if match:
+            name = re.sub(r'[^a-z0-9]+', '_', match.group(1).lower()).strip('_')
+            metrics[f"nat.{name}"] = float(match.group(2))
+    return metrics
+
+
+METRIC_PARSERS = {
+    'display cpu-usage': parse_cpu_usage,
+    'display memory': parse_memory,
+    'display nat statistics': parse_nat_statistics,
+}
+
+
+def extract_metrics(config_data: Dict[str, Any]) -> Dict[str, float]:
+    """Extract all known health metrics from collected command outputs"""
+    metrics = {}
+    for commands in config_data.values():
+        for cmd, data in commands.items():
+            parser = _find_parser(cmd)
+            output = data.get('output', '')
+            if parser and not output.startswith('ERROR:'):
+                metrics.update(parser(output))
+    return metrics
+
+
+def _find_parser(cmd: str) -> Optional[Any]:
+    for prefix, parser in METRIC_PARSERS.items():
+        if cmd.startswith(prefix):
+            return parser
+    return None
@@ -0,0 +1,239 @@
+# inspection/huawei/prompt_compactor.py
+
+import re
+from collections import Counter
+from typing import Dict, Any, List, Tuple
+
+from inspection.huawei.metric_parsers import parse_cpu_usage
+from inspection.huawei.routing_table import parse_routing_table
+
+# Separator and boilerplate lines of "display current-configuration all".
+DEFAULT_LINE_PATTERNS = [
+    re.compile(r'^\s*#\s*$'),
+    re.compile(r'^\s*return\s*$'),
+    re.compile(r'^\s*!'),
+    re.compile(r'^\s*(description|alias)\s*$'),
+]
+
+# Factory defaults that "display current-configuration all" prints on the USG12004
+USG12004_DEFAULT_LINES = [
+    re.compile(r'^\s*undo shutdown\s*$'),
+    re.compile(r'^\s*mtu 1500\s*$'),
+    re.compile(r'^\s*(speed|duplex|negotiation) auto\s*$'),
+    re.compile(r'^\s*arp (expire-time 1200|learning enable)\s*$'),
+    re.compile(r'^\s*screen-length 24\s*$'),
+    re.compile(r'^\s*history-command max-size 10\s*$'),
+    re.compile(r'^\s*user-interface maximum-vty 5\s*$'),
+    re.compile(r'^\s*(ssh|stelnet) server port 22\s*$'),
+    re.compile(r'^\s*snmp-agent local-port 161\s*$'),
+    re.compile(r'^\s*info-center enable\s*$'),
+    re.compile(r'^\s*lldp enable\s*$'),
+]
+
+# "undo ..." lines are mostly disabled-by-default features in the "all" output;
+# these are kept because turning them off weakens the device.
+KEPT_UNDO_PATTERNS = [
+    re.compile(r'^\s*undo (firewall|ips|av|hrp|info-center|snmp-agent|ssh|stelnet|password|local-user|aaa)\b'),
+]
+
+# Thresholds above which a monitoring figure is reported as anomalous
+CPU_ALERT_PERCENT = 80
+MEMORY_ALERT_PERCENT = 80
+
+# Maximum lines kept from sections that have no dedicated summarizer
+MAX_GENERIC_LINES = 60
+# Maximum items listed for each anomaly
+MAX_LISTED_ITEMS = 30
+
+
+def compact_config_data(config_data: Dict[str, Any]) -> str:
+    """
+    Build a compact prompt body from collected command outputs.
+
+    Outputs with a known structure are reduced to summary statistics and the
+    anomalous entries (down interfaces, unused rules, high CPU and so on).
+    The configuration is stripped of defaults and boilerplate, and any other
+    section is cut to its first lines.
+
+    Args:
+        config_data: the dict returned by USG12004Inspector.collect_data
+
+    Returns:
+        the text to put into the prompt in place of the raw outputs
+    """
+    facts = []
+    sections = []
+    for category, commands in config_data.items():
+        sections.append(f"\n=== {category.upper()} ===")
+        for cmd, data in commands.items():
+            output = data.get('output', '')
+            if cmd.startswith('screen-length'):
+                continue
+            if output.startswith('ERROR:'):
+                facts.append(f"{cmd}: collection failed ({output[:200]})")
+                continue
+
+            handler = _find_handler(cmd)
+            cmd_facts, body = handler(output)
+            facts.extend(f"{cmd}: {fact}" for fact in cmd_facts)
+            if body:
+                sections.append(f"\n--- {cmd} ---")
+                sections.append(body)
+
+    header = ["=== SUMMARY FACTS (computed locally) ==="]
+    header.extend(f"- {fact}" for fact in facts)
+    return "\n".join(header + sections)
+
+
+def _find_handler(cmd: str):
+    for prefix, handler in COMMAND_HANDLERS:
+        if cmd.startswith(prefix):
+            return handler
+    return _summarize_generic
+
+
+def _summarize_generic(output: str) -> Tuple[List[str], str]:
+    lines = [line for line in output.splitlines() if line.strip()]
+    if len(lines) <= MAX_GENERIC_LINES:
+        return [], "\n".join(lines)
+    kept = lines[:MAX_GENERIC_LINES]
+    kept.append(f"... ({len(lines) - MAX_GENERIC_LINES} more lines omitted)")
+    return [], "\n".join(kept)
+
+
+def _summarize_configuration(output: str) -> Tuple[List[str], str]:
+    lines = output.splitlines()
+    kept = []
+    defaults = undo = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        if any(p.match(line) for p in DEFAULT_LINE_PATTERNS):
+            continue
+        if any(p.match(line) for p in USG12004_DEFAULT_LINES):
+            defaults += 1
+            continue
+        if line.lstrip().startswith('undo ') and not any(p.match(line) for p in KEPT_UNDO_PATTERNS):
+            undo += 1
+            continue
+        kept.append(line.rstrip())
+
+    top_level = Counter(line.split()[0] for line in kept if not line.startswith(' '))
+    facts = [
+        f"{len(lines)} lines, {len(kept)} kept after dropping separators, "
+        f"{defaults} default lines and {undo} undo lines",
+        "top-level objects: " + ", ".join(f"{k}={v}" for k, v in top_level.most_common(15)),
+    ]
+    return facts, "\n".join(kept)
+
+
+def _summarize_rule_table(output: str) -> Tuple[List[str], str]:
+    """Summarize "display security-policy rule all" / "display nat-policy rule all" tables"""
+    rules = []
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) < 4 or not parts[0].isdigit():
+            continue
+        rules.append({
+            'id': parts[0],
+            'name': parts[1],
+            'state': parts[2].lower(),
+            'action': parts[3].lower(),
+            'hits': int(parts[4]) if len(parts) > 4 and parts[4].isdigit() else None,
+        })
+
+    if not rules:
+        return _summarize_generic(output)
+
+    actions = Counter(rule['action'] for rule in rules)
+    disabled = [rule['name'] for rule in rules if rule['state'] != 'enable']
+    unused = [rule['name'] for rule in rules if rule['hits'] == 0 and rule['name'] != 'default']
+    facts = [
+        f"{len(rules)} rules (" + ", ".join(f"{k}={v}" for k, v in actions.items()) + ")",
+        f"{len(disabled)} disabled rules",
+        f"{len(unused)} rules with zero hits",
+    ]
+
+    body = []
+    if disabled:
+        body.append("Disabled rules: " + ", ".join(disabled[:MAX_LISTED_ITEMS]))
+    if unused:
+        body.append("Zero-hit rules: " + ", ".join(unused[:MAX_LISTED_ITEMS]))
+    return facts, "\n".join(body)
+
+
+def _summarize_interfaces(output: str) -> Tuple[List[str], str]:
+    tally = Counter()
+    down = []
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) < 3 or not re.match(r'^[A-Za-z\-]+\d', parts[0]):
+            continue
+        phy, protocol = parts[1].lower(), parts[2].lower()
+        if phy.startswith('*'):
+            tally['admin-down'] += 1
+        elif phy.startswith('up') and protocol.startswith('up'):
+            tally['up'] += 1
+        else:
+            tally['down'] += 1
+            down.append(f"{parts[0]} ({parts[1]}/{parts[2]})")
+
+    if not tally:
+        return _summarize_generic(output)
+
+    facts = ["interfaces " + ", ".join(f"{k}={v}" for k, v in sorted(tally.items()))]
+    body = "Down interfaces: " + ", ".join(down[:MAX_LISTED_ITEMS]) if down else ""
+    return facts, body
+
+
+def _summarize_routing_table(output: str) -> Tuple[List[str], str]:
+    table = parse_routing_table(output)
+    if not len(table):
+        return _summarize_generic(output)
+
+    facts = table.summary_facts(MAX_LISTED_ITEMS)
+    match = re.search(r'Destinations\s*:\s*(\d+)\s+Routes\s*:\s*(\d+)', output)
+    if match:
+        facts.append(f"device reports {match.group(1)} destinations, {match.group(2)} routes")
+    return facts, ""
+
+
+def _summarize_cpu(output: str) -> Tuple[List[str], str]:
+    metrics = parse_cpu_usage(output)
+    if 'cpu_usage' not in metrics:
+        return _summarize_generic(output)
+    usage = metrics['cpu_usage']
+    facts = [f"CPU usage {usage:g}%"]
+    if 'cpu_max' in metrics:
+        facts[0] += f", max {metrics['cpu_max']:g}%"
+    body = ""
+    if usage >= CPU_ALERT_PERCENT:
+        facts.append(f"ANOMALY: CPU usage {usage:g}% is at or above {CPU_ALERT_PERCENT}%")
+        body = _summarize_generic(output)[1]
+    return facts, body
+
+
+def _summarize_memory(output: str) -> Tuple[List[str], str]:
+    facts = []
+    body = ""
+    for line in output.splitlines():
+        if any(key in line for key in ['Total Physical', 'Memory Using Percentage', 'State']):
+            facts.append(line.strip())
+    values = [int(v) for v in re.findall(r'Percentage[^\d]*(\d+)\s*%', output)]
+    if values and max(values) >= MEMORY_ALERT_PERCENT:
+        facts.append(f"ANOMALY: memory usage {max(values)}% is at or above {MEMORY_ALERT_PERCENT}%")
+        body = _summarize_generic(output)[1]
+    if not facts:
+        return _summarize_generic(output)
+    return facts, body
+
+
+COMMAND_HANDLERS = [
+    ('display current-configuration', _summarize_configuration),
+    ('display security-policy rule', _summarize_rule_table),
+    ('display nat-policy rule', _summarize_rule_table),
+    ('display interface brief', _summarize_interfaces),
+    ('display ip routing-table', _summarize_routing_table),
+    ('display cpu-usage', _summarize_cpu),
+    ('display memory', _summarize_memory),
+]
@@ -0,0 +1,368 @@
+# inspection/huawei/routing_table.py
+
+import os
+import sys
+import glob
+import pickle
+import re
+import socket
+import argparse
+import ipaddress
+from array import array
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.settings import BASE_DIR
+
+ROUTING_DIR = os.path.join(BASE_DIR, 'output', 'routing')
+
+_NO_ROUTE = -1
+_PROTO = re.compile(r'^[A-Za-z][A-Za-z_\-]*$')
+
+
+def _ip(text: str) -> int:
+    try:
+        return int.from_bytes(socket.inet_aton(text), 'big')
+    except OSError:
+        raise ValueError(f"Invalid IPv4 address: {text}")
+
+
+def _bit(key: int, position: int) -> int:
+    return (key >> (31 - position)) & 1
+
+
+def _common_length(a: int, b: int, limit: int) -> int:
+    diff = a ^ b
+    return limit if not diff else min(32 - diff.bit_length(), limit)
+
+
+def _mask(length: int) -> int:
+    return (0xFFFFFFFF << (32 - length)) & 0xFFFFFFFF
+
+
+class RoutingTable:
+    """
+    IPv4 routing table held in a path-compressed radix (Patricia) trie.
+
+    Routes and trie nodes live in parallel typed arrays instead of per-route
+    objects, so a table of 100k+ routes takes a few megabytes. ECMP paths of
+    one prefix are chained through 'next_path'. Protocol and interface names
+    are interned in small string tables.
+    """
+
+    _ROUTE_ARRAYS = ('network', 'length', 'proto', 'preference', 'cost', 'nexthop', 'interface', 'next_path')
+    _NODE_ARRAYS = ('key', 'prefixlen', 'left', 'right', 'route')
+
+    def __init__(self):
+        # routes
+        self.network = array('I')
+        self.length = array('B')
+        self.proto = array('B')
+        self.preference = array('H')
+        self.cost = array('I')
+        self.nexthop = array('I')
+        self.interface = array('H')
+        self.next_path = array('i')
+        self.protocols: List[str] = []
+        self.interfaces: List[str] = []
+        # trie nodes; node 0 is the root (0.0.0.0/0)
+        self.key = array('I', [0])
+        self.prefixlen = array('B', [0])
+        self.left = array('i', [_NO_ROUTE])
+        self.right = array('i', [_NO_ROUTE])
+        self.route = array('i', [_NO_ROUTE])
+        self._protocol_ids: Dict[str, int] = {}
+        self._interface_ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.network)
+
+    # ---- building ---------------------------------------------------------
+
+    def add(self, prefix: str, proto: str, preference: int, cost: int, nexthop: str, interface: str) -> None:
+        address, _, length = prefix.partition('/')
+        length = int(length) if length else 32
+        if not 0 <= length <= 32:
+            raise ValueError(f"Invalid prefix length: {prefix}")
+        key = _ip(address) & _mask(length)
+
+        route = len(self.network)
+        self.network.append(key)
+        self.length.append(length)
+        self.proto.append(self._intern(proto, self.protocols, self._protocol_ids))
+        self.preference.append(preference)
+        self.cost.append(cost)
+        self.nexthop.append(_ip(nexthop))
+        self.interface.append(self._intern(interface, self.interfaces, self._interface_ids))
+        self.next_path.append(_NO_ROUTE)
+
+        node = 0
+        while True:
+            if self.prefixlen[node] == length:
+                self._attach_route(node, route)
+                return
+            branch = self.right if _bit(key, self.prefixlen[node]) else self.left
+            child = branch[node]
+            if child == _NO_ROUTE:
+                branch[node] = self._new_node(key, length, route)
+                return
+            common = _common_length(key, self.key[child], min(length, self.prefixlen[child]))
+            if common == self.prefixlen[child]:
+                node = child
+                continue
+            # split: the new prefix or a new branch node goes between node and child
+            if common == length:
+                middle = self._new_node(key, length, route)
+            else:
+                middle = self._new_node(key & _mask(common), common, _NO_ROUTE)
+                leaf = self._new_node(key, length, route)
+                (self.right if _bit(key, common) else self.left)[middle] = leaf
+            (self.right if _bit(self.key[child], self.prefixlen[middle]) else self.left)[middle] = child
+            branch[node] = middle
+            return
+
+    def _new_node(self, key: int, length: int, route: int) -> int:
+        self.key.append(key & _mask(length))
+        self.prefixlen.append(length)
+        self.left.append(_NO_ROUTE)
+        self.right.append(_NO_ROUTE)
+        self.route.append(route)
+        return len(self.key) - 1
+
+    def _attach_route(self, node: int, route: int) -> None:
+        first = self.route[node]
+        if first == _NO_ROUTE:
+            self.route[node] = route
+            return
+        while self.next_path[first] != _NO_ROUTE:
+            first = self.next_path[first]
+        self.next_path[first] = route
+
+    @staticmethod
+    def _intern(name: str, names: List[str], ids: Dict[str, int]) -> int:
+        if name not in ids:
+            ids[name] = len(names)
+            names.append(name)
+        return ids[name]
+
+    # ---- queries ----------------------------------------------------------
+
+    def route_info(self, route: int) -> Dict[str, Any]:
+        return {
+            'prefix': f"{ipaddress.IPv4Address(self.network[route])}/{self.length[route]}",
+            'proto': self.protocols[self.proto[route]],
+            'preference': self.preference[route],
+            'cost': self.cost[route],
+            'nexthop': str(ipaddress.IPv4Address(self.nexthop[route])),
+            'interface': self.interfaces[self.interface[route]],
+        }
+
+    def paths(self, route: int) -> List[Dict[str, Any]]:
+        """All ECMP paths starting at a route index"""
+        paths = []
+        while route != _NO_ROUTE:
+            paths.append(self.route_info(route))
+            route = self.next_path[route]
+        return paths
+
+    def lookup(self, address: str) -> List[Dict[str, Any]]:
+        """
+        Longest-prefix match.
+
+        Returns:
+            the matching route's ECMP paths, or an empty list when nothing matches
+        """
+        key = _ip(address)
+        node, best = 0, self.route[0]
+        while self.prefixlen[node] < 32:
+            child = (self.right if _bit(key, self.prefixlen[node]) else self.left)[node]
+            if child == _NO_ROUTE or _common_length(key, self.key[child], self.prefixlen[child]) < self.prefixlen[child]:
+                break
+            if self.route[child] != _NO_ROUTE:
+                best = self.route[child]
+            node = child
+        return self.paths(best) if best != _NO_ROUTE else []
+
+    def protocol_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for proto in self.proto:
+            name = self.protocols[proto]
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    # ---- anomalies --------------------------------------------------------
+
+    def anomalies(self, limit: int = 30) -> Dict[str, Any]:
+        """
+        Detect routing anomalies locally.
+
+        Returns:
+            dict with
+            'default': problems with the default route (missing, several next hops, blackholed)
+            'blackholes': prefixes routed to NULL0
+            'overlaps': (more specific, covering prefix) pairs with different next hops,
+                        the default route and the device's own /32 addresses (next hop
+                        127.0.0.1 or InLoopBack0) excluded; 'overlap_count' has the total
+            'shadowed': prefixes whose whole range is covered by more specific routes
+        """
+        result = {'default': [], 'blackholes': [], 'overlaps': [], 'overlap_count': 0, 'shadowed': []}
+
+        default = self.paths(self.route[0]) if self.route[0] != _NO_ROUTE else []
+        if not default:
+            result['default'].append("no default route")
+        else:
+            nexthops = {path['nexthop'] for path in default}
+            if len({path['proto'] for path in default}) > 1:
+                result['default'].append(f"default route from several protocols: {sorted({p['proto'] for p in default})}")
+            if len(nexthops) > 1:
+                result['default'].append(f"default route has {len(nexthops)} next hops: {sorted(nexthops)}")
+            if any(path['interface'].upper().startswith('NULL') for path in default):
+                result['default'].append("default route points to NULL0")
+
+        null_ids = {i for i, name in enumerate(self.interfaces) if name.upper().startswith('NULL')}
+        for route in range(len(self.network)):
+            if self.interface[route] in null_ids and self.length[route] and len(result['blackholes']) < limit:
+                result['blackholes'].append(self.route_info(route)['prefix'])
+
+        loopback = _ip('127.0.0.1')
+        inloopback_ids = {i for i, name in enumerate(self.interfaces) if name.upper().startswith('INLOOPBACK')}
+
+        def is_local(route: int) -> bool:
+            return self.length[route] == 32 and (
+                self.nexthop[route] == loopback or self.interface[route] in inloopback_ids
+            )
+
+        def walk(node: int, covering: int) -> int:
+            """Return the number of addresses covered by routes at or below node"""
+            route = self.route[node]
+            if (route != _NO_ROUTE and covering != _NO_ROUTE and self.nexthop[route] != self.nexthop[covering]
+                    and not is_local(route)):
+                result['overlap_count'] += 1
+                if len(result['overlaps']) < limit:
+                    result['overlaps'].append((self.route_info(route)['prefix'], self.route_info(covering)['prefix']))
+            below = covering if route == _NO_ROUTE or node == 0 else route
+            covered = 0
+            for child in (self.left[node], self.right[node]):
+                if child != _NO_ROUTE:
+                    covered += walk(child, below)
+            size = 1 << (32 - self.prefixlen[node])
+            if route != _NO_ROUTE and node != 0 and covered == size and len(result['shadowed']) < limit:
+                result['shadowed'].append(self.route_info(route)['prefix'])
+            return size if route != _NO_ROUTE else covered
+
+        walk(0, _NO_ROUTE)
+        return result
+
+    def summary_facts(self, limit: int = 30) -> List[str]:
+        """Short facts for the analysis prompt"""
+        counts = self.protocol_counts()
+        anomalies = self.anomalies(limit)
+        facts = [
+            f"{len(self)} routes in {len(self.key) - 1} trie nodes",
+            "routes per protocol: " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items(), key=lambda kv: -kv[1])),
+        ]
+        facts.extend(f"ANOMALY: {problem}" for problem in anomalies['default'])
+        if anomalies['blackholes']:
+            facts.append(f"{len(anomalies['blackholes'])} prefixes routed to NULL0: {', '.join(anomalies['blackholes'])}")
+        if anomalies['overlap_count']:
+            examples = ', '.join(f"{inner} inside {outer}" for inner, outer in anomalies['overlaps'][:10])
+            facts.append(f"{anomalies['overlap_count']} overlapping prefixes with a different next hop, e.g. {examples}")
+        if anomalies['shadowed']:
+            facts.append(f"ANOMALY: prefixes fully covered by more specific routes: {', '.join(anomalies['shadowed'])}")
+        return facts
+
+    # ---- persistence ------------------------------------------------------
+
+    def save(self, path: str) -> str:
+        state = {name: getattr(self, name) for name in self._ROUTE_ARRAYS + self._NODE_ARRAYS}
+        state.update(protocols=self.protocols, interfaces=self.interfaces)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> 'RoutingTable':
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        table = cls()
+        for name, value in state.items():
+            setattr(table, name, value)
+        table._protocol_ids = {name: i for i, name in enumerate(table.protocols)}
+        table._interface_ids = {name: i for i, name in enumerate(table.interfaces)}
+        return table
+
+
+def parse_routing_table(output: str) -> RoutingTable:
+    """
+    Parse "display ip routing-table" into a RoutingTable.
+
+    Route lines are "Destination/Mask Proto Pre Cost [Flags] NextHop Interface";
+    further ECMP paths of the same destination follow on lines without a
+    destination.
+    """
+    table = RoutingTable()
+    prefix = None
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) >= 6 and '/' in parts[0] and parts[0][0].isdigit():
+            prefix, parts = parts[0], parts[1:]
+        elif prefix and len(parts) >= 5 and _PROTO.match(parts[0]) and parts[1].isdigit():
+            pass
+        else:
+            if not line.strip():
+                prefix = None
+            continue
+        if not (parts[1].isdigit() and parts[2].isdigit()):
+            continue
+        try:
+            table.add(prefix, parts[0], int(parts[1]), int(parts[2]), parts[-2], parts[-1])
+        except ValueError:
+            continue
+    return table
+
+
+def table_path(device_ip: str) -> str:
+    return os.path.join(ROUTING_DIR, f"routing_{device_ip}.bin")
+
+
+class RoutingFleet:
+    """Saved routing tables of all inspected devices (latest collection each)"""
+
+    def __init__(self, directory: str = ROUTING_DIR):
+        self.tables: Dict[str, RoutingTable] = {}
+        for path in sorted(glob.glob(os.path.join(directory, 'routing_*.bin'))):
+            device_ip = os.path.basename(path)[len('routing_'):-len('.bin')]
+            self.tables[device_ip] = RoutingTable.load(path)
+
+    def who_routes(self, address: str, include_default: bool = False) -> List[Tuple[str, List[Dict[str, Any]]]]:
+        """Return (device, paths) for every device with a route to the address"""
+        results = []
+        for device_ip, table in self.tables.items():
+            paths = table.lookup(address)
+            if paths and (include_default or not paths[0]['prefix'].endswith('/0')):
+                results.append((device_ip, paths))
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query saved routing tables")
+    sub = parser.add_subparsers(dest='action', required=True)
+    lookup_parser = sub.add_parser('lookup', help="which devices route an address (longest-prefix match)")
+    lookup_parser.add_argument('address')
+    lookup_parser.add_argument('--include-default', action='store_true', help="also list matches on the default route")
+    anomalies_parser = sub.add_parser('anomalies', help="routing anomalies of one device")
+    anomalies_parser.add_argument('device')
+    args = parser.parse_args()
+
+    if args.action == 'lookup':
+        matches = RoutingFleet().who_routes(args.address, args.include_default)
+        for device_ip, paths in matches:
+            for path in paths:
+                print(f"{device_ip}  {path['prefix']}  {path['proto']}  via {path['nexthop']} {path['interface']}")
+        print(f"{len(matches)} devices")
+    else:
+        for fact in RoutingTable.load(table_path(args.device)).summary_facts():
+            print(f"- {fact}")
+    sys.exit(0)
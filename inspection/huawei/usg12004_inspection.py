@@ -2,28 +2,93 @@
 
 import os
 import sys
+import glob
+import argparse
 import time
 import asyncio
+import contextvars
 import json
 from datetime import datetime
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Optional
 
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 from utils.config_loader import ConfigLoader
 from utils.settings import BASE_DIR as project_root
 from connect.device_connector import DeviceConnector
+from connect.exceptions import NetworkAutomationError, ConnectionError, CommandError
+from connect.reachability import CircuitBreaker, probe_hosts
+from connect.session_pool import SessionPool
+from inspection.huawei.prompt_compactor import compact_config_data
+from inspection.huawei.metric_parsers import extract_metrics
+from inspection.huawei.routing_table import parse_routing_table, table_path as routing_table_path
+from inspection.huawei.config_tree import CONFIG_COMMAND_PREFIX, diff_against_file
+from utils.cpu_executor import run_cpu_bound
 from utils.logger import get_logger
-from utils.settings import AI_SETTINGS, OUTPUT_DIRS
+from utils.tracing import span
+from utils.run_journal import RunJournal
+from utils.metrics_store import MetricsStore
+from utils.search_index import ConfigSearchIndex
+from utils.report_renderer import ReportRenderer
+from utils.settings import AI_SETTINGS, OUTPUT_DIRS, ANALYSIS_SETTINGS, COMMAND_BATCH_SETTINGS, METRICS_SETTINGS
+from utils.settings import SEARCH_INDEX_SETTINGS, REPORT_SETTINGS, CONFIG_TRANSFER_SETTINGS, ROUTING_SETTINGS
+
+
+COMMANDS_FILE = os.path.join(project_root, 'templates', 'commands', 'usg12004_commands.json')
+PROMPT_FILE = os.path.join(project_root, 'templates', 'prompts', 'usg12004_prompt.txt')
+
+
+def load_commands() -> Dict[str, List[str]]:
+    """Load the inspection commands by category (you can also load another JSON file)"""
+    with open(COMMANDS_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_prompt_template() -> PromptTemplate:
+    # 从 TXT 文件加载 prompt 模板
+    with open(PROMPT_FILE, 'r', encoding='utf-8') as f:
+        return PromptTemplate.from_template(f.read())
+
+
+def build_llm() -> ChatOpenAI:
+    return ChatOpenAI(
+        openai_api_base=AI_SETTINGS['deepseek']['api_base'],
+        openai_api_key=AI_SETTINGS['deepseek']['api_key'],
+        model_name=AI_SETTINGS['deepseek']['model'],
+        temperature=0,
+        streaming=ANALYSIS_SETTINGS['streaming'],
+        request_timeout=180,
+        max_retries=3,
+        model_kwargs={
+            "response_format": {"type": "text"}
+        }
+    )
 
 
 class USG12004Inspector:
     """USG12004 device inspector"""
 
-    def __init__(self, device_info: Dict[str, Any]):
+    def __init__(self, device_info: Dict[str, Any], commands: Optional[Dict[str, List[str]]] = None,
+                 llm: Optional[ChatOpenAI] = None, prompt_template: Optional[PromptTemplate] = None,
+                 sessions: Optional[SessionPool] = None, config_transfer: Optional[bool] = None):
+        """
+        Args:
+            device_info: connection parameters from ConfigLoader.get_device_info
+            commands, llm, prompt_template: state already loaded by a long-running
+                process (see inspection_daemon); loaded here when not given
+            sessions: pool to borrow the SSH session from and return it to
+            config_transfer: download the configuration as a file instead of reading
+                it from the CLI; defaults to CONFIG_TRANSFER_SETTINGS['enabled']
+        """
         self.device_info = device_info
+        self.config_transfer = CONFIG_TRANSFER_SETTINGS['enabled'] if config_transfer is None else config_transfer
         self.logger = get_logger('usg12004_inspector')
         self.device_connector = None
+        self.sessions = sessions
+        self.prompt_template = prompt_template
+        self.metrics = {}
+        self.health_metrics = {}
+        self.config_changes = None
 
         # Output directories
         self.logger.info(f"Project root: {project_root}")
@@ -39,49 +104,46 @@ class USG12004Inspector:
             self.logger.error(f"Error creating directories: {str(e)}")
             raise
 
-        # Load commands from JSON file(you can also load another JSON file)
-        try:
-            commands_file = os.path.join(project_root, 'templates', 'commands', 'usg12004_commands.json')
-            with open(commands_file, 'r', encoding='utf-8') as f:
-                self.commands = json.load(f)
-            self.logger.info(f"Commands loaded from {commands_file}")
-        except Exception as e:
-            self.logger.error(f"Failed to load commands from JSON: {str(e)}")
-            raise
+        # Load commands from JSON file
+        self.commands = commands
+        if self.commands is None:
+            try:
+                self.commands = load_commands()
+                self.logger.info(f"Commands loaded from {COMMANDS_FILE}")
+            except Exception as e:
+                self.logger.error(f"Failed to load commands from JSON: {str(e)}")
+                raise
 
         # 初始化 AI 分析器
-        try:
-            self.llm = ChatOpenAI(
-                openai_api_base=AI_SETTINGS['deepseek']['api_base'],
-                openai_api_key=AI_SETTINGS['deepseek']['api_key'],
-                model_name=AI_SETTINGS['deepseek']['model'],
-                temperature=0,
-                streaming=False,
-                request_timeout=180,
-                max_retries=3,
-                model_kwargs={
-                    "response_format": {"type": "text"}
-                }
-            )
-            self.logger.info("AI model initialized successfully")
-        except Exception as e:
-            self.logger.error(f"AI model initialized failed: {str(e)}")
-            raise
+        self.llm = llm
+        if self.llm is None:
+            try:
+                self.llm = build_llm()
+                self.logger.info("AI model initialized successfully")
+            except Exception as e:
+                self.logger.error(f"AI model initialized failed: {str(e)}")
+                raise
 
     def collect_data(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
         self.logger.info("=" * 50)
         self.logger.info(f"Starting to collect data of device {self.device_info['host']} ...")
         self.logger.info("=" * 50)
         config_data = {}
+        collected = False
 
         try:
-            self.device_connector = DeviceConnector({
+            connection_info = {
                 **self.device_info,
                 'global_delay_factor': 2,
                 'timeout': 60,
                 'session_timeout': 60
-            })
-            self.device_connector.connect()
+            }
+            with span('connect', jump_host=(self.device_info.get('jump_host') or {}).get('name', '')):
+                if self.sessions is not None:
+                    self.device_connector = self.sessions.acquire(connection_info)
+                else:
+                    self.device_connector = DeviceConnector(connection_info)
+                    self.device_connector.connect()
             self.logger.info(f"Successfully connected to device {self.device_info['host']}")
 
             for category, cmds in self.commands.items():
@@ -90,15 +152,36 @@ class USG12004Inspector:
                 self.logger.info(f"This category includes {len(cmds)} commands")
                 config_data[category] = {}
 
-                for cmd in cmds:
+                batched_outputs = {}
+                batch = [cmd for cmd in cmds if self._is_batchable(cmd)]
+                if len(batch) > 1:
                     try:
-                        self.logger.info(f"Executing command: {cmd}")
+                        self.logger.info(f"Executing {len(batch)} commands in one batch: {batch}")
                         start_time = time.time()
-                        output = self.device_connector.send_command(cmd)
-                        end_time = time.time()
+                        with span('command_batch', category=category, commands=", ".join(batch)):
+                            batched_outputs = self.device_connector.send_commands(batch)
+                        batch_time = round((time.time() - start_time) / len(batch), 2)
+                    except Exception as e:
+                        self.logger.error(f"Batch execution failed, falling back to single commands: {str(e)}")
+
+                for cmd in cmds:
+                    try:
+                        if cmd in batched_outputs:
+                            output = batched_outputs[cmd]
+                            execution_time = batch_time
+                        elif self._is_transferable(cmd):
+                            start_time = time.time()
+                            with span('command', command=cmd, transfer=CONFIG_TRANSFER_SETTINGS['protocol']):
+                                output = self._fetch_configuration(cmd)
+                            execution_time = round(time.time() - start_time, 2)
+                        else:
+                            self.logger.info(f"Executing command: {cmd}")
+                            start_time = time.time()
+                            with span('command', command=cmd):
+                                output = self.device_connector.send_command(cmd)
+                            execution_time = round(time.time() - start_time, 2)
 
                         line_count = len(output.splitlines())
-                        execution_time = round(end_time - start_time, 2)
 
                         config_data[category][cmd] = {
                             'output': output,
@@ -121,7 +204,8 @@ class USG12004Inspector:
                                 if any(key in line for key in ['Total Physical', 'Memory Using Percentage', 'State']):
                                     self.logger.info(f"  {line}")
 
-                        time.sleep(0.5)
+                        if cmd not in batched_outputs:
+                            time.sleep(0.5)
 
                     except Exception as e:
                         self.logger.error(f"Command execution failed: {cmd}")
@@ -148,19 +232,60 @@ class USG12004Inspector:
             self.logger.info(f"- Total lines: {total_lines}")
             self.logger.info(f"- Total categories: {len(self.commands)}")
             self.logger.info("=" * 50)
+            collected = True
             return config_data
 
         except Exception as e:
             self.logger.error(f"Data collection failed: {str(e)}", exc_info=True)
             raise
         finally:
-            if self.device_connector:
+            if self.device_connector and self.sessions is not None:
+                # a session that failed mid-collection is closed rather than reused
+                self.sessions.release(self.device_connector, reusable=collected)
+                self.device_connector = None
+            elif self.device_connector:
                 try:
                     self.device_connector.disconnect()
                     self.logger.info(f"Disconnected from device {self.device_info['host']}")
                 except Exception as e:
                     self.logger.error(f"Error during disconnect: {str(e)}")
 
+    @staticmethod
+    def _is_batchable(cmd: str) -> bool:
+        if not COMMAND_BATCH_SETTINGS['enabled']:
+            return False
+        return not any(cmd.startswith(prefix) for prefix in COMMAND_BATCH_SETTINGS['exclude'])
+
+    def _is_transferable(self, cmd: str) -> bool:
+        return self.config_transfer and cmd.startswith(CONFIG_COMMAND_PREFIX)
+
+    def _fetch_configuration(self, cmd: str) -> str:
+        """
+        Get the running configuration as one bulk file transfer, falling back to the CLI.
+
+        The configuration is saved to a temporary file on flash and downloaded
+        over SFTP/SCP on the existing SSH session. Note that the saved file has
+        no default settings, unlike "display current-configuration all".
+        """
+        remote_file = CONFIG_TRANSFER_SETTINGS['remote_file']
+        protocol = CONFIG_TRANSFER_SETTINGS['protocol']
+        try:
+            self.logger.info(f"Downloading configuration over {protocol} instead of: {cmd}")
+            output = self.device_connector.send_confirmed(f"save {remote_file}")
+            if 'error' in output.lower():
+                raise CommandError(f"Saving configuration to {remote_file} failed", {'output': output[-200:]})
+            try:
+                content = self.device_connector.download_file(remote_file, protocol)
+            finally:
+                try:
+                    self.device_connector.send_confirmed(f"delete /unreserved {remote_file}")
+                except Exception as e:
+                    self.logger.warning(f"Could not delete {remote_file} from flash: {str(e)}")
+            return content.decode('utf-8', errors='replace').replace('\r\n', '\n').rstrip()
+        except Exception as e:
+            self.logger.warning(f"Configuration transfer failed, falling back to CLI: {str(e)}")
+            return self.device_connector.send_command(cmd)
+
     def save_raw_data(self, config_data: Dict[str, Any]) -> str:
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -185,6 +310,7 @@ class USG12004Inspector:
                         f.write(f"Output:\n{data['output']}\n")
 
             self.logger.info(f"File successfully saved to: {file_path}")
+            self.index_raw_data(file_path)
             return file_path
 
         except Exception as e:
@@ -192,18 +318,28 @@ class USG12004Inspector:
             self.logger.error(f"Exception: {str(e)}", exc_info=True)
             raise
 
+    def _build_prompt(self, config_data: Dict[str, Any]) -> str:
+        with span('format', profile=True):
+            formatted_config = self._format_config_data(config_data)
+            prompt = self.prompt_template or load_prompt_template()
+            max_length = ANALYSIS_SETTINGS['max_prompt_length']
+            truncated_config = formatted_config[:max_length]
+            return prompt.format(config=truncated_config)
+
+    def index_raw_data(self, file_path: str) -> None:
+        """Add the raw config to the fleet-wide search index"""
+        if not SEARCH_INDEX_SETTINGS['enabled']:
+            return
+        try:
+            ConfigSearchIndex().index_file(file_path, device=self.device_info['host'])
+            self.logger.info(f"Raw config indexed for search: {file_path}")
+        except Exception as e:
+            self.logger.error(f"Indexing raw config failed: {str(e)}")
+
     def analyze_data(self, config_data: Dict[str, Any]) -> str:
         try:
             self.logger.info("Starting analysis of data...")
-            formatted_config = self._format_config_data(config_data)
-            # 从 TXT 文件加载 prompt 模板
-            prompt_file = os.path.join(project_root, 'templates', 'prompts', 'usg12004_prompt.txt')
-            with open(prompt_file, 'r', encoding='utf-8') as f:
-                prompt_template_str = f.read()
-            prompt = PromptTemplate.from_template(prompt_template_str)
-            max_length = 80000
-            truncated_config = formatted_config[:max_length]
-            formatted_prompt = prompt.format(config=truncated_config)
+            formatted_prompt = self._build_prompt(config_data)
 
             for attempt in range(3):
                 try:
@@ -211,7 +347,10 @@ class USG12004Inspector:
                         self.logger.info(f"Retrying in {5 * (attempt + 1)} seconds...")
                         time.sleep(5 * (attempt + 1))
                     self.logger.info(f"Attempt {attempt + 1} to analyze data...")
-                    response = self.llm.invoke(formatted_prompt)
+                    start_time = time.time()
+                    with span('llm', attempt=attempt + 1, prompt_chars=len(formatted_prompt)):
+                        response = self.llm.invoke(formatted_prompt)
+                    self.metrics['llm_total_time'] = round(time.time() - start_time, 2)
                     if isinstance(response, str):
                         content = response
                     else:
@@ -230,6 +369,119 @@ class USG12004Inspector:
             self.logger.error(f"Data analysis failed: {str(e)}", exc_info=True)
             raise
 
+    def analyze_data_streaming(self, config_data: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Stream the analysis straight into the report file.
+
+        Tokens are appended to a per-device ``.partial`` report as they arrive.
+        If an attempt fails mid-stream, the partial report is kept and the next
+        attempt (or the next run) asks the model to continue from where it stopped.
+
+        Returns:
+            tuple of (analysis text, final report path)
+        """
+        try:
+            self.logger.info("Starting streaming analysis of data...")
+            formatted_prompt = self._build_prompt(config_data)
+            device_ip = self.device_info['host']
+            partial_path = self._partial_report_path()
+
+            for attempt in range(3):
+                try:
+                    if attempt > 0:
+                        self.logger.info(f"Retrying in {5 * (attempt + 1)} seconds...")
+                        time.sleep(5 * (attempt + 1))
+
+                    done = self._read_partial_analysis(partial_path)
+                    if done:
+                        self.logger.info(f"Resuming from partial report ({len(done)} characters): {partial_path}")
+                        prompt = (
+                            f"{formatted_prompt}\n\n"
+                            "The beginning of the report has already been written and is given below. "
+                            "Continue the report exactly where it stops. Do not repeat any of it.\n\n"
+                            f"{done}"
+                        )
+                    else:
+                        prompt = formatted_prompt
+                        with open(partial_path, "w", encoding="utf-8") as f:
+                            f.write(self._report_header(device_ip, datetime.now().strftime("%Y%m%d_%H%M%S")))
+
+                    self.logger.info(f"Attempt {attempt + 1} to analyze data (streaming)...")
+                    with span('llm', attempt=attempt + 1, prompt_chars=len(prompt), streaming=True):
+                        streamed = self._stream_to_file(prompt, partial_path)
+                    content = done + streamed
+                    if content and len(content) > 50:
+                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                        report_path = os.path.join(project_root, 'output', 'reports', f"report_{device_ip}_{timestamp}.md")
+                        os.replace(partial_path, report_path)
+                        self.logger.info("Analysis successful")
+                        self.logger.info(f"Report successfully saved to: {report_path}")
+                        return content, report_path
+                    else:
+                        raise ValueError("AI model returned an empty response")
+                except Exception as e:
+                    self.logger.error(f"Attempt {attempt + 1} analysis failed: {str(e)}")
+                    if attempt == 2:
+                        raise
+            raise Exception("All attempts to analyze failed")
+        except Exception as e:
+            self.logger.error(f"Data analysis failed: {str(e)}", exc_info=True)
+            raise
+
+    def _stream_to_file(self, prompt: str, partial_path: str) -> str:
+        """Append streamed chunks to the partial report and record timing metrics"""
+        chunks = []
+        start_time = time.time()
+        last_sync = start_time
+        first_byte = None
+        with open(partial_path, "a", encoding="utf-8") as f:
+            for chunk in self.llm.stream(prompt):
+                text = chunk if isinstance(chunk, str) else getattr(chunk, 'content', '')
+                if not text:
+                    continue
+                if first_byte is None:
+                    first_byte = time.time()
+                    self.metrics['llm_ttfb'] = round(first_byte - start_time, 2)
+                    self.logger.info(f"  - Time to first byte: {self.metrics['llm_ttfb']} seconds")
+                f.write(text)
+                f.flush()
+                chunks.append(text)
+                if time.time() - last_sync >= ANALYSIS_SETTINGS['checkpoint_interval']:
+                    os.fsync(f.fileno())
+                    last_sync = time.time()
+
+        self.metrics['llm_total_time'] = round(time.time() - start_time, 2)
+        self.metrics['llm_chunks'] = len(chunks)
+        self.logger.info(f"  - Streaming time: {self.metrics['llm_total_time']} seconds, {len(chunks)} chunks")
+        return "".join(chunks)
+
+    def _partial_report_path(self) -> str:
+        reports_dir = os.path.join(project_root, 'output', 'reports')
+        os.makedirs(reports_dir, exist_ok=True)
+        return os.path.join(reports_dir, f"report_{self.device_info['host']}.md.partial")
+
+    @staticmethod
+    def _read_partial_analysis(partial_path: str) -> str:
+        """Return the analysis text already written to a partial report, if any"""
+        if not os.path.exists(partial_path):
+            return ""
+        with open(partial_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        marker = "## Analysis Result\n\n"
+        if marker not in text:
+            return ""
+        return text.split(marker, 1)[1]
+
+    @staticmethod
+    def _report_header(device_ip: str, timestamp: str) -> str:
+        return (
+            f"# HUAWEI USG12004 Inspection Analysis Report\n\n"
+            f"## Basic Information\n"
+            f"- Device IP: {device_ip}\n"
+            f"- Analysis Time: {timestamp}\n\n"
+            "## Analysis Result\n\n"
+        )
+
     def save_report(self, analysis: str) -> str:
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -242,11 +494,7 @@ class USG12004Inspector:
             self.logger.info(f"Report path: {report_path}")
 
             with open(report_path, "w", encoding="utf-8") as f:
-                f.write(f"# HUAWEI USG12004 Inspection Analysis Report\n\n")
-                f.write(f"## Basic Information\n")
-                f.write(f"- Device IP: {device_ip}\n")
-                f.write(f"- Analysis Time: {timestamp}\n\n")
-                f.write("## Analysis Result\n\n")
+                f.write(self._report_header(device_ip, timestamp))
                 f.write(analysis)
 
             self.logger.info(f"Report successfully saved to: {report_path}")
@@ -257,20 +505,174 @@ class USG12004Inspector:
             self.logger.error(f"Exception: {str(e)}", exc_info=True)
             raise
 
-    def run(self) -> Tuple[str, str]:
+    def record_metrics(self, config_data: Dict[str, Any]) -> Dict[str, float]:
+        """Append CPU, memory and NAT figures to the health metrics store"""
+        if not METRICS_SETTINGS['enabled']:
+            return {}
         try:
-            config_data = self.collect_data()
-            raw_config_path = self.save_raw_data(config_data)
+            metrics = extract_metrics(config_data)
+            MetricsStore().append_many(self.device_info['host'], metrics)
+            self.logger.info(f"Recorded {len(metrics)} health metrics")
+            return metrics
+        except Exception as e:
+            self.logger.error(f"Recording health metrics failed: {str(e)}")
+            return {}
+
+    def save_routing_table(self, config_data: Dict[str, Any]) -> Optional[str]:
+        """Parse the routing table into its compact trie form for fleet-wide lookups"""
+        if not ROUTING_SETTINGS['save_tables']:
+            return None
+        try:
+            output = next(
+                (data['output'] for commands in config_data.values()
+                 for cmd, data in commands.items() if cmd.startswith('display ip routing-table')),
+                None
+            )
+            if not output or output.startswith('ERROR:'):
+                return None
+            table = run_cpu_bound(parse_routing_table, output)
+            path = table.save(routing_table_path(self.device_info['host']))
+            self.logger.info(f"Routing table saved: {len(table)} routes to {path}")
+            return path
+        except Exception as e:
+            self.logger.error(f"Saving routing table failed: {str(e)}")
+            return None
+
+    def compare_with_previous(self, config_data: Dict[str, Any], current_snapshot: Optional[str] = None) -> Optional[str]:
+        """Diff the configuration against this device's previous snapshot and save a change report"""
+        try:
+            new_text = next(
+                (data['output'] for commands in config_data.values()
+                 for cmd, data in commands.items() if cmd.startswith(CONFIG_COMMAND_PREFIX)),
+                None
+            )
+            pattern = os.path.join(project_root, 'output', 'snapshots', f"snapshot_{self.device_info['host']}_*.json")
+            previous = [p for p in sorted(glob.glob(pattern)) if p != current_snapshot]
+            if new_text is None or new_text.startswith('ERROR:') or not previous:
+                return None
+
+            # the previous snapshot is read by whichever process runs the diff
+            changes, self.config_changes = run_cpu_bound(diff_against_file, previous[-1], new_text)
+            self.metrics['config_changes'] = len(changes)
+
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            report_path = os.path.join(project_root, 'output', 'reports', f"changes_{self.device_info['host']}_{timestamp}.md")
+            with open(report_path, "w", encoding="utf-8") as f:
+                f.write(f"# Configuration Changes\n\n")
+                f.write(f"- Device IP: {self.device_info['host']}\n")
+                f.write(f"- Compared with: {os.path.basename(previous[-1])}\n")
+                f.write(f"- Changes: {len(changes)}\n\n")
+                f.write(f"```\n{self.config_changes}\n```\n")
+            self.logger.info(f"{len(changes)} configuration changes since last collection, report: {report_path}")
+            return report_path
+        except Exception as e:
+            self.logger.error(f"Configuration diff failed: {str(e)}")
+            return None
+
+    def save_snapshot(self, config_data: Dict[str, Any]) -> str:
+        """Save the collected data as JSON so later stages can run without reconnecting"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_path = os.path.join(project_root, 'output', 'snapshots', f"snapshot_{self.device_info['host']}_{timestamp}.json")
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(config_data, f, ensure_ascii=False)
+        self.logger.info(f"Snapshot saved to: {file_path}")
+        return file_path
+
+    @staticmethod
+    def load_snapshot(file_path: str) -> Dict[str, Any]:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_analysis(self, analysis: str) -> str:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_path = os.path.join(project_root, 'output', 'snapshots', f"analysis_{self.device_info['host']}_{timestamp}.md")
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(analysis)
+        return file_path
+
+    def run(self, journal: Optional[RunJournal] = None) -> Tuple[str, str]:
+        """
+        Run the inspection stages: collect, save, analyze, report.
+
+        With a journal, each completed stage is recorded together with the file
+        it produced, and stages the journal already marks as done are skipped,
+        so a resumed run never reconnects to a device whose data is collected.
+        """
+        device_ip = self.device_info['host']
+        stage = 'collected'
+        try:
+            if journal and journal.is_done(device_ip, 'collected'):
+                config_data = self.load_snapshot(journal.ref(device_ip, 'collected'))
+                self.logger.info(f"Reusing collected snapshot: {journal.ref(device_ip, 'collected')}")
+            else:
+                with span('collect'):
+                    config_data = self.collect_data()
+                with span('metrics', profile=True):
+                    self.health_metrics = self.record_metrics(config_data)
+                with span('routing_table', profile=True):
+                    self.save_routing_table(config_data)
+                snapshot_path = None
+                if journal:
+                    with span('save', kind='snapshot'):
+                        snapshot_path = self.save_snapshot(config_data)
+                    journal.mark(device_ip, 'collected', ref=snapshot_path)
+                with span('diff', profile=True):
+                    self.compare_with_previous(config_data, snapshot_path)
+
+            stage = 'saved'
+            if journal and journal.is_done(device_ip, 'saved'):
+                raw_config_path = journal.ref(device_ip, 'saved')
+            else:
+                with span('save', kind='raw_config'):
+                    raw_config_path = self.save_raw_data(config_data)
+                if journal:
+                    journal.mark(device_ip, 'saved', ref=raw_config_path)
             self.logger.info(f"Original config saved to: {raw_config_path}")
-            analysis_result = self.analyze_data(config_data)
-            report_path = self.save_report(analysis_result)
+
+            stage = 'analyzed'
+            if journal and journal.is_done(device_ip, 'reported'):
+                report_path = journal.ref(device_ip, 'reported')
+            elif ANALYSIS_SETTINGS['streaming'] and not (journal and journal.is_done(device_ip, 'analyzed')):
+                analysis_result, report_path = self.analyze_data_streaming(config_data)
+                if journal:
+                    journal.mark(device_ip, 'analyzed', ref=report_path)
+                    journal.mark(device_ip, 'reported', ref=report_path)
+            else:
+                if journal and journal.is_done(device_ip, 'analyzed'):
+                    with open(journal.ref(device_ip, 'analyzed'), "r", encoding="utf-8") as f:
+                        analysis_result = f.read()
+                else:
+                    analysis_result = self.analyze_data(config_data)
+                    if journal:
+                        journal.mark(device_ip, 'analyzed', ref=self.save_analysis(analysis_result))
+                stage = 'reported'
+                with span('report'):
+                    report_path = self.save_report(analysis_result)
+                if journal:
+                    journal.mark(device_ip, 'reported', ref=report_path)
             self.logger.info(f"Report saved to: {report_path}")
+            if self.metrics:
+                self.logger.info(f"Analysis metrics: {self.metrics}")
             return raw_config_path, report_path
         except Exception as e:
+            if journal:
+                journal.mark(device_ip, stage, status='failed', error=str(e))
             self.logger.error(f"Inspection failed: {str(e)}", exc_info=True)
             raise
 
     def _format_config_data(self, config_data: Dict[str, Any]) -> str:
+        if ANALYSIS_SETTINGS['compact_prompt']:
+            raw_length = sum(len(data['output']) for commands in config_data.values() for data in commands.values())
+            compacted = run_cpu_bound(compact_config_data, config_data)
+            self.metrics['prompt_chars_raw'] = raw_length
+            self.metrics['prompt_chars_compact'] = len(compacted)
+            self.logger.info(f"Prompt compacted from {raw_length} to {len(compacted)} characters")
+            if self.config_changes:
+                compacted += f"\n\n=== CHANGES SINCE PREVIOUS COLLECTION ===\n{self.config_changes}"
+            return compacted
+
         formatted_config = []
         for category, commands in config_data.items():
             formatted_config.append(f"\n=== {category.upper()} ===")
@@ -281,40 +683,179 @@ class USG12004Inspector:
 
 
 # Async inspection function
-async def inspect_device_async(device: dict) -> dict:
+async def inspect_device_async(device: dict, journal: Optional[RunJournal] = None,
+                               warm: Optional[Dict[str, Any]] = None) -> dict:
+    """Inspect one device in a worker thread; warm holds USG12004Inspector keyword arguments to reuse"""
     logger = get_logger("async_inspection")
     loop = asyncio.get_running_loop()
     device_ip = device["ip"]
+    if journal and journal.is_complete(device_ip):
+        logger.info(f"Skipping {device_ip}: already reported in {journal.path}", extra={'print_console': True})
+        return {
+            "ip": device_ip,
+            "status": "success",
+            "raw_config": journal.ref(device_ip, 'saved'),
+            "report": journal.ref(device_ip, 'reported'),
+            "resumed": True
+        }
     logger.info(f"Starting to inspect: {device_ip}", extra={'print_console': True})
+    profile = ConfigLoader.classify(device.get('model'))['profile']
+    if profile != 'usg12004':
+        logger.warning(f"{device_ip}: model {device.get('model')} is not classified as USG12004 (profile: {profile})")
     try:
         device_info = ConfigLoader.get_device_info(device_ip, 'firewall')
-        inspector = USG12004Inspector(device_info)
-        raw_config, report = await loop.run_in_executor(None, inspector.run)
+        kwargs = dict(warm or {})
+        # the inventory entry can opt the device in or out of the configuration file transfer
+        if device.get('config_transfer') is not None:
+            kwargs['config_transfer'] = bool(device['config_transfer'])
+        inspector = USG12004Inspector(device_info, **kwargs)
+        # the copied context carries the current span (e.g. the fleet run) into the worker thread
+        raw_config, report = await loop.run_in_executor(
+            None, contextvars.copy_context().run, _run_traced, inspector, journal
+        )
         return {
             "ip": device_ip,
             "status": "success",
             "raw_config": raw_config,
-            "report": report
+            "report": report,
+            "metrics": inspector.metrics,
+            "health": inspector.health_metrics
         }
     except Exception as e:
         logger.error(f"{device_ip} inspecting failed: {str(e)}", exc_info=True, extra={'print_console': True})
         return {
             "ip": device_ip,
             "status": "failed",
-            "error": str(e)
+            "error": str(e),
+            "error_kind": e.details.get('kind') if isinstance(e, NetworkAutomationError) else None
         }
 
 
+def probe_target(device_ip: str) -> Tuple[str, int]:
+    """Address and port to probe: the device's SSH port, or its bastion when it sits behind a jump host"""
+    try:
+        device_info = ConfigLoader.get_device_info(device_ip, 'firewall')
+    except Exception:
+        return device_ip, 22
+    jump_host = device_info.get('jump_host')
+    if jump_host:
+        return jump_host['host'], jump_host['port']
+    return device_info['host'], device_info['port']
+
+
+def _run_traced(inspector: USG12004Inspector, journal: Optional[RunJournal]) -> Tuple[str, str]:
+    with span('inspect', device=inspector.device_info['host']):
+        return inspector.run(journal)
+
+
+async def preflight_check(devices: List[dict], journal: RunJournal, breaker: CircuitBreaker) -> Dict[str, Exception]:
+    """
+    Probe SSH reachability of every device that still needs collecting.
+
+    Returns:
+        dict of ip -> error for devices that must not be inspected this run
+    """
+    logger = get_logger("preflight")
+    blocked = {}
+    to_probe = []
+    for device in devices:
+        device_ip = device["ip"]
+        if journal.is_done(device_ip, 'collected'):
+            continue
+        if breaker.is_open(device_ip):
+            blocked[device_ip] = ConnectionError(
+                f"Circuit open for {device_ip}, skipped after recent failures",
+                {"host": device_ip, "kind": "circuit_open"}
+            )
+        else:
+            to_probe.append(device_ip)
+
+    start_time = time.time()
+    probes = await probe_hosts(to_probe, targets={device_ip: probe_target(device_ip) for device_ip in to_probe})
+    for device_ip, probe in probes.items():
+        if not probe['reachable']:
+            blocked[device_ip] = probe['error']
+            breaker.record_failure(device_ip, probe['error'].details.get('kind', 'error'))
+
+    logger.info(
+        f"Pre-flight: probed {len(to_probe)} devices in {round(time.time() - start_time, 2)} seconds, "
+        f"{len(blocked)} skipped",
+        extra={'print_console': True}
+    )
+    return blocked
+
+
+async def skip_device_async(device_ip: str, error: Exception, journal: RunJournal) -> dict:
+    journal.mark(device_ip, 'collected', status='failed', error=str(error))
+    return {
+        "ip": device_ip,
+        "status": "failed",
+        "error": str(error),
+        "error_kind": getattr(error, 'details', {}).get('kind')
+    }
+
+
+async def inspect_fleet_async(devices: List[dict], journal: RunJournal,
+                              warm: Optional[Dict[str, Any]] = None) -> Tuple[List[dict], str]:
+    """
+    Pre-flight, inspect and summarize a list of devices.
+
+    Returns:
+        the per-device results and the path of the fleet summary
+    """
+    with span('fleet', devices=len(devices)):
+        breaker = CircuitBreaker()
+        with span('preflight'):
+            blocked = await preflight_check(devices, journal, breaker)
+
+        tasks = [
+            skip_device_async(device["ip"], blocked[device["ip"]], journal) if device["ip"] in blocked
+            else inspect_device_async(device, journal, warm)
+            for device in devices
+        ]
+
+        # reports are rendered and folded into the fleet summary as each device finishes
+        renderer = ReportRenderer(REPORT_SETTINGS['render_workers'])
+        results = []
+        try:
+            for task in asyncio.as_completed(tasks):
+                result = await task
+                results.append(result)
+                if result["ip"] not in blocked:
+                    if result["status"] == "success":
+                        breaker.record_success(result["ip"])
+                    elif result.get("error_kind"):
+                        breaker.record_failure(result["ip"], result["error_kind"])
+                await renderer.add_result(result)
+        finally:
+            renderer.close()
+            breaker.save()
+        return results, renderer.summary.markdown_path
+
+
 # Async entry point
-async def main_async():
+async def main_async(resume: Optional[str] = None, config_transfer: bool = False):
     logger = get_logger("main_async")
     devices = ConfigLoader.get_devices('firewall')
     if not devices:
         logger.info("No configuration found!", extra={'print_console': True})
         return
 
-    tasks = [inspect_device_async(device) for device in devices]
-    results = await asyncio.gather(*tasks, return_exceptions=False)
+    journal = None
+    if resume == 'latest':
+        journal = RunJournal.latest()
+        if journal is None:
+            logger.info("No previous run journal found, starting a new run", extra={'print_console': True})
+    elif resume:
+        journal = RunJournal(resume)
+    if journal is None:
+        journal = RunJournal()
+    else:
+        logger.info(f"Resuming run from journal: {journal.path} {journal.summary()}", extra={'print_console': True})
+    logger.info(f"Run journal: {journal.path}", extra={'print_console': True})
+
+    results, summary_path = await inspect_fleet_async(devices, journal,
+                                                      {'config_transfer': True} if config_transfer else None)
 
     success_count = sum(1 for r in results if r["status"] == "success")
     failed_count = sum(1 for r in results if r["status"] == "failed")
@@ -326,19 +867,29 @@ async def main_async():
     logger.info(f"Success count: {success_count}", extra={'print_console': True})
     logger.info(f"Failure count: {failed_count}", extra={'print_console': True})
 
+    logger.info(f"Fleet summary: {summary_path}", extra={'print_console': True})
+
     for result in results:
         if result["status"] == "success":
             logger.info(f"Device {result['ip']}: status: success", extra={'print_console': True})
             logger.info(f"Original config saving path: {result['raw_config']}", extra={'print_console': True})
             logger.info(f"Report saving path: {result['report']}", extra={'print_console': True})
+            if result.get('metrics'):
+                logger.info(f"Metrics: {result['metrics']}", extra={'print_console': True})
         else:
             logger.info(f"Device {result['ip']}: status: failed", extra={'print_console': True})
             logger.info(f"Error: {result['error']}", extra={'print_console': True})
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HUAWEI USG12004 fleet inspection")
+    parser.add_argument('--resume', nargs='?', const='latest', default=None, metavar='JOURNAL',
+                        help="resume the latest run (or the given journal file), skipping completed stages")
+    parser.add_argument('--config-transfer', action='store_true',
+                        help="download configurations over SFTP/SCP unless a device sets config_transfer: false")
+    args = parser.parse_args()
     try:
-        asyncio.run(main_async())
+        asyncio.run(main_async(resume=args.resume, config_transfer=args.config_transfer))
     except Exception as e:
         main_logger = get_logger("main")
         main_logger.error(f"Tasks failed: {str(e)}", exc_info=True, extra={'print_console': True})
@@ -1,118 +1,201 @@
-#This script need to be refactored to get the NAT policy configuration from the Huawei firewall.
+# operation/firewall/huawei/get_natpolicy.py
 
-from netmiko import ConnectHandler
+import os
 import re
-import pandas as pd
+import csv
+import sys
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-
-
-def connect_to_device(device_ip, username, password):
-    """connect to the device"""
-    device = {
-        'device_type': 'huawei',
-        'host': device_ip,
-        'username': username,
-        'password': password,
-        'port': 22,
-    }
-
-    try:
-        connection = ConnectHandler(**device)
-        return connection
-    except Exception as e:
-        print(f"Connecting failed: {str(e)}")
-        return None
-
-
-def parse_nat_server(text):
-    """parse the NAT server configuration"""
-    servers = []
-
-    # Use regular expression to extract each server block
-    server_blocks = re.finditer(r'server name\s*:\s*(\S+).*?(?=server name|$)', text, re.DOTALL)
-
-    for block in server_blocks:
-        block_text = block.group(0)
+from typing import Dict, Any, Iterator, List, Optional
+
+from openpyxl import Workbook
+
+from connect.device_connector import DeviceConnector
+from utils.config_loader import ConfigLoader
+from utils.logger import get_logger
+from utils.settings import BASE_DIR
+
+EXPORT_DIR = os.path.join(BASE_DIR, 'output', 'nat')
+
+# Define the fields and their regular expressions
+NAT_SERVER_FIELDS = {
+    'server_name': r'server name\s*:\s*(\S+)',
+    'global_start_addr': r'global-start-addr\s*:\s*(\S+)',
+    'global_end_addr': r'global-end-addr\s*:\s*(\S+)',
+    'inside_start_addr': r'inside-start-addr\s*:\s*(\S+)',
+    'inside_end_addr': r'inside-end-addr\s*:\s*(\S+)',
+    'global_start_port': r'global-start-port\s*:\s*(\S+)',
+    'global_end_port': r'global-end-port\s*:\s*(\S+)',
+    'inside_start_port': r'inside-start-port\s*:\s*(\S+)',
+    'inside_end_port': r'inside-end-port\s*:\s*(\S+)',
+    'globalvpn': r'globalvpn\s*:\s*(\S+)',
+    'insidevpn': r'insidevpn\s*:\s*(\S+)',
+    'vsys': r'vsys\s*:\s*(\S+)',
+    'zone': r'zone\s*:\s*(\S+)',
+    'protocol': r'protocol\s*:\s*(\S+)',
+    'vrrp': r'vrrp\s*:\s*(\S+)',
+    'no_reverse': r'no-reverse\s*:\s*(\S+)',
+    'nat_disable': r'nat-disable\s*:\s*(\S+)',
+    'route': r'route\s*:\s*(\S+)',
+    'description': r'description\s*:\s*(\S+)',
+    'tunnel_id': r'tunnel-id\s*:\s*(\S+)',
+    'cpe_addr': r'CPE-addr\s*:\s*(\S+)'
+}
+_FIELD_PATTERNS = {field: re.compile(pattern) for field, pattern in NAT_SERVER_FIELDS.items()}
+_SERVER_START = re.compile(r'server name\s*:')
+
+EXPORT_COLUMNS = ['device'] + list(NAT_SERVER_FIELDS)
+
+
+def iter_nat_servers(text: str) -> Iterator[Dict[str, str]]:
+    """Yield the NAT servers of "display nat server" output one block at a time"""
+    starts = [match.start() for match in _SERVER_START.finditer(text)]
+    for i, start in enumerate(starts):
+        block_text = text[start:starts[i + 1] if i + 1 < len(starts) else len(text)]
         server_dict = {}
-
-        # Define the fields and their regular expressions
-        fields = {
-            'server_name': r'server name\s*:\s*(\S+)',
-            'global_start_addr': r'global-start-addr\s*:\s*(\S+)',
-            'global_end_addr': r'global-end-addr\s*:\s*(\S+)',
-            'inside_start_addr': r'inside-start-addr\s*:\s*(\S+)',
-            'inside_end_addr': r'inside-end-addr\s*:\s*(\S+)',
-            'global_start_port': r'global-start-port\s*:\s*(\S+)',
-            'global_end_port': r'global-end-port\s*:\s*(\S+)',
-            'inside_start_port': r'inside-start-port\s*:\s*(\S+)',
-            'inside_end_port': r'inside-end-port\s*:\s*(\S+)',
-            'globalvpn': r'globalvpn\s*:\s*(\S+)',
-            'insidevpn': r'insidevpn\s*:\s*(\S+)',
-            'vsys': r'vsys\s*:\s*(\S+)',
-            'zone': r'zone\s*:\s*(\S+)',
-            'protocol': r'protocol\s*:\s*(\S+)',
-            'vrrp': r'vrrp\s*:\s*(\S+)',
-            'no_reverse': r'no-reverse\s*:\s*(\S+)',
-            'nat_disable': r'nat-disable\s*:\s*(\S+)',
-            'route': r'route\s*:\s*(\S+)',
-            'description': r'description\s*:\s*(\S+)',
-            'tunnel_id': r'tunnel-id\s*:\s*(\S+)',
-            'cpe_addr': r'CPE-addr\s*:\s*(\S+)'
-        }
-
         # Extract the values for each field
-        for field, pattern in fields.items():
-            match = re.search(pattern, block_text)
+        for field, pattern in _FIELD_PATTERNS.items():
+            match = pattern.search(block_text)
             server_dict[field] = match.group(1) if match else '---'
+        yield server_dict
 
-        servers.append(server_dict)
-
-    return servers
 
+def parse_nat_server(text):
+    """parse the NAT server configuration"""
+    return list(iter_nat_servers(text))
 
-def main():
-    # device information
-    device_ip = ""
-    username = ""
-    password = ""
-
-    # connect to the device
-    connection = connect_to_device(device_ip, username, password)
-    if not connection:
-        return
 
+def fetch_nat_server(device: Dict[str, Any]) -> Dict[str, Any]:
+    """Fetch "display nat server" from one firewall (runs in a worker thread)"""
+    logger = get_logger('nat_export')
+    connector = None
     try:
-        # send command to the device
-        output = connection.send_command("display nat server")
-
-        # parse the NAT server configuration
-        servers = parse_nat_server(output)
-
-        # Create DataFrame
-        df = pd.DataFrame(servers)
-
-        # Display all columns
-        pd.set_option('display.max_columns', None)
-        pd.set_option('display.width', None)
-        pd.set_option('display.max_rows', None)
-
-        # Display the NAT server configuration
-        print("\nNAT Server Configuration Table:")
-        print(df)
+        connector = DeviceConnector(ConfigLoader.get_device_info(device['ip'], 'firewall'))
+        connector.connect()
+        connector.send_command('screen-length 0 temporary')
+        output = connector.send_command('display nat server')
+        return {'ip': device['ip'], 'status': 'success', 'output': output}
+    except Exception as e:
+        logger.error(f"{device['ip']}: fetching NAT servers failed: {str(e)}")
+        return {'ip': device['ip'], 'status': 'failed', 'error': str(e)}
+    finally:
+        if connector:
+            connector.disconnect()
+
+
+class XlsxNatWriter:
+    """Write-only workbook with one sheet per firewall; rows are flushed to disk as they are appended"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+
+    def write_device(self, device_ip: str, rows: Iterator[Dict[str, str]]) -> int:
+        # sheet titles are limited to 31 characters and cannot contain : \ / ? * [ ]
+        sheet = self.workbook.create_sheet(title=re.sub(r'[:\\/?*\[\]]', '_', device_ip)[:31])
+        sheet.append(EXPORT_COLUMNS)
+        count = 0
+        for row in rows:
+            sheet.append([device_ip] + [row[field] for field in NAT_SERVER_FIELDS])
+            count += 1
+        return count
+
+    def close(self) -> str:
+        if not self.workbook.worksheets:
+            self.workbook.create_sheet(title='empty')
+        self.workbook.save(self.path)
+        return self.path
+
+
+class CsvNatWriter:
+    """One CSV partition per firewall inside the export directory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write_device(self, device_ip: str, rows: Iterator[Dict[str, str]]) -> int:
+        filename = os.path.join(self.path, f"nat_servers_{device_ip}.csv")
+        count = 0
+        with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            for row in rows:
+                writer.writerow([device_ip] + [row[field] for field in NAT_SERVER_FIELDS])
+                count += 1
+        return count
+
+    def close(self) -> str:
+        return self.path
+
+
+async def export_fleet_nat_servers_async(output_format: str = 'xlsx', path: Optional[str] = None,
+                                         devices: Optional[List[Dict[str, Any]]] = None,
+                                         max_concurrency: int = 16) -> Dict[str, Any]:
+    """
+    Export the NAT servers of every firewall in config/firewall.yaml.
+
+    Outputs are fetched concurrently. Each device's rows are parsed lazily and
+    streamed into the writer as soon as its output arrives, so memory is
+    bounded by the outputs in flight, not by the total number of rows.
+    Parsing and writing run on a single writer thread, off the event loop
+    and one device at a time, since the writers are not thread-safe.
+
+    Args:
+        output_format: 'xlsx' (one sheet per device) or 'csv' (one file per device)
+        path: export file (xlsx) or directory (csv), defaults to output/nat
+        devices: firewalls to export, defaults to the whole inventory
+        max_concurrency: firewalls fetched at once
+
+    Returns:
+        {'path': export path, 'rows': rows per device, 'results': per-device status}
+    """
+    logger = get_logger('nat_export')
+    if devices is None:
+        devices = ConfigLoader.get_devices('firewall') or []
+    firewalls = [d for d in devices if d and d.get('ip')]
+
+    if not path:
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        path = os.path.join(EXPORT_DIR, f"nat_servers_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        if output_format == 'xlsx':
+            path += '.xlsx'
+    writer = XlsxNatWriter(path) if output_format == 'xlsx' else CsvNatWriter(path)
+
+    loop = asyncio.get_running_loop()
+    rows, results = {}, []
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor, \
+            ThreadPoolExecutor(max_workers=1) as write_executor:
+        tasks = [loop.run_in_executor(executor, fetch_nat_server, device) for device in firewalls]
+        for future in asyncio.as_completed(tasks):
+            result = await future
+            output = result.pop('output', None)
+            if output is not None:
+                rows[result['ip']] = await loop.run_in_executor(
+                    write_executor, writer.write_device, result['ip'], iter_nat_servers(output)
+                )
+                logger.info(f"{result['ip']}: {rows[result['ip']]} NAT servers exported")
+            results.append(result)
+        export_path = await loop.run_in_executor(write_executor, writer.close)
+    return {'path': export_path, 'rows': rows, 'results': results}
 
-        # Export the configuration to an Excel file
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        excel_filename = f"nat_servers_{timestamp}.xlsx"
-        df.to_excel(excel_filename, index=False)
-        print(f"\nConfiguration exported to {excel_filename}")
 
-    except Exception as e:
-        print(f"Error: {str(e)}")
+def main():
+    parser = argparse.ArgumentParser(description="Export NAT servers of all firewalls")
+    parser.add_argument('--format', choices=['xlsx', 'csv'], default='xlsx')
+    parser.add_argument('--output', default=None, help="xlsx file or csv directory (default: output/nat)")
+    parser.add_argument('--concurrency', type=int, default=16, help="firewalls fetched at once")
+    args = parser.parse_args()
 
-    finally:
-        # disconnect from the device
-        connection.disconnect()
+    logger = get_logger('nat_export')
+    export = asyncio.run(export_fleet_nat_servers_async(args.format, args.output, max_concurrency=args.concurrency))
+    failed = [r for r in export['results'] if r['status'] == 'failed']
+    logger.info(f"NAT export: {sum(export['rows'].values())} rows from {len(export['rows'])} firewalls, "
+                f"{len(failed)} failed, written to {export['path']}")
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,381 @@
+# operation/switch/huawei/get_vlan_config.py
+
+import os
+import re
+import sys
+import json
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from connect.device_connector import DeviceConnector
+from operation.switch.huawei.vlan_common import (
+    bitmap_from_text, format_bitmap, parse_vlan_summary, to_bitmap
+)
+from utils.config_loader import ConfigLoader
+from utils.logger import get_logger
+from utils.settings import BASE_DIR, VLAN_PUSH_SETTINGS
+
+VLAN_DIR = os.path.join(BASE_DIR, 'output', 'vlan')
+
+VLAN_COMMANDS = [
+    'display vlan summary',
+    'display port vlan',
+    'display lldp neighbor brief',
+    'display current-configuration | include ^sysname|^interface|eth-trunk',
+]
+
+_LINK_TYPES = ('access', 'trunk', 'hybrid', 'qinq', 'dot1q-tunnel', 'desirable', 'auto')
+
+# long interface names (display port vlan) -> short names (display lldp neighbor brief)
+_INTERFACE_ABBREVIATIONS = [
+    ('XGigabitEthernet', 'XGE'),
+    ('GigabitEthernet', 'GE'),
+    ('MultiGE', 'MultiGE'),
+    ('Ethernet', 'Eth'),
+]
+
+
+def normalize_interface(name: str) -> str:
+    for long_name, short_name in _INTERFACE_ABBREVIATIONS:
+        if name.startswith(long_name):
+            return short_name + name[len(long_name):]
+    return name
+
+
+def parse_port_vlan(output: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Parse "display port vlan" into per-port VLAN bitmaps.
+
+    VLAN lists may wrap onto continuation lines; hybrid ports on CE switches
+    prefix their lists with "U:"/"T:". Access ports carry only their PVID.
+
+    Returns:
+        dict of normalized port name -> {'link_type', 'pvid', 'allowed' (bitmap)}
+    """
+    ports = {}
+    current = None
+    for line in output.splitlines():
+        if not line.strip() or line.strip().startswith('-') or line.lstrip().startswith('Port'):
+            continue
+        tokens = line.split()
+        if not line[0].isspace() and len(tokens) >= 3 and tokens[1].lower() in _LINK_TYPES:
+            pvid = int(tokens[2]) if tokens[2].isdigit() else None
+            current = {'link_type': tokens[1].lower(), 'pvid': pvid, 'allowed': 0}
+            ports[normalize_interface(tokens[0])] = current
+            vlan_text = ' '.join(tokens[3:])
+        elif current is not None and line[0].isspace():
+            vlan_text = line
+        else:
+            current = None
+            continue
+        if current['link_type'] == 'access':
+            current['allowed'] = to_bitmap([current['pvid']]) if current['pvid'] else 0
+        else:
+            current['allowed'] |= bitmap_from_text(re.sub(r'\b[UT]:', ' ', vlan_text))
+    return ports
+
+
+def parse_lldp_neighbors(output: str) -> Dict[str, Tuple[str, str]]:
+    """
+    Parse "display lldp neighbor brief" in either column order.
+
+    huawei (VRP5):     Local Intf  Neighbor Dev  Neighbor Intf  Exptime
+    huawei_vrpv8 (CE): Local Interface  Exptime(s)  Neighbor Interface  Neighbor Device
+
+    Returns:
+        dict of normalized local port -> (neighbor system name, normalized neighbor port)
+    """
+    neighbors = {}
+    device_last = None
+    for line in output.splitlines():
+        lowered = line.lower()
+        if lowered.lstrip().startswith('local'):
+            device_last = lowered.find('exptime') < lowered.find('neighbor dev')
+            continue
+        tokens = line.split()
+        if device_last is None or len(tokens) < 4 or line.strip().startswith('-'):
+            continue
+        if device_last:
+            local, remote_port, remote_device = tokens[0], tokens[2], ' '.join(tokens[3:])
+        else:
+            local, remote_device, remote_port = tokens[0], tokens[1], tokens[2]
+        neighbors[normalize_interface(local)] = (remote_device, normalize_interface(remote_port))
+    return neighbors
+
+
+def parse_interface_config(output: str) -> Tuple[Optional[str], Dict[str, str]]:
+    """
+    Parse the filtered configuration for the system name and Eth-Trunk membership.
+
+    Returns:
+        (sysname, dict of normalized member port -> Eth-Trunk name)
+    """
+    sysname = None
+    members = {}
+    interface = None
+    for line in output.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('sysname '):
+            sysname = stripped.split(None, 1)[1]
+        elif stripped.startswith('interface '):
+            interface = normalize_interface(stripped.split(None, 1)[1])
+        elif interface and re.match(r'eth-trunk \d+$', stripped, re.IGNORECASE):
+            members[interface] = f"Eth-Trunk{stripped.split()[1]}"
+    return sysname, members
+
+
+def collect_switch_vlans(device: Dict[str, Any]) -> Dict[str, Any]:
+    """Collect the VLAN membership of one switch (runs in a worker thread)"""
+    logger = get_logger('vlan_collect')
+    ip = device['ip']
+    connector = None
+    try:
+        device_info = ConfigLoader.get_device_info(ip, 'switch')
+        connector = DeviceConnector(device_info)
+        connector.connect()
+        connector.send_command('screen-length 0 temporary')
+        outputs = connector.send_commands(VLAN_COMMANDS)
+        sysname, members = parse_interface_config(outputs[VLAN_COMMANDS[3]])
+        switch = {
+            'ip': ip,
+            'name': device.get('name') or '',
+            'sysname': sysname or device.get('name') or ip,
+            'device_type': device_info['device_type'],
+            'defined': to_bitmap(parse_vlan_summary(outputs['display vlan summary'])),
+            'ports': parse_port_vlan(outputs['display port vlan']),
+            'neighbors': parse_lldp_neighbors(outputs['display lldp neighbor brief']),
+            'trunk_members': members,
+        }
+        logger.info(f"{ip}: {len(switch['ports'])} ports, {bin(switch['defined']).count('1')} VLANs")
+        return {'ip': ip, 'status': 'success', 'switch': switch}
+    except Exception as e:
+        logger.error(f"{ip}: VLAN collection failed: {str(e)}")
+        return {'ip': ip, 'status': 'failed', 'error': str(e)}
+    finally:
+        if connector:
+            connector.disconnect()
+
+
+class VlanFleet:
+    """
+    VLAN membership of the whole switch fleet.
+
+    Defined VLANs and every port's allowed VLANs are 4096-bit bitmaps (Python
+    ints), so fleet questions are a handful of AND/OR/XOR operations per
+    switch or link instead of set operations over VLAN lists.
+    """
+
+    def __init__(self, switches: Optional[List[Dict[str, Any]]] = None):
+        self.switches: Dict[str, Dict[str, Any]] = {}
+        for switch in switches or []:
+            self.add(switch)
+
+    def add(self, switch: Dict[str, Any]) -> None:
+        self.switches[switch['ip']] = switch
+
+    def _by_sysname(self) -> Dict[str, Dict[str, Any]]:
+        return {switch['sysname']: switch for switch in self.switches.values()}
+
+    @staticmethod
+    def _port(switch: Dict[str, Any], port: str) -> Optional[Dict[str, Any]]:
+        """Port entry, following an Eth-Trunk member to its trunk"""
+        port = switch['trunk_members'].get(port, port)
+        return switch['ports'].get(port)
+
+    @staticmethod
+    def access_bitmap(switch: Dict[str, Any]) -> int:
+        """VLANs with access ports or used as a PVID on this switch"""
+        bitmap = 0
+        for port in switch['ports'].values():
+            if port['pvid'] and port['pvid'] != 1:
+                bitmap |= 1 << port['pvid']
+        return bitmap
+
+    def links(self) -> List[Dict[str, Any]]:
+        """
+        Switch-to-switch links found through LLDP between collected switches.
+
+        Each link carries the bitmap allowed on either end; a link is listed once
+        even when both ends report it.
+        """
+        by_sysname = self._by_sysname()
+        links, seen = [], set()
+        for switch in self.switches.values():
+            for local_port, (remote_name, remote_port) in switch['neighbors'].items():
+                remote = by_sysname.get(remote_name)
+                if remote is None:
+                    continue
+                local_key = (switch['ip'], switch['trunk_members'].get(local_port, local_port))
+                remote_key = (remote['ip'], remote['trunk_members'].get(remote_port, remote_port))
+                key = tuple(sorted((local_key, remote_key)))
+                if key in seen:
+                    continue
+                seen.add(key)
+                local_entry = self._port(switch, local_port)
+                remote_entry = self._port(remote, remote_port)
+                links.append({
+                    'a': local_key, 'b': remote_key,
+                    'a_allowed': local_entry['allowed'] if local_entry else 0,
+                    'b_allowed': remote_entry['allowed'] if remote_entry else 0,
+                })
+        return links
+
+    # ---- fleet questions --------------------------------------------------
+
+    def where_defined(self, vlan: int) -> List[str]:
+        bit = 1 << vlan
+        return sorted(ip for ip, switch in self.switches.items() if switch['defined'] & bit)
+
+    def ports_carrying(self, vlan: int) -> List[Tuple[str, str]]:
+        bit = 1 << vlan
+        return sorted(
+            (ip, name) for ip, switch in self.switches.items()
+            for name, port in switch['ports'].items() if port['allowed'] & bit
+        )
+
+    def missing_on_trunks(self, vlan: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Links that do not carry VLANs needed on both sides.
+
+        A VLAN is needed on a link when both switches define it and at least
+        one end allows it; it is missing when the other end does not. Without
+        a vlan argument every such VLAN is reported.
+        """
+        mask = (1 << vlan) if vlan is not None else -1
+        results = []
+        for link in self.links():
+            a, b = self.switches[link['a'][0]], self.switches[link['b'][0]]
+            needed = a['defined'] & b['defined'] & (link['a_allowed'] | link['b_allowed']) & mask
+            missing = needed & ~(link['a_allowed'] & link['b_allowed'])
+            if missing:
+                results.append({
+                    'link': f"{link['a'][0]} {link['a'][1]} <-> {link['b'][0]} {link['b'][1]}",
+                    'missing_on_a': format_bitmap(missing & ~link['a_allowed']),
+                    'missing_on_b': format_bitmap(missing & ~link['b_allowed']),
+                })
+        return results
+
+    def defined_but_unused(self) -> Dict[str, str]:
+        """
+        VLANs defined on a switch but used as an access VLAN/PVID nowhere in the fleet.
+
+        Returns:
+            dict of switch ip -> VLAN list
+        """
+        fleet_access = 0
+        for switch in self.switches.values():
+            fleet_access |= self.access_bitmap(switch)
+        unused = {}
+        for ip, switch in self.switches.items():
+            bitmap = switch['defined'] & ~fleet_access & ~(1 << 1)
+            if bitmap:
+                unused[ip] = format_bitmap(bitmap)
+        return unused
+
+    def used_but_undefined(self) -> Dict[str, str]:
+        """VLANs assigned to access ports/PVIDs on a switch that does not define them"""
+        result = {}
+        for ip, switch in self.switches.items():
+            bitmap = self.access_bitmap(switch) & ~switch['defined']
+            if bitmap:
+                result[ip] = format_bitmap(bitmap)
+        return result
+
+    # ---- persistence ------------------------------------------------------
+
+    def save(self, filename: Optional[str] = None) -> str:
+        """Save the fleet with bitmaps as hex strings (512 bytes per port at most)"""
+        if not filename:
+            os.makedirs(VLAN_DIR, exist_ok=True)
+            filename = os.path.join(VLAN_DIR, f"vlan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        data = []
+        for switch in self.switches.values():
+            data.append({
+                **switch,
+                'defined': format(switch['defined'], 'x'),
+                'ports': {name: {**port, 'allowed': format(port['allowed'], 'x')}
+                          for name, port in switch['ports'].items()},
+            })
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        return filename
+
+    @classmethod
+    def load(cls, filename: str) -> 'VlanFleet':
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        fleet = cls()
+        for switch in data:
+            switch['defined'] = int(switch['defined'], 16)
+            for port in switch['ports'].values():
+                port['allowed'] = int(port['allowed'], 16)
+            switch['neighbors'] = {port: tuple(peer) for port, peer in switch['neighbors'].items()}
+            fleet.add(switch)
+        return fleet
+
+
+async def collect_fleet_vlans_async(devices: Optional[List[Dict[str, Any]]] = None,
+                                    max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Collect VLAN membership from every switch in config/switch.yaml concurrently.
+
+    Returns:
+        {'fleet': VlanFleet, 'results': per-switch status}
+    """
+    if devices is None:
+        devices = ConfigLoader.get_devices('switch') or []
+    switches = [d for d in devices if d and d.get('ip')]
+    max_concurrency = max_concurrency or VLAN_PUSH_SETTINGS['max_concurrency']
+
+    loop = asyncio.get_running_loop()
+    fleet = VlanFleet()
+    results = []
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        tasks = [loop.run_in_executor(executor, collect_switch_vlans, device) for device in switches]
+        for future in asyncio.as_completed(tasks):
+            result = await future
+            if result['status'] == 'success':
+                fleet.add(result.pop('switch'))
+            results.append(result)
+    return {'fleet': fleet, 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect and query VLAN membership across Huawei switches")
+    parser.add_argument('--load', help="query a saved collection instead of collecting")
+    parser.add_argument('--vlan', type=int, help="show where this VLAN is defined, carried and missing")
+    args = parser.parse_args()
+
+    logger = get_logger('main')
+    if args.load:
+        fleet = VlanFleet.load(args.load)
+    else:
+        collected = asyncio.run(collect_fleet_vlans_async())
+        fleet = collected['fleet']
+        for result in collected['results']:
+            if result['status'] == 'failed':
+                logger.info(f"- {result['ip']}: {result['error']}", extra={'print_console': True})
+        logger.info(f"Saved to: {fleet.save()}", extra={'print_console': True})
+
+    def show(text):
+        logger.info(text, extra={'print_console': True})
+
+    show(f"Switches: {len(fleet.switches)}, switch-to-switch links: {len(fleet.links())}")
+    if args.vlan:
+        show(f"VLAN {args.vlan} defined on: {', '.join(fleet.where_defined(args.vlan)) or '-'}")
+        show(f"VLAN {args.vlan} carried by {len(fleet.ports_carrying(args.vlan))} ports")
+    for missing in fleet.missing_on_trunks(args.vlan):
+        show(f"Missing on trunk {missing['link']}: a side [{missing['missing_on_a']}] b side [{missing['missing_on_b']}]")
+    if not args.vlan:
+        for ip, vlans in fleet.defined_but_unused().items():
+            show(f"Defined but unused on {ip}: {vlans}")
+        for ip, vlans in fleet.used_but_undefined().items():
+            show(f"Used but undefined on {ip}: {vlans}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+# operation/switch/huawei/post_vlan_config.py
+
+import os
+import csv
+import sys
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from connect.device_connector import DeviceConnector
+from connect.exceptions import CommandError
+from operation.switch.huawei.get_vlan_config import parse_port_vlan
+from operation.switch.huawei.vlan_common import (
+    parse_vlan_list, compress_ranges, batch_commands, parse_vlan_summary, ports_by_vlan, vlan_restore_commands
+)
+from utils.config_loader import ConfigLoader
+from utils.inventory_cache import load_yaml
+from utils.logger import get_logger
+from utils.settings import BASE_DIR, VLAN_PUSH_SETTINGS
+
+DEFAULT_PLAN = os.path.join(BASE_DIR, 'config', 'vlan_plan.yaml')
+RESULTS_DIR = os.path.join(BASE_DIR, 'output', 'vlan_push')
+
+# device types with a candidate configuration (commit / abort)
+TWO_STAGE_TYPES = ('huawei_vrpv8',)
+
+
+class VlanPlan:
+    """
+    Desired VLAN state per switch, loaded from config/vlan_plan.yaml.
+
+    Every switch gets the default present/absent sets; a per-switch entry adds
+    to them and wins where the two disagree.
+    """
+
+    def __init__(self, default_present: Set[int], default_absent: Set[int],
+                 switches: Optional[Dict[str, Tuple[Set[int], Set[int]]]] = None):
+        self.default_present = default_present
+        self.default_absent = default_absent
+        self.switches = switches or {}
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_PLAN) -> 'VlanPlan':
+        plan = (load_yaml(path) or {}).get('vlan_plan') or {}
+        default = plan.get('default') or {}
+        switches = {
+            str(ip): (parse_vlan_list(entry.get('present')), parse_vlan_list(entry.get('absent')))
+            for ip, entry in (plan.get('switches') or {}).items() if entry
+        }
+        return cls(parse_vlan_list(default.get('present')), parse_vlan_list(default.get('absent')), switches)
+
+    def desired(self, ip: str) -> Tuple[Set[int], Set[int]]:
+        """Return the (present, absent) VLAN sets for one switch"""
+        present, absent = self.switches.get(str(ip), (set(), set()))
+        desired_present = (self.default_present - absent) | present
+        desired_absent = (self.default_absent - present) | absent
+        conflict = desired_present & desired_absent
+        if conflict:
+            raise ValueError(f"VLANs both present and absent for {ip}: {sorted(conflict)}")
+        # VLAN 1 is the default VLAN and cannot be deleted
+        desired_absent.discard(1)
+        return desired_present, desired_absent
+
+
+def compile_changes(current: Set[int], present: Set[int], absent: Set[int]) -> Dict[str, Any]:
+    """
+    Compile the minimal command set that moves a switch from its current VLANs to the desired state.
+
+    Returns:
+        dict with the VLANs to 'add' and 'remove', the 'commands' to run and
+        the 'rollback' commands that undo them
+    """
+    add = present - current
+    remove = absent & current
+    return {
+        'add': add,
+        'remove': remove,
+        'commands': batch_commands(add) + batch_commands(remove, undo=True),
+        'rollback': batch_commands(remove) + batch_commands(add, undo=True),
+    }
+
+
+def _check_output(command: str, output: str) -> None:
+    for line in output.splitlines():
+        if line.strip().lower().startswith('error'):
+            raise CommandError(f"Command rejected: {command}", {'command': command, 'output': line.strip()})
+
+
+class VlanPushClient:
+    """Apply a compiled VLAN change to one switch with commit-or-rollback semantics"""
+
+    def __init__(self, device_info: Dict[str, Any]):
+        self.device_info = device_info
+        self.logger = get_logger('vlan_push')
+        self.connector = DeviceConnector(device_info)
+
+    @property
+    def two_stage(self) -> bool:
+        return self.device_info.get('device_type') in TWO_STAGE_TYPES
+
+    def connect(self) -> None:
+        self.connector.connect()
+        self.connector.send_command('screen-length 0 temporary')
+
+    def current_vlans(self) -> Set[int]:
+        return parse_vlan_summary(self.connector.send_command('display vlan summary'))
+
+    def vlans_in_use(self, vlans: Set[int]) -> Dict[int, List[str]]:
+        """Return the given VLANs that ports still carry, with those ports"""
+        return ports_by_vlan(parse_port_vlan(self.connector.send_command('display port vlan')), vlans)
+
+    def capture_vlan_state(self, vlans: Set[int]) -> List[str]:
+        """Return the commands that restore the name, description and ports of VLANs about to be removed"""
+        if not vlans:
+            return []
+        return vlan_restore_commands(self.connector.send_command('display current-configuration'), vlans)
+
+    def apply(self, commands: List[str], restore: Optional[List[str]] = None) -> None:
+        """
+        Apply the commands as one transaction.
+
+        huawei_vrpv8 (CE) switches stage the commands in the candidate
+        configuration and commit them, or abort on any error. Other Huawei
+        switches apply each command immediately, so on failure the commands
+        that did go through are reverted with their inverse, followed by the
+        restore commands (see capture_vlan_state).
+        """
+        if self.two_stage:
+            self._apply_two_stage(commands)
+        else:
+            self._apply_immediate(commands, restore or [])
+
+    def revert(self, commands: List[str]) -> None:
+        """Send rollback commands after a committed change, continuing past rejected ones"""
+        if self.two_stage:
+            self._apply_two_stage(commands)
+            return
+        try:
+            self._send_best_effort(commands)
+        finally:
+            self.connector.connection.exit_config_mode()
+
+    def _send_config(self, command: str) -> None:
+        output = self.connector.connection.send_config_set(
+            [command], exit_config_mode=False, read_timeout=VLAN_PUSH_SETTINGS['command_timeout']
+        )
+        _check_output(command, output)
+
+    def _apply_two_stage(self, commands: List[str]) -> None:
+        connection = self.connector.connection
+        try:
+            for command in commands:
+                self._send_config(command)
+            connection.commit()
+        except Exception:
+            # discard the uncommitted candidate configuration
+            connection.send_command_timing('abort')
+            raise
+        finally:
+            connection.exit_config_mode()
+
+    def _apply_immediate(self, commands: List[str], restore: List[str]) -> None:
+        connection = self.connector.connection
+        applied = []
+        try:
+            for command in commands:
+                self._send_config(command)
+                applied.append(command)
+        except Exception:
+            self.logger.warning(f"{self.device_info['host']}: reverting {len(applied)} applied commands")
+            self._send_best_effort([_inverse(command) for command in reversed(applied)] + restore)
+            raise
+        finally:
+            connection.exit_config_mode()
+
+    def _send_best_effort(self, commands: List[str]) -> None:
+        failed = 0
+        for command in commands:
+            try:
+                self._send_config(command)
+            except Exception as e:
+                failed += 1
+                self.logger.error(f"{self.device_info['host']}: rollback command failed: {command}: {str(e)}")
+        if failed:
+            self.logger.error(f"{self.device_info['host']}: rollback incomplete, {failed} commands failed")
+
+    def save(self) -> None:
+        _check_output('save', self.connector.send_confirmed('save'))
+
+    def close(self) -> None:
+        self.connector.disconnect()
+
+
+def _inverse(command: str) -> str:
+    return command[len('undo '):] if command.startswith('undo ') else f"undo {command}"
+
+
+def push_switch_vlans(device: Dict[str, Any], plan: VlanPlan, dry_run: bool = False,
+                      force: bool = False) -> Dict[str, Any]:
+    """
+    Bring one switch to its desired VLAN state (runs in a worker thread).
+
+    VLANs that ports still carry are not removed unless force is set.
+    """
+    logger = get_logger('vlan_push')
+    ip = device['ip']
+    result = {'ip': ip, 'name': device.get('name') or '', 'status': 'failed', 'added': '', 'removed': '',
+              'commands': 0, 'error': ''}
+    client = None
+    try:
+        present, absent = plan.desired(ip)
+        client = VlanPushClient(ConfigLoader.get_device_info(ip, 'switch'))
+        client.connect()
+        change = compile_changes(client.current_vlans(), present, absent)
+        result.update({
+            'added': ' '.join(compress_ranges(change['add'])),
+            'removed': ' '.join(compress_ranges(change['remove'])),
+            'commands': len(change['commands']),
+        })
+        if not change['commands']:
+            result['status'] = 'compliant'
+            return result
+        if change['remove'] and not force:
+            in_use = client.vlans_in_use(change['remove'])
+            if in_use:
+                raise CommandError(
+                    "VLANs still carried by ports, not removed (use --force): "
+                    + "; ".join(f"{vlan}: {' '.join(ports)}" for vlan, ports in sorted(in_use.items())),
+                    {'in_use': in_use}
+                )
+        if dry_run:
+            result['status'] = 'planned'
+            return result
+
+        restore = client.capture_vlan_state(change['remove'])
+        client.apply(change['commands'], restore)
+
+        # verify the new state; revert if the switch does not report it
+        remaining = compile_changes(client.current_vlans(), present, absent)
+        if remaining['commands']:
+            client.revert(change['rollback'] + restore)
+            raise CommandError(f"VLAN state not reached on {ip}, change rolled back",
+                               {'pending': remaining['commands']})
+
+        if VLAN_PUSH_SETTINGS['save_config']:
+            client.save()
+        result['status'] = 'changed'
+        logger.info(f"{ip}: {len(change['commands'])} commands applied")
+        return result
+    except Exception as e:
+        result['error'] = str(e)
+        logger.error(f"{ip}: VLAN push failed: {str(e)}")
+        return result
+    finally:
+        if client:
+            client.close()
+
+
+async def push_fleet_vlans_async(plan: VlanPlan, devices: Optional[List[Dict[str, Any]]] = None,
+                                 max_concurrency: Optional[int] = None,
+                                 dry_run: bool = False, force: bool = False) -> List[Dict[str, Any]]:
+    """
+    Push the VLAN plan to every switch in config/switch.yaml concurrently.
+
+    Args:
+        plan: desired VLAN state
+        devices: switches to change, defaults to the whole inventory
+        max_concurrency: switches changed at once
+        dry_run: only report what would change
+        force: remove VLANs even when ports still carry them
+
+    Returns:
+        one result per switch with status compliant, planned, changed or failed
+    """
+    if devices is None:
+        devices = ConfigLoader.get_devices('switch') or []
+    switches = [d for d in devices if d and d.get('ip')]
+    max_concurrency = max_concurrency or VLAN_PUSH_SETTINGS['max_concurrency']
+
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        tasks = [loop.run_in_executor(executor, push_switch_vlans, device, plan, dry_run, force)
+                 for device in switches]
+        return [await future for future in asyncio.as_completed(tasks)]
+
+
+def export_results(results: List[Dict[str, Any]], filename: Optional[str] = None) -> str:
+    if not filename:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        filename = os.path.join(RESULTS_DIR, f"vlan_push_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    fields = ['ip', 'name', 'status', 'added', 'removed', 'commands', 'error']
+    with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(sorted(results, key=lambda r: r['ip']))
+    return filename
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Push the desired VLAN state to Huawei switches")
+    parser.add_argument('--plan', default=DEFAULT_PLAN, help="VLAN plan YAML (default: config/vlan_plan.yaml)")
+    parser.add_argument('--hosts', nargs='*', help="only these switch IPs")
+    parser.add_argument('--concurrency', type=int, default=None, help="switches changed at once")
+    parser.add_argument('--dry-run', action='store_true', help="show the changes without applying them")
+    parser.add_argument('--force', action='store_true', help="remove absent VLANs even when ports carry them")
+    args = parser.parse_args()
+
+    logger = get_logger('main')
+    devices = ConfigLoader.get_devices('switch') or []
+    if args.hosts:
+        devices = [d for d in devices if d and str(d.get('ip')) in args.hosts]
+
+    results = asyncio.run(push_fleet_vlans_async(VlanPlan.from_file(args.plan), devices,
+                                                 args.concurrency, args.dry_run, args.force))
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    logger.info(f"Switches: {len(results)} {counts}", extra={'print_console': True})
+    for result in results:
+        if result['status'] == 'failed':
+            logger.info(f"- {result['ip']}: {result['error']}", extra={'print_console': True})
+    logger.info(f"Results exported to: {export_results(results)}", extra={'print_console': True})
+    return 1 if counts.get('failed') else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
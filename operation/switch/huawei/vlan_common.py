@@ -0,0 +1,200 @@
+# operation/switch/huawei/vlan_common.py
+
+import re
+from typing import Any, Dict, Iterable, List, Set
+
+VLAN_MIN = 1
+VLAN_MAX = 4094
+# "vlan batch" accepts at most 10 "<id> [to <id>]" ranges per command
+MAX_RANGES_PER_COMMAND = 10
+
+_RANGE = re.compile(r'(\d+)(?:\s*(?:to|-)\s*(\d+))?', re.IGNORECASE)
+
+
+def parse_vlan_list(text) -> Set[int]:
+    """
+    Parse a VLAN list such as "10 20 to 30 40-45" (or a list of ints/strings).
+
+    Returns:
+        set of VLAN IDs
+    """
+    if text is None:
+        return set()
+    if isinstance(text, int):
+        text = str(text)
+    elif not isinstance(text, str):
+        text = ' '.join(str(item) for item in text)
+
+    vlans = set()
+    for start, end in _RANGE.findall(text):
+        low, high = int(start), int(end or start)
+        if low > high:
+            low, high = high, low
+        if low < VLAN_MIN or high > VLAN_MAX:
+            raise ValueError(f"VLAN range {low}-{high} is outside {VLAN_MIN}-{VLAN_MAX}")
+        vlans.update(range(low, high + 1))
+    return vlans
+
+
+def to_bitmap(vlans: Iterable[int]) -> int:
+    """Pack VLAN IDs into a 4096-bit bitmap (bit n set = VLAN n)"""
+    bitmap = 0
+    for vlan in vlans:
+        bitmap |= 1 << vlan
+    return bitmap
+
+
+def bitmap_from_text(text: str) -> int:
+    """Build a bitmap straight from a VLAN list such as "1 10 20-30" without expanding ranges"""
+    bitmap = 0
+    for start, end in _RANGE.findall(text or ''):
+        low, high = sorted((int(start), int(end or start)))
+        if low < VLAN_MIN or high > VLAN_MAX:
+            continue
+        bitmap |= (1 << (high + 1)) - (1 << low)
+    return bitmap
+
+
+def from_bitmap(bitmap: int) -> List[int]:
+    """Unpack a bitmap into sorted VLAN IDs"""
+    vlans = []
+    while bitmap:
+        low = bitmap & -bitmap
+        vlans.append(low.bit_length() - 1)
+        bitmap ^= low
+    return vlans
+
+
+def format_bitmap(bitmap: int) -> str:
+    """Render a bitmap as a Huawei VLAN list, e.g. '10 to 12 20'"""
+    return ' '.join(compress_ranges(from_bitmap(bitmap)))
+
+
+def compress_ranges(vlans: Iterable[int]) -> List[str]:
+    """Collapse VLAN IDs into Huawei range tokens, e.g. [10, 11, 12, 20] -> ['10 to 12', '20']"""
+    tokens = []
+    ordered = sorted(set(vlans))
+    i = 0
+    while i < len(ordered):
+        j = i
+        while j + 1 < len(ordered) and ordered[j + 1] == ordered[j] + 1:
+            j += 1
+        tokens.append(str(ordered[i]) if i == j else f"{ordered[i]} to {ordered[j]}")
+        i = j + 1
+    return tokens
+
+
+def batch_commands(vlans: Iterable[int], undo: bool = False) -> List[str]:
+    """Build the fewest "[undo] vlan batch" commands that cover the given VLANs"""
+    tokens = compress_ranges(vlans)
+    prefix = "undo vlan batch" if undo else "vlan batch"
+    return [
+        f"{prefix} {' '.join(tokens[i:i + MAX_RANGES_PER_COMMAND])}"
+        for i in range(0, len(tokens), MAX_RANGES_PER_COMMAND)
+    ]
+
+
+def parse_vlan_summary(output: str) -> Set[int]:
+    """
+    Parse the static VLANs from "display vlan summary".
+
+    Handles both output formats:
+        huawei (VRP5):        "Static VLAN:" / "Total 3 static VLAN." / "  1 10 20 to 21"
+        huawei_vrpv8 (CE):    "Number of static VLAN: 3" / "VLAN ID: 1 10 20 to 21"
+    """
+    vlans = set()
+    in_static = False
+    for line in output.splitlines():
+        stripped = line.strip()
+        lowered = stripped.lower()
+        if not stripped:
+            continue
+        if 'static vlan' in lowered and not lowered.startswith('total'):
+            in_static = True
+            continue
+        if 'vlan' in lowered and ('dynamic' in lowered or 'service' in lowered or 'reserved' in lowered):
+            in_static = False
+            continue
+        if not in_static or lowered.startswith('total'):
+            continue
+        if ':' in stripped:
+            label, _, stripped = stripped.partition(':')
+            if 'vlan id' not in label.lower():
+                continue
+        vlans |= parse_vlan_list(stripped)
+    return vlans
+
+
+def ports_by_vlan(ports: Dict[str, Dict[str, Any]], vlans: Iterable[int]) -> Dict[int, List[str]]:
+    """
+    Map each of the given VLANs to the ports that carry it.
+
+    Args:
+        ports: parsed "display port vlan" (get_vlan_config.parse_port_vlan)
+        vlans: VLAN IDs to look up
+
+    Trunks that allow every VLAN ("allow-pass vlan all") are not counted as
+    using a VLAN, as they do not name it.
+
+    Returns:
+        dict of VLAN ID -> sorted port names, only for VLANs in use
+    """
+    every_vlan = to_bitmap(range(2, VLAN_MAX + 1))
+    in_use: Dict[int, List[str]] = {}
+    for vlan in vlans:
+        bit = 1 << vlan
+        users = sorted(name for name, port in ports.items()
+                       if port['allowed'] & bit and port['allowed'] & every_vlan != every_vlan)
+        if users:
+            in_use[vlan] = users
+    return in_use
+
+
+_VLAN_BLOCK = re.compile(r'^vlan (\d+)$')
+_PORT_VLAN_LINE = re.compile(
+    r'^port (?:default vlan|trunk pvid vlan|trunk allow-pass vlan|hybrid (?:pvid|tagged|untagged) vlan) (.+)$'
+)
+
+
+def vlan_restore_commands(config: str, vlans: Iterable[int]) -> List[str]:
+    """
+    Build the commands that re-create the name, description and port membership
+    of VLANs from a "display current-configuration" output.
+
+    "vlan batch" brings back removed VLANs but not their names, descriptions or
+    the port assignments dropped with them; these commands are sent after it
+    when a change that removed VLANs is rolled back.
+
+    Returns:
+        configuration commands, each view entered and left with "quit"
+    """
+    wanted = set(vlans)
+    commands: List[str] = []
+    block: List[str] = []
+    header = None
+    for line in config.splitlines() + ['#']:
+        if line[:1] not in (' ', ''):
+            if header and block:
+                commands.extend([header] + block + ['quit'])
+            header, block = None, []
+            stripped = line.strip()
+            match = _VLAN_BLOCK.match(stripped)
+            if (match and int(match.group(1)) in wanted) or stripped.startswith('interface '):
+                header = stripped
+            continue
+        stripped = line.strip()
+        if header is None or not stripped:
+            continue
+        if header.startswith('vlan '):
+            if stripped.startswith(('name ', 'description ')):
+                block.append(stripped)
+            continue
+        match = _PORT_VLAN_LINE.match(stripped)
+        if match:
+            try:
+                used = parse_vlan_list(match.group(1))
+            except ValueError:
+                continue
+            if used & wanted:
+                block.append(stripped)
+    return commands
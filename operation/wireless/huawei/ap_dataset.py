@@ -0,0 +1,284 @@
+# operation/wireless/huawei/ap_dataset.py
+
+import csv
+import io
+import re
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+_DASHED = re.compile(r'^\s*-{5,}\s*$')
+_UPTIME = re.compile(r'(?:(\d+)D)?:?(?:(\d+)H)?:?(?:(\d+)M)?:?(?:(\d+)S)?$')
+
+
+class StringColumn:
+    """Dictionary-encoded string column: one 32-bit code per row plus one copy of each distinct value"""
+
+    def __init__(self):
+        self.codes = array('I')
+        self.values: List[str] = ['']
+        self._lookup: Dict[str, int] = {'': 0}
+
+    def encode(self, value: str) -> int:
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            self._lookup[value] = code
+            self.values.append(value)
+        return code
+
+    def append(self, value: str) -> None:
+        self.codes.append(self.encode(value))
+
+    def set(self, row: int, value: str) -> None:
+        self.codes[row] = self.encode(value)
+
+    def __getitem__(self, row: int) -> str:
+        return self.values[self.codes[row]]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def extend_from(self, other: 'StringColumn') -> None:
+        remap = [self.encode(value) for value in other.values]
+        self.codes.extend(remap[code] for code in other.codes)
+
+
+class APTable:
+    """
+    Columnar AP dataset.
+
+    Each column is a typed array: strings are dictionary-encoded (4 bytes per
+    AP plus one copy of each distinct value), MAC and IPv4 addresses are
+    stored as integers and uptime as seconds. A campus with hundreds of
+    thousands of APs fits in a few MB instead of one dict per AP.
+    """
+
+    STRING_COLUMNS = ('ac', 'name', 'group', 'type', 'state', 'extra_info', 'software_version', 'patch_version')
+
+    def __init__(self):
+        self.ap_id = array('i')
+        self.mac = array('q')
+        self.ip = array('I')
+        self.sta_count = array('I')
+        self.uptime = array('I')
+        for column in self.STRING_COLUMNS:
+            setattr(self, column, StringColumn())
+
+    def __len__(self) -> int:
+        return len(self.ap_id)
+
+    @classmethod
+    def from_outputs(cls, ap_all_output: str, version_output: str = '', ac: str = '') -> 'APTable':
+        """Build a table from "dis ap all" and "display ap version all" outputs of one AC"""
+        table = cls()
+        table.load_ap_all(ap_all_output, ac)
+        if version_output:
+            table.join_versions(version_output, ac)
+        return table
+
+    def load_ap_all(self, output: str, ac: str = '') -> None:
+        """Stream the "dis ap all" table straight into the columns"""
+        for row in iter_table_rows(output, min_fields=9):
+            if not row[0].isdigit():
+                continue
+            self.ap_id.append(int(row[0]))
+            self.mac.append(mac_to_int(row[1]))
+            self.name.append(row[2])
+            self.group.append(row[3])
+            self.ip.append(ip_to_int(row[4]))
+            self.type.append(row[5])
+            self.state.append(row[6])
+            self.sta_count.append(int(row[7]) if row[7].isdigit() else 0)
+            self.uptime.append(uptime_to_seconds(row[8]))
+            self.extra_info.append(row[9] if len(row) > 9 and row[9] != '-' else '')
+            self.ac.append(ac)
+            self.software_version.append('')
+            self.patch_version.append('')
+
+    def join_versions(self, output: str, ac: str = '') -> int:
+        """
+        Hash-join "display ap version all" rows onto the table by (AC, AP ID).
+
+        Returns:
+            number of rows matched
+        """
+        ac_code = self.ac.encode(ac)
+        build = {
+            self.ap_id[row]: row
+            for row in range(len(self))
+            if self.ac.codes[row] == ac_code
+        }
+        matched = 0
+        for fields in iter_table_rows(output, min_fields=7):
+            if not fields[0].isdigit():
+                continue
+            row = build.get(int(fields[0]))
+            if row is None:
+                continue
+            self.software_version.set(row, fields[4] if fields[4] != '-' else '')
+            self.patch_version.set(row, fields[5] if fields[5] != '-' else '')
+            matched += 1
+        return matched
+
+    def extend(self, other: 'APTable') -> None:
+        """Append the rows of another table (e.g. from another AC)"""
+        for column in ('ap_id', 'mac', 'ip', 'sta_count', 'uptime'):
+            getattr(self, column).extend(getattr(other, column))
+        for column in self.STRING_COLUMNS:
+            getattr(self, column).extend_from(getattr(other, column))
+
+    # ---- statistics -------------------------------------------------------
+
+    def _group_codes(self, by: Optional[str]):
+        if by is None:
+            return None, None
+        column: StringColumn = getattr(self, by)
+        return column.codes, column.values
+
+    def state_counts(self, by: Optional[str] = None) -> Dict[Any, Dict[str, int]]:
+        """Count APs per state, overall or grouped by 'ac' or 'group'"""
+        return self._count(self.state, by)
+
+    def model_distribution(self, by: Optional[str] = None) -> Dict[Any, Dict[str, int]]:
+        """Count APs per model, overall or grouped by 'ac' or 'group'"""
+        return self._count(self.type, by)
+
+    def sta_totals(self, by: Optional[str] = None) -> Dict[Any, int]:
+        """Sum connected stations, overall or grouped by 'ac' or 'group'"""
+        keys, values = self._group_codes(by)
+        if keys is None:
+            return {None: sum(self.sta_count)}
+        totals = defaultdict(int)
+        for key, count in zip(keys, self.sta_count):
+            totals[key] += count
+        return {values[key]: total for key, total in totals.items()}
+
+    def _count(self, column: StringColumn, by: Optional[str]) -> Dict[Any, Dict[str, int]]:
+        keys, values = self._group_codes(by)
+        if keys is None:
+            counts = Counter(column.codes)
+            return {None: {column.values[code]: n for code, n in counts.items()}}
+        result: Dict[Any, Dict[str, int]] = defaultdict(dict)
+        for (key, code), n in Counter(zip(keys, column.codes)).items():
+            result[values[key]][column.values[code]] = n
+        return dict(result)
+
+    # ---- export -----------------------------------------------------------
+
+    FIELDS = ('ac', 'ap_id', 'mac', 'name', 'group', 'ip', 'type', 'state', 'sta_count', 'uptime',
+              'extra_info', 'software_version', 'patch_version')
+
+    def row(self, i: int) -> Dict[str, Any]:
+        return {
+            'ac': self.ac[i],
+            'ap_id': self.ap_id[i],
+            'mac': int_to_mac(self.mac[i]),
+            'name': self.name[i],
+            'group': self.group[i],
+            'ip': int_to_ip(self.ip[i]),
+            'type': self.type[i],
+            'state': self.state[i],
+            'sta_count': self.sta_count[i],
+            'uptime': self.uptime[i],
+            'extra_info': self.extra_info[i],
+            'software_version': self.software_version[i],
+            'patch_version': self.patch_version[i],
+        }
+
+    def iter_rows(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def to_csv(self, filename: str, headers: Optional[Dict[str, str]] = None) -> None:
+        """Write the table row by row; headers maps field names to column titles"""
+        headers = headers or {field: field for field in self.FIELDS}
+        with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(headers.values())
+            for record in self.iter_rows():
+                writer.writerow([record[field] for field in headers])
+
+    def to_arrow(self):
+        """Return the table as a pyarrow.Table (requires the optional pyarrow package)"""
+        import pyarrow as pa
+
+        columns = {}
+        for field in self.FIELDS:
+            column = getattr(self, field)
+            if isinstance(column, StringColumn):
+                columns[field] = pa.DictionaryArray.from_arrays(
+                    pa.array(column.codes, type=pa.uint32()), pa.array(column.values)
+                )
+            else:
+                columns[field] = pa.array(column)
+        return pa.table(columns)
+
+
+def iter_table_rows(output: str, min_fields: int) -> Iterator[List[str]]:
+    """
+    Stream the data rows of a Huawei table (header between two dashed lines).
+
+    Column boundaries are taken from the header line. Rows whose whitespace
+    split gives at least min_fields values are returned as split; other rows
+    are cut at the header column positions, so empty cells keep their place.
+    """
+    dashed_count = 0
+    spans: List[Tuple[int, Optional[int]]] = []
+    previous = ''
+    for line in io.StringIO(output):
+        line = line.rstrip('\r\n')
+        if _DASHED.match(line):
+            dashed_count += 1
+            if dashed_count == 2 and previous:
+                spans = _header_spans(previous)
+            continue
+        if dashed_count == 1:
+            previous = line
+            continue
+        if dashed_count < 2 or not line.strip():
+            continue
+        parts = line.split()
+        if len(parts) >= min_fields:
+            yield parts
+        elif spans and len(spans) >= min_fields:
+            yield [line[start:end].strip() if start < len(line) else '' for start, end in spans]
+
+
+def _header_spans(header: str) -> List[Tuple[int, Optional[int]]]:
+    starts = [m.start() for m in re.finditer(r'\S+', header)]
+    return [(start, starts[i + 1] if i + 1 < len(starts) else None) for i, start in enumerate(starts)]
+
+
+def mac_to_int(mac: str) -> int:
+    digits = re.sub(r'[^0-9a-fA-F]', '', mac)
+    return int(digits, 16) if len(digits) == 12 else -1
+
+
+def int_to_mac(value: int) -> str:
+    if value < 0:
+        return ''
+    digits = f"{value:012x}"
+    return f"{digits[0:4]}-{digits[4:8]}-{digits[8:12]}"
+
+
+def ip_to_int(ip: str) -> int:
+    parts = ip.split('.')
+    if len(parts) != 4 or not all(p.isdigit() for p in parts):
+        return 0
+    return (int(parts[0]) << 24) | (int(parts[1]) << 16) | (int(parts[2]) << 8) | int(parts[3])
+
+
+def int_to_ip(value: int) -> str:
+    if not value:
+        return ''
+    return f"{value >> 24}.{(value >> 16) & 255}.{(value >> 8) & 255}.{value & 255}"
+
+
+def uptime_to_seconds(uptime: str) -> int:
+    """Convert "279D:11H:50M:43S" to seconds ("-" and unknown formats give 0)"""
+    match = _UPTIME.match(uptime)
+    if not match or not any(match.groups()):
+        return 0
+    days, hours, minutes, seconds = (int(g) if g else 0 for g in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
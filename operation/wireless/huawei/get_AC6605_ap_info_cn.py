@@ -1,244 +1,174 @@
-#This script need to be refactored
-from netmiko import ConnectHandler
-import re
-import csv
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import pandas as pd
+from typing import Dict, Any, List, Optional
+
+from connect.device_connector import DeviceConnector
+from operation.wireless.huawei.ap_dataset import APTable
+from utils.config_loader import ConfigLoader
+from utils.cpu_executor import run_cpu_bound
+from utils.logger import get_logger
+from utils.metrics_store import MetricsStore
+
+AP_COMMANDS = ['dis ap all', 'display ap version all']
 
 
 class AC6605Client:
-    def __init__(self, host, username, password, port=22):
+    def __init__(self, host, username, password, port=22, device_type='huawei', name='', jump_host=None):
         self.device = {
-            'device_type': 'huawei',
+            'device_type': device_type,
             'host': host,
             'username': username,
             'password': password,
             'port': port,
             'conn_timeout': 20,
         }
+        # 需经堡垒机访问的AC，由 DeviceConnector 通过堡垒机的共享连接建立会话
+        if jump_host:
+            self.device['jump_host'] = jump_host
+        self.name = name
+        self.connector = None
         self.connection = None
 
-    def connect(self):
+    @classmethod
+    def from_inventory(cls, ip, name=''):
+        """根据 config/wireless.yaml 与 credential.yaml 创建客户端"""
+        info = ConfigLoader.get_device_info(ip, 'wireless')
+        return cls(info['host'], info['username'], info['password'],
+                   port=info['port'], device_type=info['device_type'], name=name,
+                   jump_host=info.get('jump_host'))
+
+    def connect(self, raise_on_error=False):
         try:
-            self.connection = ConnectHandler(**self.device)
+            self.connector = DeviceConnector(self.device)
+            self.connector.connect()
+            self.connection = self.connector.connection
             return True
         except Exception as e:
+            if raise_on_error:
+                raise
             print(f"Connect failed: {str(e)}")
             return False
 
-    def get_ap_info(self):
+    def fetch_ap_table(self):
         """
-        Get AP information from the AC6605 device
+        获取AP信息并直接解析为列式数据集（APTable），失败时抛出异常
         """
-        try:
-            # Disable paging
-            self.connection.send_command('screen-length 0 temporary')
-
-            # 获取AP基本信息（dis ap all）
-            ap_output = self.connection.send_command('dis ap all')
-            ap_info = self._parse_ap_all(ap_output)
-
-            # 获取AP版本信息（display ap version all）
-            version_output = self.connection.send_command('display ap version all')
-            version_info = self._parse_ap_version(version_output)
-
-            # 合并信息：根据 ap_id 作为键进行合并
-            merged_info = self._merge_ap_info(ap_info, version_info)
-            return merged_info
-        except Exception as e:
-            print(f"获取AP信息失败: {str(e)}")
-            return []
-
-    def _parse_ap_all(self, output):
-        """
-        解析 "dis ap all" 命令的输出
-
-        输出示例：
-          Total AP information:
-          fault : fault           [28]
-          idle  : idle            [4]
-          nor   : normal          [76]
-          ExtraInfo : Extra information
-          P     : insufficient power supply
-          -------------------------------------------------------------------------------------------------------------------------------
-          ID    MAC            Name         Group           IP            Type             State  STA Uptime           ExtraInfo
-          -------------------------------------------------------------------------------------------------------------------------------
-          0     18de-d77d-2ba0 AP203        PSTV            172.18.20.56  AP2030DN         nor    0   279D:11H:50M:43S -
-          1     18de-d77d-2a20 AP206        PSTV            172.18.20.59  AP2030DN         nor    0   279D:11H:50M:34S -
-          ...
-        """
-        ap_list = []
-        lines = output.splitlines()
-        in_table = False
-        dashed_count = 0
-        for line in lines:
-            line_strip = line.strip()
-            # 仅含“-”的行作为分隔线
-            if re.match(r"^-+$", line_strip):
-                dashed_count += 1
-                # 当遇到第二道分隔线后，后续都是数据行
-                if dashed_count == 2:
-                    in_table = True
-                continue
-            if in_table:
-                if not line_strip:
-                    continue
-                parts = line.split()
-                # 至少应包含九个字段：ID, MAC, Name, Group, IP, Type, State, STA, Uptime
-                if len(parts) < 9:
-                    continue
-                # 如果有多余字段，认为第10列为 ExtraInfo
-                extra_info = parts[9] if len(parts) >= 10 else ""
-                ap_entry = {
-                    'ap_id': parts[0],
-                    'mac': parts[1],
-                    'name': parts[2],
-                    'group': parts[3],
-                    'ip': parts[4] if parts[4] != '-' else '',
-                    'type': parts[5],
-                    'state': parts[6],      # 如 nor, idle, fault 等缩写
-                    'sta_count': parts[7],
-                    'uptime': parts[8],
-                    'extra_info': extra_info
-                }
-                ap_list.append(ap_entry)
-        return ap_list
-
-    def _parse_ap_version(self, output):
-        """
-        解析 "display ap version all" 命令的输出
-
-        输出示例：
-          <PSTVHKWAPC01>display ap version all
-          Compatible version : V200R009 V200R010 V200R019
-          ---------------------------------------------------------------------------------------------------------
-          ID     Name         Group           Type             Version            PatchVersion       state
-          ---------------------------------------------------------------------------------------------------------
-          0      AP203        PSTV            AP2030DN         V200R019C00SPC910  -                  normal
-          1      AP206        PSTV            AP2030DN         V200R019C00SPC910  -                  normal
-          ...
-        """
-        version_dict = {}
-        lines = output.splitlines()
-        in_table = False
-        dashed_count = 0
-        for line in lines:
-            line_strip = line.strip()
-            if re.match(r"^-+$", line_strip):
-                dashed_count += 1
-                if dashed_count == 2:
-                    in_table = True
-                continue
-            if in_table:
-                if not line_strip:
-                    continue
-                parts = line.split()
-                # 预期字段：ID, Name, Group, Type, Version, PatchVersion, state
-                if len(parts) < 7:
-                    continue
-                ap_id = parts[0]
-                version_info = {
-                    'software_version': parts[4] if parts[4] != '-' else '',
-                    'patch_version': parts[5] if parts[5] != '-' else '',
-                    # 此处的状态为版本输出中的状态，可用于核查
-                    'version_state': parts[6]
-                }
-                version_dict[ap_id] = version_info
-        return version_dict
-
-    def _merge_ap_info(self, ap_list, version_dict):
-        """
-        根据 ap_id 合并基础信息与版本信息
-        """
-        merged_list = []
-        for ap in ap_list:
-            ap_id = ap.get('ap_id')
-            if ap_id in version_dict:
-                ap.update(version_dict[ap_id])
-            else:
-                ap['software_version'] = ''
-                ap['patch_version'] = ''
-            merged_list.append(ap)
-        return merged_list
-
-    def export_to_csv(self, ap_list, filename=None):
-        """
-        将合并后的AP信息导出到CSV文件，并利用pandas生成统计信息
-        """
-        if not filename:
-            filename = f'ap_info_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-
-        headers = ['AP ID', 'MAC地址', 'AP名称', 'AP组', 'IP地址', '设备型号',
-                   '状态', '用户数', '运行时间', '额外信息', '软件版本', '补丁版本']
-        try:
-            with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=headers)
-                writer.writeheader()
-                for ap in ap_list:
-                    writer.writerow({
-                        'AP ID': ap.get('ap_id', ''),
-                        'MAC地址': ap.get('mac', ''),
-                        'AP名称': ap.get('name', ''),
-                        'AP组': ap.get('group', ''),
-                        'IP地址': ap.get('ip', ''),
-                        '设备型号': ap.get('type', ''),
-                        '状态': ap.get('state', ''),
-                        '用户数': ap.get('sta_count', ''),
-                        '运行时间': ap.get('uptime', ''),
-                        '额外信息': ap.get('extra_info', ''),
-                        '软件版本': ap.get('software_version', ''),
-                        '补丁版本': ap.get('patch_version', '')
-                    })
-            print(f"数据已导出到: {filename}")
-
-            # 利用pandas生成数据统计
-            df = pd.DataFrame(ap_list)
-            # 将 sta_count 转为数字，不合法的转换为0
-            df['sta_count'] = pd.to_numeric(df['sta_count'], errors='coerce').fillna(0).astype(int)
-            stats = {
-                '总AP数': len(df),
-                '在线AP数': len(df[df['state'] == 'nor']),
-                '离线AP数': len(df[df['state'] == 'fault']),
-                '空闲AP数': len(df[df['state'] == 'idle']),
-                '总客户端数': df['sta_count'].sum(),
-                'AP型号统计': df['type'].value_counts().to_dict()
-            }
-            stats_file = f'ap_stats_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt'
-            with open(stats_file, 'w', encoding='utf-8') as f:
-                for key, value in stats.items():
-                    f.write(f"{key}: {value}\n")
-            print(f"统计信息已导出到: {stats_file}")
-
-        except Exception as e:
-            print(f"导出失败: {str(e)}")
+        self.connector.send_command('screen-length 0 temporary')
+        outputs = self.connector.send_commands(AP_COMMANDS)
+        # 大型AC的输出在CPU进程池中解析
+        return run_cpu_bound(APTable.from_outputs, outputs['dis ap all'], outputs['display ap version all'],
+                             ac=self.name or self.device['host'])
 
     def close(self):
         """关闭与AC的连接"""
-        if self.connection:
-            self.connection.disconnect()
+        if self.connector:
+            self.connector.disconnect()
+        self.connection = None
 
 
-def main():
-    # AC设备信息
-    ac_host = ""         # AC的IP地址
-    ac_username = ""     # 登录用户名
-    ac_password = ""     # 登录密码
+AP_CSV_HEADERS = {
+    'ac': 'AC', 'ap_id': 'AP ID', 'mac': 'MAC地址', 'name': 'AP名称', 'group': 'AP组',
+    'ip': 'IP地址', 'type': '设备型号', 'state': '状态', 'sta_count': '用户数',
+    'uptime': '运行时间(秒)', 'extra_info': '额外信息', 'software_version': '软件版本',
+    'patch_version': '补丁版本',
+}
+
 
-    # 创建AC客户端实例
-    ac = AC6605Client(ac_host, ac_username, ac_password)
+def collect_ac_ap_info(device: Dict[str, Any]) -> Dict[str, Any]:
+    """在单个AC上采集AP信息（在线程池中运行）"""
+    logger = get_logger('ap_fleet')
+    ac = AC6605Client.from_inventory(device['ip'], name=device.get('name') or '')
     try:
-        if ac.connect():
-            print("成功连接到AC")
-            # 获取并合并AP信息
-            ap_list = ac.get_ap_info()
-            # 导出合并后的数据及统计信息
-            ac.export_to_csv(ap_list)
+        ac.connect(raise_on_error=True)
+        table = ac.fetch_ap_table()
+        logger.info(f"AC {device['ip']}: {len(table)} APs collected")
+        states = table.state_counts()[None]
+        MetricsStore().append_many(device['ip'], {
+            'sta_count': table.sta_totals()[None],
+            'ap_total': len(table),
+            'ap_normal': states.get('nor', 0),
+            'ap_fault': states.get('fault', 0),
+        })
+        return {'ac_ip': device['ip'], 'status': 'success', 'table': table}
     except Exception as e:
-        print(f"执行出错: {str(e)}")
+        logger.error(f"AC {device['ip']}: AP collection failed: {str(e)}")
+        return {'ac_ip': device['ip'], 'status': 'failed', 'error': str(e), 'table': None}
     finally:
         ac.close()
-        print("连接已关闭")
+
+
+async def collect_fleet_ap_info_async(max_concurrency: int = 32,
+                                      devices: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    并发采集 config/wireless.yaml 中所有AC的AP信息并合并为一个数据集
+
+    Args:
+        max_concurrency: 同时连接的AC数量上限
+        devices: 要采集的AC列表，默认从 ConfigLoader 读取
+
+    Returns:
+        {'table': 合并后的 APTable, 'results': 每台AC的采集结果}
+    """
+    if devices is None:
+        devices = ConfigLoader.get_devices('wireless') or []
+    # 只保留有IP的AC条目（模板中的空条目与AP条目会被跳过）
+    controllers = [
+        d for d in devices
+        if d and d.get('ip') and not str(d.get('model') or '').upper().startswith('AP')
+    ]
+
+    loop = asyncio.get_running_loop()
+    table = APTable()
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        tasks = [loop.run_in_executor(executor, collect_ac_ap_info, device) for device in controllers]
+        results = []
+        # 每台AC完成后立即合并，其列数组随即释放
+        for future in asyncio.as_completed(tasks):
+            result = await future
+            if result['table'] is not None:
+                table.extend(result.pop('table'))
+            results.append(result)
+
+    return {'table': table, 'results': results}
+
+
+def export_fleet_stats(table: APTable, filename: Optional[str] = None) -> str:
+    """按全网、AC、AP组输出AP状态、用户数与型号统计"""
+    if not filename:
+        filename = f'ap_stats_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt'
+    overall = table.state_counts()[None]
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(f"总AP数: {len(table)}\n")
+        f.write(f"在线AP数: {overall.get('nor', 0)}\n")
+        f.write(f"离线AP数: {overall.get('fault', 0)}\n")
+        f.write(f"空闲AP数: {overall.get('idle', 0)}\n")
+        f.write(f"总客户端数: {table.sta_totals()[None]}\n")
+        f.write(f"AP型号统计: {table.model_distribution()[None]}\n")
+        for by, title in (('ac', 'AC'), ('group', 'AP组')):
+            states = table.state_counts(by)
+            stas = table.sta_totals(by)
+            models = table.model_distribution(by)
+            f.write(f"\n按{title}统计:\n")
+            for key in sorted(states):
+                f.write(f"- {key}: 状态 {states[key]}, 客户端数 {stas.get(key, 0)}, 型号 {models.get(key, {})}\n")
+    return filename
+
+
+def main():
+    results = asyncio.run(collect_fleet_ap_info_async())
+    table = results['table']
+    failed = [r for r in results['results'] if r['status'] == 'failed']
+    print(f"AC数: {len(results['results'])}, 失败: {len(failed)}, AP总数: {len(table)}")
+    for result in failed:
+        print(f"- {result['ac_ip']}: {result['error']}")
+    if len(table):
+        # 导出合并后的数据及统计信息
+        filename = f'ap_info_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        table.to_csv(filename, AP_CSV_HEADERS)
+        print(f"数据已导出到: {filename}")
+        print(f"统计信息已导出到: {export_fleet_stats(table)}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
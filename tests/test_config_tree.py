@@ -0,0 +1,109 @@
+# tests/test_config_tree.py
+
+from inspection.huawei.config_tree import (
+    diff_against_file, diff_configurations, diff_trees, format_diff, load_configuration, parse_configuration
+)
+
+OLD = """\
+#
+sysname FW01
+#
+interface GigabitEthernet1/0/0
+ ip address 10.0.0.1 255.255.255.0
+ service-manage ping permit
+#
+security-policy
+ rule name allow_web
+  source-zone trust
+  destination-zone untrust
+  action permit
+ rule name deny_all
+  action deny
+#
+return
+"""
+
+
+def _replace(text, old, new):
+    assert old in text
+    return text.replace(old, new)
+
+
+def test_identical_configurations_have_no_changes():
+    assert diff_configurations(OLD, OLD) == []
+    # separators and the end marker are not configuration
+    assert diff_configurations(OLD, OLD.replace('#\n', '').replace('return\n', '')) == []
+
+
+def test_parse_nests_by_indentation():
+    tree = parse_configuration(OLD)
+    rule = tree.find('security-policy', 'rule name allow_web')
+    assert [child.line for child in rule.children] == ['source-zone trust', 'destination-zone untrust', 'action permit']
+    assert tree.find('interface GigabitEthernet1/0/0', 'ip address 10.0.0.1 255.255.255.0') is not None
+
+
+def test_modified_lines_in_a_block():
+    new = _replace(OLD, ' service-manage ping permit\n', ' service-manage ssh permit\n')
+    assert diff_configurations(OLD, new) == [{
+        'type': 'modified',
+        'path': ['interface GigabitEthernet1/0/0'],
+        'added': ['service-manage ssh permit'],
+        'removed': ['service-manage ping permit'],
+        'reordered': False,
+    }]
+
+
+def test_added_and_removed_blocks():
+    new = _replace(OLD, ' rule name deny_all\n  action deny\n',
+                   ' rule name allow_dns\n  service dns\n  action permit\n')
+    changes = diff_configurations(OLD, new)
+    assert {'type': 'added', 'path': ['security-policy', 'rule name allow_dns'],
+            'lines': ['rule name allow_dns', ' service dns', ' action permit']} in changes
+    assert {'type': 'removed', 'path': ['security-policy', 'rule name deny_all'],
+            'lines': ['rule name deny_all', ' action deny']} in changes
+
+
+def test_rule_reorder_is_reported():
+    rules = OLD[OLD.index(' rule name allow_web'):OLD.index('#\nreturn')]
+    allow, deny = rules[:rules.index(' rule name deny_all')], rules[rules.index(' rule name deny_all'):]
+    new = _replace(OLD, rules, deny + allow)
+    assert diff_configurations(OLD, new) == [{
+        'type': 'modified', 'path': ['security-policy'], 'added': [], 'removed': [], 'reordered': True,
+    }]
+
+
+def test_unchanged_subtrees_are_skipped():
+    old, new = parse_configuration(OLD), parse_configuration(_replace(OLD, 'sysname FW01', 'sysname FW02'))
+    assert old.find('security-policy').digest == new.find('security-policy').digest
+    assert diff_trees(old, new) == [{
+        'type': 'modified', 'path': [], 'added': ['sysname FW02'], 'removed': ['sysname FW01'], 'reordered': False,
+    }]
+
+
+def test_duplicate_lines_pair_up():
+    old = "acl 3000\n rule permit ip\n rule permit ip\n"
+    new = "acl 3000\n rule permit ip\n"
+    assert diff_configurations(old, new)[0]['removed'] == ['rule permit ip']
+
+
+def test_format_diff():
+    assert format_diff([]) == "No configuration changes."
+    new = _replace(OLD, 'sysname FW01', 'sysname FW02')
+    assert format_diff(diff_configurations(OLD, new)) == "[MODIFIED] (global)\n  - sysname FW01\n  + sysname FW02"
+
+
+def test_diff_against_raw_config_file(tmp_path):
+    raw = tmp_path / 'raw_config.txt'
+    raw.write_text(
+        "# HUAWEI USG12004 Original Configuration\n\n"
+        "\n==================== CONFIG ====================\n"
+        "\n---------- display current-configuration ----------\n"
+        "Collected at: 2026-10-19T00:00:00\nLine count: 16\n"
+        "Output:\n" + OLD +
+        "\n---------- display version ----------\nOutput:\nVRP\n",
+        encoding='utf-8'
+    )
+    assert load_configuration(str(raw)).strip() == OLD.strip()
+    changes, text = diff_against_file(str(raw), _replace(OLD, 'sysname FW01', 'sysname FW02'))
+    assert len(changes) == 1
+    assert '+ sysname FW02' in text
@@ -0,0 +1,105 @@
+# tests/test_excel_to_yaml.py
+
+import yaml
+
+from utils.excel_to_yaml import merge_devices_into_yaml
+
+
+def _device(ip, name='sw', model='S5735'):
+    return {'name': name, 'ip': ip, 'vendor': 'huawei', 'model': model, 'type': 'huawei'}
+
+
+def _load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def test_creates_file(tmp_path):
+    path = tmp_path / 'switch.yaml'
+    result = merge_devices_into_yaml(str(path), 'switch', [_device('10.0.0.1')])
+    assert result == {'added': 1, 'updated': 0, 'removed': 0}
+    data = _load(path)
+    assert data['switch']['credential_group'] == 'switch_admin'
+    assert data['switch']['devices'] == [_device('10.0.0.1')]
+
+
+def test_appends_new_devices(tmp_path):
+    path = tmp_path / 'switch.yaml'
+    merge_devices_into_yaml(str(path), 'switch', [_device('10.0.0.1')])
+    result = merge_devices_into_yaml(str(path), 'switch', [_device('10.0.0.1'), _device('10.0.0.2')])
+    assert result == {'added': 1, 'updated': 0, 'removed': 0}
+    assert [d['ip'] for d in _load(path)['switch']['devices']] == ['10.0.0.1', '10.0.0.2']
+
+
+def test_appends_at_existing_indentation(tmp_path):
+    path = tmp_path / 'switch.yaml'
+    path.write_text(
+        "switch:\n"
+        "    credential_group: switch_admin\n"
+        "    devices:\n"
+        "        # core\n"
+        "        - name: sw\n"
+        "          ip: 10.0.0.1\n"
+        "          vendor: huawei\n"
+        "          model: S5735\n"
+        "          type: huawei",
+        encoding='utf-8'
+    )
+    result = merge_devices_into_yaml(str(path), 'switch', [_device('10.0.0.2')])
+    assert result == {'added': 1, 'updated': 0, 'removed': 0}
+    assert '        # core\n' in path.read_text(encoding='utf-8')
+    assert _load(path)['switch']['devices'] == [_device('10.0.0.1'), _device('10.0.0.2')]
+
+
+def test_flow_style_list_is_rewritten(tmp_path):
+    path = tmp_path / 'switch.yaml'
+    path.write_text(
+        "switch:\n  credential_group: switch_admin\n"
+        "  devices: [{name: sw, ip: 10.0.0.1, vendor: huawei, model: S5735, type: huawei}]\n",
+        encoding='utf-8'
+    )
+    merge_devices_into_yaml(str(path), 'switch', [_device('10.0.0.2')])
+    assert _load(path)['switch']['devices'] == [_device('10.0.0.1'), _device('10.0.0.2')]
+
+
+def test_duplicate_new_ip_keeps_last_row(tmp_path):
+    path = tmp_path / 'switch.yaml'
+    merge_devices_into_yaml(str(path), 'switch', [_device('10.0.0.1')])
+    result = merge_devices_into_yaml(str(path), 'switch', [
+        _device('10.0.0.2', name='old'), _device('10.0.0.2', name='new'), _device('10.0.0.2', name='newest'),
+    ])
+    assert result['added'] == 1
+    devices = _load(path)['switch']['devices']
+    assert [d['name'] for d in devices] == ['sw', 'newest']
+
+
+def test_update_keeps_hand_added_keys(tmp_path):
+    path = tmp_path / 'switch.yaml'
+    path.write_text(yaml.safe_dump({'switch': {'credential_group': 'switch_admin', 'devices': [
+        {**_device('10.0.0.1'), 'port': 2222, 'jump_host': 'dc1'},
+    ]}}), encoding='utf-8')
+    result = merge_devices_into_yaml(str(path), 'switch', [_device('10.0.0.1', model='S6730')])
+    assert result == {'added': 0, 'updated': 1, 'removed': 0}
+    device = _load(path)['switch']['devices'][0]
+    assert device['model'] == 'S6730'
+    assert device['port'] == 2222
+    assert device['jump_host'] == 'dc1'
+
+
+def test_unchanged_file_is_not_rewritten(tmp_path):
+    path = tmp_path / 'switch.yaml'
+    path.write_text(yaml.safe_dump({'switch': {'credential_group': 'switch_admin', 'devices': [
+        {**_device('10.0.0.1'), 'port': 2222},
+    ]}}), encoding='utf-8')
+    before = path.read_text(encoding='utf-8')
+    result = merge_devices_into_yaml(str(path), 'switch', [_device('10.0.0.1')])
+    assert result == {'added': 0, 'updated': 0, 'removed': 0}
+    assert path.read_text(encoding='utf-8') == before
+
+
+def test_replace_removes_missing_devices(tmp_path):
+    path = tmp_path / 'switch.yaml'
+    merge_devices_into_yaml(str(path), 'switch', [_device('10.0.0.1'), _device('10.0.0.2')])
+    result = merge_devices_into_yaml(str(path), 'switch', [_device('10.0.0.2')], replace=True)
+    assert result == {'added': 0, 'updated': 0, 'removed': 1}
+    assert [d['ip'] for d in _load(path)['switch']['devices']] == ['10.0.0.2']
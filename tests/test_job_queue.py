@@ -0,0 +1,129 @@
+# tests/test_job_queue.py
+
+import sqlite3
+import time
+
+import pytest
+
+from utils.job_queue import JobQueue, SQLiteJobQueue, get_job_queue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(str(tmp_path / 'state' / 'jobs.db'), lease_seconds=60, max_attempts=2, retry_backoff=0)
+
+
+def _devices(n):
+    return [{'device': {'ip': f"10.0.0.{i}"}} for i in range(n)]
+
+
+def test_interface_is_abstract():
+    with pytest.raises(TypeError):
+        JobQueue()
+
+
+def test_claim_prefers_own_shard_then_steals(queue):
+    assert queue.enqueue('run', _devices(4), shards=2) == 4
+    own = queue.claim('run', 'w1', shard=1, limit=2)
+    assert [payload['device']['ip'] for _, payload in own] == ['10.0.0.1', '10.0.0.3']
+    stolen = queue.claim('run', 'w1', shard=1, limit=5)
+    assert [payload['device']['ip'] for _, payload in stolen] == ['10.0.0.0', '10.0.0.2']
+    assert queue.claim('run', 'w2', shard=0, limit=5) == []
+    assert queue.outstanding('run') == 4
+
+
+def test_runs_are_separate(queue):
+    queue.enqueue('a', _devices(1))
+    queue.enqueue('b', _devices(2))
+    assert len(queue.claim('b', 'w1', 0, 10)) == 2
+    assert queue.outstanding('a') == 1
+
+
+def test_complete_records_result_once(queue):
+    queue.enqueue('run', _devices(1))
+    [(job_id, _)] = queue.claim('run', 'w1', 0, 1)
+    queue.complete(job_id, 'w1', {'status': 'success'})
+    queue.complete(job_id, 'w2', {'status': 'failed'})
+    [job] = queue.finished('run')
+    assert job['status'] == 'done'
+    assert job['worker'] == 'w1'
+    assert job['result'] == {'status': 'success'}
+    assert queue.outstanding('run') == 0
+
+
+def test_fail_requeues_until_attempts_are_used(queue):
+    queue.enqueue('run', _devices(1))
+    [(job_id, _)] = queue.claim('run', 'w1', 0, 1)
+    queue.fail(job_id, 'w1', 'timed out')
+    assert queue.finished('run') == []
+
+    [(retry_id, _)] = queue.claim('run', 'w2', 0, 1)
+    assert retry_id == job_id
+    queue.fail(job_id, 'w2', 'timed out', {'status': 'failed', 'error': 'timed out', 'error_kind': 'timeout'})
+    [job] = queue.finished('run')
+    assert job['status'] == 'failed'
+    assert job['result']['error_kind'] == 'timeout'
+    assert queue.outstanding('run') == 0
+
+
+def test_requeued_job_waits_for_backoff(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'), lease_seconds=60, max_attempts=3, retry_backoff=0.1)
+    queue.enqueue('run', _devices(1))
+    [(job_id, _)] = queue.claim('run', 'w1', 0, 1)
+    queue.fail(job_id, 'w1', 'timed out')
+    assert queue.claim('run', 'w2', 0, 1) == []
+    assert queue.outstanding('run') == 1
+
+    time.sleep(0.15)
+    [(retry_id, _)] = queue.claim('run', 'w2', 0, 1)
+    assert retry_id == job_id
+
+
+def test_old_database_gains_backoff_column(tmp_path):
+    path = tmp_path / 'jobs.db'
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE jobs (id INTEGER PRIMARY KEY, run_id TEXT NOT NULL, shard INTEGER NOT NULL, "
+                 "payload TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'queued', worker TEXT, lease_until REAL, "
+                 "attempts INTEGER NOT NULL DEFAULT 0, result TEXT, finished REAL)")
+    conn.commit()
+    conn.close()
+    queue = SQLiteJobQueue(str(path), retry_backoff=0)
+    queue.enqueue('run', _devices(1))
+    [(job_id, _)] = queue.claim('run', 'w1', 0, 1)
+    queue.fail(job_id, 'w1', 'timed out')
+    assert len(queue.claim('run', 'w1', 0, 1)) == 1
+
+
+def test_expired_lease_is_stolen_then_given_up(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'), lease_seconds=0.05, max_attempts=2)
+    queue.enqueue('run', _devices(1))
+    [(job_id, _)] = queue.claim('run', 'dead', 0, 1)
+    assert queue.claim('run', 'w2', 0, 1) == []
+
+    time.sleep(0.1)
+    [(stolen_id, _)] = queue.claim('run', 'w2', 0, 1)
+    assert stolen_id == job_id
+
+    # the second lease also expires: the job has used its attempts and is failed
+    time.sleep(0.1)
+    assert queue.claim('run', 'w3', 0, 1) == []
+    [job] = queue.finished('run')
+    assert job['status'] == 'failed'
+    assert job['result']['error'] == 'worker lease expired'
+
+
+def test_renew_keeps_the_lease(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'), lease_seconds=0.2, max_attempts=2)
+    queue.enqueue('run', _devices(1))
+    [(job_id, _)] = queue.claim('run', 'w1', 0, 1)
+    time.sleep(0.15)
+    queue.renew([job_id], 'w1')
+    time.sleep(0.1)
+    assert queue.claim('run', 'w2', 0, 1) == []
+
+
+def test_get_job_queue_resolves_sqlite_paths(tmp_path):
+    queue = get_job_queue(f"sqlite:///{tmp_path}/jobs.db")
+    assert queue.db_path == f"{tmp_path}/jobs.db"
+    with pytest.raises(ValueError):
+        get_job_queue('redis://localhost/0')
@@ -0,0 +1,20 @@
+# tests/test_model_index.py
+
+from utils.model_index import ModelIndex
+
+
+def test_bundled_index_profiles():
+    index = ModelIndex.from_file()
+    assert index.lookup('USG12004-X') == {'type': 'huawei', 'category': 'firewall', 'profile': 'usg12004'}
+    assert index.lookup('USG6650E') == {'type': 'huawei', 'category': 'firewall', 'profile': None}
+    assert index.profile('USG6650E', 'generic') == 'generic'
+
+
+def test_longest_prefix_wins_per_field():
+    index = ModelIndex({
+        'AC': {'category': 'wireless'},
+        'AC6605': {'type': 'huawei', 'profile': 'ac6605'},
+    })
+    assert index.lookup('AC6605-26PWR') == {'type': 'huawei', 'category': 'wireless', 'profile': 'ac6605'}
+    assert index.lookup('AC6805') == {'type': None, 'category': 'wireless', 'profile': None}
+    assert index.device_type('AP4050') == 'unknown'
@@ -0,0 +1,58 @@
+# tests/test_prompt_compactor.py
+
+from inspection.huawei.prompt_compactor import compact_config_data
+
+CPU_OUTPUT = """\
+CPU Usage Stat. Cycle: 60 (Second)
+CPU Usage            : 12% Max: 97%
+CPU Usage Stat. Time : 2025-02-18  10:00:00
+CPU utilization threshold : 90%
+"""
+
+CONFIG_OUTPUT = """\
+#
+sysname FW1
+#
+interface GigabitEthernet1/0/1
+ undo shutdown
+ mtu 1500
+ negotiation auto
+ undo portswitch
+ ip address 10.0.0.1 255.255.255.0
+#
+undo info-center enable
+undo ftp server enable
+user-interface vty 0 4
+ screen-length 24
+ idle-timeout 30 0
+return
+"""
+
+
+def _compact(cmd, output):
+    return compact_config_data({'system': {cmd: {'output': output}}})
+
+
+def test_cpu_uses_current_usage_only():
+    text = _compact('display cpu-usage', CPU_OUTPUT)
+    assert "display cpu-usage: CPU usage 12%, max 97%" in text
+    assert 'ANOMALY' not in text
+
+
+def test_cpu_alert_on_high_usage():
+    text = _compact('display cpu-usage', CPU_OUTPUT.replace('12%', '85%'))
+    assert "ANOMALY: CPU usage 85% is at or above 80%" in text
+
+
+def test_configuration_drops_defaults_and_undo_lines():
+    text = _compact('display current-configuration all', CONFIG_OUTPUT)
+    body = text.split('--- display current-configuration all ---')[1]
+    assert body.split('\n')[1:] == [
+        'sysname FW1',
+        'interface GigabitEthernet1/0/1',
+        ' ip address 10.0.0.1 255.255.255.0',
+        'undo info-center enable',
+        'user-interface vty 0 4',
+        ' idle-timeout 30 0',
+    ]
+    assert '4 default lines and 2 undo lines' in text
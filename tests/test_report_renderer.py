@@ -0,0 +1,69 @@
+# tests/test_report_renderer.py
+
+from utils.report_renderer import extract_findings, render_report
+
+
+def test_counts_by_most_severe_level():
+    findings = extract_findings("\n".join([
+        "# Findings",
+        "- Critical: telnet is enabled on the management interface",
+        "- High risk: policy rule any-any permits all traffic",
+        "- Medium: NTP is not configured",
+        "- Low: banner is missing",
+        "1. 风险等级：高 存在弱口令账号",
+        "2. 中危：日志服务器不可达",
+        "* 风险等级：严重 HA 心跳中断",
+    ]))
+    assert findings['counts'] == {'critical': 2, 'high': 2, 'medium': 2, 'low': 1}
+    assert findings['risk_score'] == 2 * 10 + 2 * 5 + 2 * 2 + 1
+    assert findings['top_findings'][0].startswith('Critical')
+    assert len(findings['top_findings']) == 4
+
+
+def test_benign_words_are_not_findings():
+    findings = extract_findings("\n".join([
+        "- The policy allows traffic that follows the expected flow",
+        "- Session count is below the limit",
+        "- The highest CPU usage was 35%",
+        "- Interface GE1/0/1 is up",
+    ]))
+    assert findings['counts'] == {'critical': 0, 'high': 0, 'medium': 0, 'low': 0}
+    assert findings['risk_score'] == 0
+    assert findings['top_findings'] == []
+
+
+def test_labelled_level_wins():
+    findings = extract_findings("\n".join([
+        "- 严重程度：低 登录提示信息缺失",
+        "- Severity: Medium - critical services lack a backup route",
+        "- Priority: high",
+    ]))
+    assert findings['counts'] == {'critical': 0, 'high': 1, 'medium': 1, 'low': 1}
+    assert findings['risk_score'] == 5 + 2 + 1
+
+
+def test_section_headings_are_not_findings():
+    findings = extract_findings("\n".join([
+        "   - High Availability Status",
+        "   - **High-Risk Configuration Items**",
+        "   - Critical Priority Items:",
+        "   - Medium Priority Optimizations",
+        "   - Low Priority Suggestions",
+        "- High availability: HRP is not configured",
+    ]))
+    assert findings['counts'] == {'critical': 0, 'high': 0, 'medium': 0, 'low': 0}
+    assert findings['risk_score'] == 0
+
+
+def test_only_list_items_are_classified():
+    findings = extract_findings("Overall the risk is high.\n\n| High | table cell |\n")
+    assert findings['counts']['high'] == 0
+
+
+def test_render_report_writes_html(tmp_path):
+    report = tmp_path / 'report.md'
+    report.write_text("# Report\n\n- high: SSH v1 enabled\n", encoding='utf-8')
+    findings = render_report(str(report))
+    assert findings['counts']['high'] == 1
+    assert findings['html'] == str(tmp_path / 'report.html')
+    assert '<li>high: SSH v1 enabled</li>' in (tmp_path / 'report.html').read_text(encoding='utf-8')
@@ -0,0 +1,101 @@
+# tests/test_routing_table.py
+
+import pytest
+
+from inspection.huawei.routing_table import RoutingTable, parse_routing_table
+
+ROUTING_OUTPUT = """\
+Route Flags: R - relay, D - download to fib
+------------------------------------------------------------------------------
+Routing Tables: Public
+         Destinations : 6        Routes : 7
+
+Destination/Mask    Proto   Pre  Cost      Flags NextHop         Interface
+
+        0.0.0.0/0   Static  60   0          RD   203.0.113.1     GigabitEthernet1/0/0
+       10.0.0.0/8   Static  60   0          RD   10.255.0.1      GigabitEthernet1/0/1
+      10.1.0.0/16   OSPF    10   2          D    10.1.255.1      GigabitEthernet1/0/2
+      10.1.2.0/24   OSPF    10   3          D    10.1.255.2      GigabitEthernet1/0/3
+                    OSPF    10   3          D    10.1.255.3      GigabitEthernet1/0/4
+    192.0.2.0/24    Static  60   0          D    0.0.0.0         NULL0
+     10.1.2.5/32    Direct  0    0          D    127.0.0.1       LoopBack0
+"""
+
+
+@pytest.fixture
+def table():
+    return parse_routing_table(ROUTING_OUTPUT)
+
+
+def test_parse_counts_ecmp_paths(table):
+    assert len(table) == 7
+    assert table.protocol_counts() == {'Static': 3, 'OSPF': 3, 'Direct': 1}
+
+
+@pytest.mark.parametrize('address, prefix', [
+    ('10.1.2.5', '10.1.2.5/32'),
+    ('10.1.2.6', '10.1.2.0/24'),
+    ('10.1.3.1', '10.1.0.0/16'),
+    ('10.200.0.1', '10.0.0.0/8'),
+    ('8.8.8.8', '0.0.0.0/0'),
+    ('192.0.2.77', '192.0.2.0/24'),
+])
+def test_longest_prefix_match(table, address, prefix):
+    assert table.lookup(address)[0]['prefix'] == prefix
+
+
+def test_lookup_returns_all_ecmp_paths(table):
+    paths = table.lookup('10.1.2.200')
+    assert [path['nexthop'] for path in paths] == ['10.1.255.2', '10.1.255.3']
+    assert {path['interface'] for path in paths} == {'GigabitEthernet1/0/3', 'GigabitEthernet1/0/4'}
+
+
+def test_lookup_without_default_route():
+    table = RoutingTable()
+    table.add('10.0.0.0/8', 'Static', 60, 0, '10.255.0.1', 'GE1/0/1')
+    table.add('10.128.0.0/9', 'Static', 60, 0, '10.255.0.2', 'GE1/0/2')
+    assert table.lookup('11.0.0.1') == []
+    assert table.lookup('10.200.0.1')[0]['prefix'] == '10.128.0.0/9'
+    assert table.lookup('10.1.0.1')[0]['prefix'] == '10.0.0.0/8'
+
+
+def test_insertion_order_does_not_matter():
+    prefixes = ['10.1.2.0/24', '10.0.0.0/8', '10.1.0.0/16', '10.1.2.128/25', '0.0.0.0/0']
+    forward, backward = RoutingTable(), RoutingTable()
+    for prefix in prefixes:
+        forward.add(prefix, 'Static', 60, 0, '192.0.2.1', 'GE1/0/1')
+    for prefix in reversed(prefixes):
+        backward.add(prefix, 'Static', 60, 0, '192.0.2.1', 'GE1/0/1')
+    for address in ('10.1.2.200', '10.1.2.1', '10.1.9.9', '10.9.9.9', '172.16.0.1'):
+        assert forward.lookup(address)[0]['prefix'] == backward.lookup(address)[0]['prefix']
+
+
+def test_invalid_prefix_length():
+    with pytest.raises(ValueError):
+        RoutingTable().add('10.0.0.0/33', 'Static', 60, 0, '10.0.0.1', 'GE1/0/1')
+
+
+def test_anomalies(table):
+    anomalies = table.anomalies()
+    assert anomalies['default'] == []
+    assert anomalies['blackholes'] == ['192.0.2.0/24']
+    assert ('10.1.2.0/24', '10.1.0.0/16') in anomalies['overlaps']
+    assert all(inner != '10.1.2.5/32' for inner, _ in anomalies['overlaps'])
+
+
+def test_local_host_routes_are_not_overlaps():
+    table = RoutingTable()
+    table.add('0.0.0.0/0', 'Static', 60, 0, '203.0.113.1', 'GE1/0/0')
+    table.add('10.1.2.0/24', 'Direct', 0, 0, '10.1.2.1', 'GE1/0/1')
+    table.add('10.1.2.1/32', 'Direct', 0, 0, '127.0.0.1', 'InLoopBack0')
+    table.add('10.1.2.255/32', 'Direct', 0, 0, '127.0.0.1', 'InLoopBack0')
+    table.add('10.1.2.9/32', 'Static', 60, 0, '10.1.2.254', 'GE1/0/1')
+    anomalies = table.anomalies()
+    assert anomalies['overlaps'] == [('10.1.2.9/32', '10.1.2.0/24')]
+    assert anomalies['overlap_count'] == 1
+
+
+def test_save_and_load(table, tmp_path):
+    loaded = RoutingTable.load(table.save(str(tmp_path / 'routing' / 'table.bin')))
+    assert len(loaded) == len(table)
+    assert loaded.lookup('10.1.2.6') == table.lookup('10.1.2.6')
@@ -0,0 +1,79 @@
+# tests/test_run_journal.py
+
+import pytest
+
+from utils import run_journal
+from utils.run_journal import RunJournal
+
+
+def test_resume_restores_stages_and_refs(tmp_path):
+    path = str(tmp_path / 'run.jsonl')
+    journal = RunJournal(path)
+    journal.mark('10.0.0.1', 'collected', ref='snap.json')
+    journal.mark('10.0.0.1', 'saved', ref='raw.txt')
+    journal.mark('10.0.0.1', 'analyzed', ref='analysis.md')
+    journal.mark('10.0.0.1', 'reported', ref='report.md')
+    journal.mark('10.0.0.2', 'collected', ref='snap2.json')
+    journal.mark('10.0.0.2', 'saved', status='failed', error='disk full')
+
+    resumed = RunJournal(path)
+    assert resumed.is_complete('10.0.0.1')
+    assert resumed.ref('10.0.0.1', 'reported') == 'report.md'
+    assert not resumed.is_complete('10.0.0.2')
+    assert resumed.is_done('10.0.0.2', 'collected')
+    assert not resumed.is_done('10.0.0.2', 'saved')
+    assert resumed.state['10.0.0.2']['saved']['error'] == 'disk full'
+    assert resumed.summary() == {'pending': 0, 'collected': 1, 'saved': 0, 'analyzed': 0, 'reported': 1}
+
+
+def test_later_records_win(tmp_path):
+    path = str(tmp_path / 'run.jsonl')
+    journal = RunJournal(path)
+    journal.mark('10.0.0.1', 'saved', status='failed', error='timeout')
+    journal.mark('10.0.0.1', 'saved', ref='raw.txt')
+    resumed = RunJournal(path)
+    assert resumed.is_done('10.0.0.1', 'saved')
+    assert resumed.ref('10.0.0.1', 'saved') == 'raw.txt'
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    path = tmp_path / 'run.jsonl'
+    journal = RunJournal(str(path))
+    journal.mark('10.0.0.1', 'collected', ref='snap.json')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"device": "10.0.0.1", "stage": "sav')
+    resumed = RunJournal(str(path))
+    assert resumed.is_done('10.0.0.1', 'collected')
+    assert not resumed.is_done('10.0.0.1', 'saved')
+
+
+def test_unknown_stage(tmp_path):
+    with pytest.raises(ValueError):
+        RunJournal(str(tmp_path / 'run.jsonl')).mark('10.0.0.1', 'uploaded')
+
+
+def test_latest_opens_newest_journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_journal, 'JOURNAL_DIR', str(tmp_path))
+    assert RunJournal.latest() is None
+    RunJournal(str(tmp_path / 'run_20260101_000000.jsonl')).mark('10.0.0.1', 'collected')
+    RunJournal(str(tmp_path / 'run_20260102_000000.jsonl')).mark('10.0.0.2', 'collected')
+    latest = RunJournal.latest()
+    assert latest.path.endswith('run_20260102_000000.jsonl')
+    assert list(latest.state) == ['10.0.0.2']
+
+
+@pytest.mark.skipif(run_journal.fcntl is None, reason="no fcntl on this platform")
+def test_writes_hold_the_file_lock(tmp_path, monkeypatch):
+    calls = []
+    real_flock = run_journal.fcntl.flock
+
+    def flock(fd, operation):
+        calls.append(operation)
+        real_flock(fd, operation)
+
+    monkeypatch.setattr(run_journal.fcntl, 'flock', flock)
+    path = str(tmp_path / 'run.jsonl')
+    RunJournal(path).mark('10.0.0.1', 'collected')
+    RunJournal(path).mark('10.0.0.2', 'collected')
+    assert calls == [run_journal.fcntl.LOCK_EX, run_journal.fcntl.LOCK_UN] * 2
+    assert set(RunJournal(path).state) == {'10.0.0.1', '10.0.0.2'}
@@ -0,0 +1,44 @@
+# tests/test_search_index.py
+
+import pytest
+
+from utils.search_index import ConfigSearchIndex
+
+RAW_CONFIG = """\
+---------- display current-configuration ----------
+interface GigabitEthernet1/0/1
+ ip address 10.1.2.1 255.255.255.0
+ip route-static 10.8.0.0 255.255.0.0 10.1.2.254
+acl number 3000
+ rule 5 permit ip source 10.9.0.0 0.0.255.255
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / 'raw_config_FW1_20250218_100000.txt'
+    path.write_text(RAW_CONFIG, encoding='utf-8')
+    index = ConfigSearchIndex(str(tmp_path / 'index' / 'config_index.db'))
+    assert index.index_file(str(path))
+    return index
+
+
+def _texts(rows):
+    return sorted(row['text'] for row in rows)
+
+
+def test_interface_address_is_indexed_as_host(index):
+    assert _texts(index.search_cidr('10.1.2.1')) == ['10.1.2.1/32']
+    assert _texts(index.search_cidr('10.1.2.1', containing=True)) == ['10.1.2.0/24', '10.1.2.1/32']
+
+
+def test_network_references_are_not_duplicated(index):
+    assert _texts(index.search_cidr('10.8.0.0/16')) == ['10.8.0.0/16']
+    assert _texts(index.search_cidr('10.9.0.0/16')) == ['10.9.0.0/16']
+    assert _texts(index.search_cidr('10.1.2.0/24')) == ['10.1.2.0/24', '10.1.2.1/32', '10.1.2.254/32']
+
+
+def test_token_search(index):
+    [row] = index.search('GigabitEthernet1/0/1')
+    assert row['device'] == 'FW1'
+    assert row['command'] == 'display current-configuration'
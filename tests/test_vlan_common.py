@@ -0,0 +1,131 @@
+# tests/test_vlan_common.py
+
+import pytest
+
+from operation.switch.huawei.vlan_common import (
+    MAX_RANGES_PER_COMMAND, batch_commands, bitmap_from_text, compress_ranges, format_bitmap, from_bitmap,
+    parse_vlan_list, parse_vlan_summary, ports_by_vlan, to_bitmap, vlan_restore_commands
+)
+
+VRP5_SUMMARY = """\
+static vlan:
+Total 6 static vlan.
+  1 10 20 to 23
+
+dynamic vlan:
+Total 0 dynamic vlan.
+
+reserved vlan:
+Total 0 reserved vlan.
+"""
+
+CE_SUMMARY = """\
+Number of static VLAN: 4
+VLAN ID: 1 100 to 102
+
+Number of dynamic VLAN: 1
+VLAN ID: 4000
+
+Number of service VLAN: 0
+VLAN ID:
+"""
+
+CONFIG = """\
+#
+vlan batch 10 20 30
+#
+vlan 20
+ name Users
+ description office floor 2
+#
+vlan 30
+ name Voice
+#
+interface GigabitEthernet0/0/1
+ port link-type access
+ port default vlan 20
+#
+interface GigabitEthernet0/0/2
+ port link-type trunk
+ port trunk allow-pass vlan 10 20 to 30
+#
+interface GigabitEthernet0/0/3
+ port link-type trunk
+ port trunk allow-pass vlan 2 to 4094
+#
+interface GigabitEthernet0/0/4
+ port link-type access
+ port default vlan 10
+#
+"""
+
+
+def test_parse_vlan_list():
+    assert parse_vlan_list("10 20 to 22 30-31") == {10, 20, 21, 22, 30, 31}
+    assert parse_vlan_list([5, '7 to 8']) == {5, 7, 8}
+    assert parse_vlan_list(100) == {100}
+    assert parse_vlan_list(None) == set()
+    assert parse_vlan_list("12 to 10") == {10, 11, 12}
+
+
+def test_parse_vlan_list_rejects_out_of_range():
+    with pytest.raises(ValueError):
+        parse_vlan_list("4000 to 4095")
+    with pytest.raises(ValueError):
+        parse_vlan_list("0")
+
+
+def test_compress_ranges():
+    assert compress_ranges([12, 10, 11, 20, 22, 23]) == ['10 to 12', '20', '22 to 23']
+    assert compress_ranges([]) == []
+
+
+def test_batch_commands_split_at_range_limit():
+    vlans = range(10, 10 + 2 * (MAX_RANGES_PER_COMMAND + 2), 2)
+    commands = batch_commands(vlans)
+    assert len(commands) == 2
+    assert commands[0].startswith('vlan batch 10 12 ')
+    assert len(commands[0].split()) == 2 + MAX_RANGES_PER_COMMAND
+    assert batch_commands({5, 6, 7}, undo=True) == ['undo vlan batch 5 to 7']
+    assert batch_commands(set()) == []
+
+
+def test_bitmaps():
+    bitmap = bitmap_from_text("1 10 20-22")
+    assert bitmap == to_bitmap([1, 10, 20, 21, 22])
+    assert from_bitmap(bitmap) == [1, 10, 20, 21, 22]
+    assert format_bitmap(bitmap) == '1 10 20 to 22'
+    # out-of-range ranges are skipped rather than raising
+    assert bitmap_from_text("4095") == 0
+
+
+def test_parse_vlan_summary_vrp5():
+    assert parse_vlan_summary(VRP5_SUMMARY) == {1, 10, 20, 21, 22, 23}
+
+
+def test_parse_vlan_summary_ce():
+    assert parse_vlan_summary(CE_SUMMARY) == {1, 100, 101, 102}
+
+
+def test_ports_by_vlan_skips_allow_all_trunks():
+    ports = {
+        'GE0/0/1': {'link_type': 'access', 'pvid': 20, 'allowed': to_bitmap([20])},
+        'GE0/0/2': {'link_type': 'trunk', 'pvid': 1, 'allowed': bitmap_from_text('1 10 20-30')},
+        'GE0/0/3': {'link_type': 'trunk', 'pvid': 1, 'allowed': bitmap_from_text('1-4094')},
+    }
+    assert ports_by_vlan(ports, {20, 30, 40}) == {20: ['GE0/0/1', 'GE0/0/2'], 30: ['GE0/0/2']}
+
+
+def test_vlan_restore_commands():
+    assert vlan_restore_commands(CONFIG, {20, 30}) == [
+        'vlan 20', 'name Users', 'description office floor 2', 'quit',
+        'vlan 30', 'name Voice', 'quit',
+        'interface GigabitEthernet0/0/1', 'port default vlan 20', 'quit',
+        'interface GigabitEthernet0/0/2', 'port trunk allow-pass vlan 10 20 to 30', 'quit',
+        'interface GigabitEthernet0/0/3', 'port trunk allow-pass vlan 2 to 4094', 'quit',
+    ]
+    # VLAN 99 has no view of its own; only the trunk that allows it is restored
+    assert vlan_restore_commands(CONFIG, {99}) == [
+        'interface GigabitEthernet0/0/3', 'port trunk allow-pass vlan 2 to 4094', 'quit',
+    ]
+    assert vlan_restore_commands("vlan 99\n name Test\n#\n", {20}) == []
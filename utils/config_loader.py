@@ -2,7 +2,10 @@
 
 import os
 import yaml
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from utils.model_index import get_model_index
+from utils.inventory_cache import load_yaml, get_device_index
 
 
 class ConfigLoader:
@@ -28,15 +31,27 @@ class ConfigLoader:
             # build the full path of the configuration file
             device_config_path = os.path.join(base_dir, 'config', f'{device_type}.yaml')
 
-            # load the device configuration
-            with open(device_config_path, 'r', encoding='utf-8') as f:
-                device_config = yaml.safe_load(f)
+            # load the device configuration (cached, see utils/inventory_cache.py)
+            device_config = load_yaml(device_config_path)
 
             return device_config[device_type]['devices']
 
         except Exception as e:
             raise Exception(f"load config of devices failed: {str(e)}")
 
+    @staticmethod
+    def classify(model: Optional[str]) -> Dict[str, Optional[str]]:
+        """
+        classify a device model
+
+        Args:
+            model: device model, e.g. USG12004 or CE16808
+
+        Returns:
+            dict with the netmiko 'type', the 'category' and the inspection 'profile'
+        """
+        return get_model_index().lookup(model)
+
     @staticmethod
     def get_device_info(ip: str, device_type: str) -> Dict[str, Any]:
         """
@@ -58,20 +73,12 @@ class ConfigLoader:
             device_config_path = os.path.join(base_dir, 'config', f'{device_type}.yaml')
             credential_config_path = os.path.join(base_dir, 'config', 'credential.yaml')
 
-            # load the device configuration
-            with open(device_config_path, 'r', encoding='utf-8') as f:
-                device_config = yaml.safe_load(f)
-
-            # load the credential configuration
-            with open(credential_config_path, 'r', encoding='utf-8') as f:
-                credential_config = yaml.safe_load(f)
+            # load the device and credential configuration
+            device_config = load_yaml(device_config_path)
+            credential_config = load_yaml(credential_config_path)
 
             # look for the device configuration
-            device = None
-            for dev in device_config[device_type]['devices']:
-                if dev['ip'] == ip:
-                    device = dev
-                    break
+            device = get_device_index(device_config_path, device_type).get(str(ip))
 
             if not device:
                 raise ValueError(f"NO {device_type} configuration with IP {ip} found")
@@ -85,15 +92,25 @@ class ConfigLoader:
 
             credentials = credential_config['credential'][credential_group]
 
+            # fall back to the model index when the inventory has no usable type
+            netmiko_type = device.get('type')
+            if not netmiko_type or netmiko_type == 'unknown':
+                netmiko_type = get_model_index().device_type(device.get('model'))
+
             # build the device information
             device_info = {
-                'device_type': device['type'],
+                'device_type': netmiko_type,
                 'host': device['ip'],
                 'username': credentials['username'],
                 'password': credentials['password'],
-                'port': 22  # default port
+                'port': int(device.get('port') or device_config[device_type].get('port') or 22)
             }
 
+            # devices behind a bastion name it per device or for the whole file
+            jump_host = device.get('jump_host', device_config[device_type].get('jump_host'))
+            if jump_host:
+                device_info['jump_host'] = ConfigLoader.get_jump_host(jump_host)
+
             return device_info
 
         except FileNotFoundError as e:
@@ -101,4 +118,36 @@ class ConfigLoader:
         except yaml.YAMLError as e:
             raise Exception(f"Failed to parse the yaml: {str(e)}")
         except Exception as e:
-            raise Exception(f"Get config failed: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Get config failed: {str(e)}")
+
+    @staticmethod
+    def get_jump_host(name: str) -> Dict[str, Any]:
+        """
+        get the connection information of a bastion in config/jump_hosts.yaml
+
+        Args:
+            name: the bastion name referenced by a device's jump_host
+
+        Returns:
+            dict with name, host, port, username, password, max_sessions and trust_unknown_host_key
+        """
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        jump_hosts = load_yaml(os.path.join(base_dir, 'config', 'jump_hosts.yaml'))['jump_hosts']
+        if name not in jump_hosts:
+            raise ValueError(f"No jump host named {name} in jump_hosts.yaml")
+        jump_host = jump_hosts[name]
+
+        credential_config = load_yaml(os.path.join(base_dir, 'config', 'credential.yaml'))
+        if jump_host['credential_group'] not in credential_config['credential']:
+            raise ValueError(f"No found authentication group of {jump_host['credential_group']}")
+        credentials = credential_config['credential'][jump_host['credential_group']]
+
+        return {
+            'name': name,
+            'host': jump_host['host'],
+            'port': int(jump_host.get('port') or 22),
+            'username': credentials['username'],
+            'password': credentials['password'],
+            'max_sessions': jump_host.get('max_sessions'),
+            'trust_unknown_host_key': bool(jump_host.get('trust_unknown_host_key', False)),
+        }
@@ -0,0 +1,196 @@
+# utils/cpu_executor.py
+
+import os
+import uuid
+import pickle
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, List, Optional
+
+from utils.logger import get_logger
+from utils.settings import BASE_DIR, CPU_EXECUTOR_SETTINGS
+
+SNAPSHOT_DIR = os.path.join(BASE_DIR, 'output', 'state', 'cpu_handoff')
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+class SharedText:
+    """Large text placed in shared memory; only its name and size are pickled to the worker"""
+
+    def __init__(self, text: str):
+        data = text.encode('utf-8')
+        self.size = len(data)
+        self._shm = SharedMemory(create=True, size=max(self.size, 1))
+        self._shm.buf[:self.size] = data
+        self.name = self._shm.name
+
+    def __getstate__(self):
+        return {'name': self.name, 'size': self.size}
+
+    def __setstate__(self, state):
+        self.name, self.size, self._shm = state['name'], state['size'], None
+
+    def read(self) -> str:
+        shm = SharedMemory(name=self.name)
+        try:
+            return bytes(shm.buf[:self.size]).decode('utf-8')
+        finally:
+            shm.close()
+
+    def release(self) -> None:
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+class SnapshotRef:
+    """Text on disk passed to the worker by path; files written for the handoff are removed afterwards"""
+
+    def __init__(self, path: str, owned: bool = False):
+        self.path = path
+        self.owned = owned
+
+    @classmethod
+    def write(cls, text: str) -> 'SnapshotRef':
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        path = os.path.join(SNAPSHOT_DIR, f"{uuid.uuid4().hex}.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return cls(path, owned=True)
+
+    def __len__(self) -> int:
+        return os.path.getsize(self.path)
+
+    def read(self) -> str:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def release(self) -> None:
+        if self.owned and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def run_cpu_bound(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a CPU-heavy parse, diff or compaction step, in the process pool once its input is large.
+
+    Below CPU_EXECUTOR_SETTINGS['offload_threshold'] characters of text
+    (summed over strings nested in the arguments) the call runs inline, as
+    the pool round trip would cost more than it saves. Above it, strings of
+    at least 'handoff_threshold' characters are handed over through shared
+    memory or a snapshot file instead of being pickled through the pool's
+    pipe, and SnapshotRef arguments are read by the worker itself. The
+    calling thread only waits on the result, so it does not hold the GIL
+    while SSH sessions and LLM calls run on the other threads.
+
+    Must be called from a worker thread, not from the event loop. func and
+    its result must be picklable (a module-level function or a class method).
+    If the pool cannot be used (the arguments do not pickle, shared memory or
+    the workers cannot be created, or a worker died) the call falls back to
+    running inline; exceptions raised by func itself propagate.
+
+    Returns:
+        what func returns
+    """
+    if not CPU_EXECUTOR_SETTINGS['enabled'] or _text_size((args, kwargs)) < CPU_EXECUTOR_SETTINGS['offload_threshold']:
+        return _call(func, args, kwargs)
+
+    handles: List[Any] = []
+    try:
+        try:
+            packed = _pack((args, kwargs), handles)
+            # pickled here so that a pickling failure is not mistaken for an error raised by func
+            pickle.dumps((func, packed))
+            future = _get_pool().submit(_call, func, *packed)
+        except (BrokenProcessPool, RuntimeError, pickle.PicklingError, TypeError, AttributeError, OSError) as e:
+            return _run_inline(func, args, kwargs, e)
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            return _run_inline(func, args, kwargs, e)
+    finally:
+        for handle in handles:
+            handle.release()
+
+
+def _run_inline(func: Callable, args: tuple, kwargs: dict, error: Exception) -> Any:
+    get_logger('cpu_executor').warning(f"CPU pool unavailable for {getattr(func, '__name__', func)}, "
+                                       f"running inline: {str(error)}")
+    if isinstance(error, BrokenProcessPool):
+        _reset_pool()
+    return _call(func, args, kwargs)
+
+
+def shutdown() -> None:
+    """Stop the worker processes (they are also stopped at interpreter exit)"""
+    _reset_pool()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process full of SSH and HTTP threads can copy held locks into the child
+            _pool = ProcessPoolExecutor(
+                max_workers=CPU_EXECUTOR_SETTINGS['workers'],
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _call(func: Callable, args: tuple, kwargs: dict) -> Any:
+    return func(*_unpack(args), **_unpack(kwargs))
+
+
+def _text_size(obj: Any) -> int:
+    if isinstance(obj, str):
+        return len(obj)
+    if isinstance(obj, SnapshotRef):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(_text_size(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_text_size(value) for value in obj)
+    return 0
+
+
+def _pack(obj: Any, handles: List[Any]) -> Any:
+    """Replace large strings with shared memory or snapshot handles, recording them for release"""
+    if isinstance(obj, str):
+        if len(obj) < CPU_EXECUTOR_SETTINGS['handoff_threshold']:
+            return obj
+        if CPU_EXECUTOR_SETTINGS['handoff'] == 'file':
+            handle = SnapshotRef.write(obj)
+        else:
+            handle = SharedText(obj)
+        handles.append(handle)
+        return handle
+    if isinstance(obj, dict):
+        return {key: _pack(value, handles) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_pack(value, handles) for value in obj)
+    return obj
+
+
+def _unpack(obj: Any) -> Any:
+    if isinstance(obj, (SharedText, SnapshotRef)):
+        return obj.read()
+    if isinstance(obj, dict):
+        return {key: _unpack(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_unpack(value) for value in obj)
+    return obj
@@ -1,171 +1,246 @@
 # utils/excel_to_yaml.py
 
+import os
+import re
+from typing import Dict, List, Iterator, Any, Optional
+
 import pandas as pd
 import yaml
-from typing import Dict, List
-import os
 
+from utils.model_index import ModelIndex, get_model_index
+
+CREDENTIAL_GROUPS = {
+    'switch': 'switch_admin',
+    'firewall': 'firewall_admin',
+    'wireless': 'wireless_admin',
+}
+
+REQUIRED_COLUMNS = ['name', 'ip', 'vendor', 'model']
 
-def excel_to_yaml(excel_file: str, sheet_name: str = 'Sheet1') -> None:
+# the block-style item under a "devices:" key, capturing the item indentation
+_DEVICES_ITEM = re.compile(r'^[ ]*devices:[ ]*(?:#.*)?\n(?:[ ]*(?:#.*)?\n)*([ ]*)-[ ]', re.MULTILINE)
+
+
+def excel_to_yaml(excel_file: str, sheet_name: str = 'Sheet1', chunk_size: int = 5000,
+                  replace: bool = False) -> Dict[str, Any]:
     """
-    Make EXCEL date to YAML
+    Import an Excel/CSV inventory into the config/<category>.yaml files.
+
+    Rows are streamed in chunks (CSV via pandas, xlsx via read-only openpyxl),
+    cleaned and classified column-wise, then merged into the existing YAML
+    files by IP: new devices are appended, changed devices are updated, and
+    files whose content does not change are not written.
 
     Args:
-        excel_file: Excel file path
-        sheet_name: the name of sheet_name, default sheet is the first choice
+        excel_file: Excel (.xlsx) or CSV file path
+        sheet_name: the name of sheet, only used for Excel files
+        chunk_size: rows processed per chunk
+        replace: drop devices that are not in the inventory file
+
+    Returns:
+        statistics of the import
     """
-    # read excel file
-    # 确保Excel文件存在
-    # 获取当前脚本的绝对路径
     current_dir = os.path.dirname(os.path.abspath(__file__))
-    # 获取项目根目录（假设是当前目录的上一级）
     project_root = os.path.dirname(current_dir)
-    # 构建config目录的完整路径
     config_dir = os.path.join(project_root, 'config')
 
-    print(f"当前目录: {current_dir}")
-    print(f"项目根目录: {project_root}")
-    print(f"配置文件目录: {config_dir}")
+    devices_by_category: Dict[str, List[Dict[str, str]]] = {category: [] for category in CREDENTIAL_GROUPS}
+    stats = {'total': 0, 'processed': 0, 'unknown': 0, 'unknown_devices': []}
 
     try:
-        # 读取Excel文件
-        df = pd.read_excel(excel_file, sheet_name='Sheet1')
-        # 添加调试信息
-        print("DataFrame类型:", type(df))
-        print("DataFrame内容:")
-        print(df)
-        print("DataFrame列名:", df.columns.tolist())
+        for chunk in iter_inventory_chunks(excel_file, sheet_name, chunk_size):
+            _process_chunk(chunk, devices_by_category, stats)
+    except (ValueError, TypeError):
+        raise
     except Exception as e:
         raise Exception(f"读取Excel文件失败: {str(e)}")
 
-    # 确保DataFrame格式正确
-    if not isinstance(df, pd.DataFrame):
-        raise TypeError("Excel数据读取错误，没有得到正确的DataFrame对象")
-
-    # 检查必要的列是否存在
-    required_columns = ['name', 'ip', 'vendor', 'model']
-    missing_columns = [col for col in required_columns if col not in df.columns]
-    if missing_columns:
-        raise ValueError(f"Excel文件缺少必要的列: {missing_columns}")
-
-    # Devices are processed in groups based on vendors
-    devices_by_type = {
-        'switch': {'credential_group': 'switch_admin', 'devices': []},
-        'firewall': {'credential_group': 'firewall_admin', 'devices': []},
-        'wireless': {'credential_group': 'wireless_admin', 'devices': []}
-    }
-
-    # Device type mappings
-    device_type_mapping = {
-        # HUAWEI
-        'CE': 'huawei_vrpv8',
-        'CE16808': 'huawei_vrpv8',
-        'CE6881': 'huawei_vrpv8',
-        'S12700': 'huawei',
-        'S5735': 'huawei',
-        'S5700': 'huawei',
-        'S5720': 'huawei',
-        'S6720': 'huawei',  #
-        'S5700EI': 'huawei',  #
-        'S5720EI': 'huawei',  #
-        'USG': 'huawei',
-        'AC6605': 'huawei',
-        # H3C
-        'S5560': 'hp_comware',
-        'S7510': 'hp_comware',
-    }
-
-    # 添加计数器
-    processed_count = 0
-    unknown_count = 0
-    unknown_devices = []
-
-    for index, row in df.iterrows():
+    for category, devices in devices_by_category.items():
+        if not devices and not replace:
+            continue
+        yaml_file = os.path.join(config_dir, f'{category}.yaml')
         try:
-            # 处理IP地址中可能的换行符
-            ip = str(row['ip']).split('\n')[0].strip()
-
-            device_info = {
-                'name': str(row['name']).strip(),
-                'ip': ip,
-                'vendor': str(row['vendor']).lower().strip(),
-                'model': str(row['model']).strip(),
-                'type': get_device_type(str(row['model']).strip(), device_type_mapping)
-            }
-
-            category = get_device_category(str(row['model']))
-            if category in devices_by_type:
-                devices_by_type[category]['devices'].append(device_info)
-                processed_count += 1
-                print(f"处理第{index + 1}行: {device_info['name']} - {category}")
-            else:
-                unknown_count += 1
-                unknown_devices.append(f"{device_info['name']} ({device_info['model']})")
-                print(f"未知设备类型 - 第{index + 1}行: {device_info['name']} - {device_info['model']}")
+            stats[category] = merge_devices_into_yaml(yaml_file, category, devices, replace=replace)
         except Exception as e:
-            print(f"处理第{index + 1}行时出错: {str(e)}")
-            continue
-
-
-    # 保存YAML文件
-    for category, data in devices_by_type.items():
-        if data['devices']:
-            yaml_file = os.path.join(config_dir, f'{category}.yaml')
-            try:
-                with open(yaml_file, 'w', encoding='utf-8') as f:
-                    yaml.safe_dump({category: data}, f, allow_unicode=True, sort_keys=False)
-                print(f"成功生成配置文件: {yaml_file}")
-                # 验证文件是否真的创建成功
-                if os.path.exists(yaml_file):
-                    print(f"确认文件存在: {yaml_file}")
-                    print(f"文件大小: {os.path.getsize(yaml_file)} 字节")
-            except Exception as e:
-                print(f"生成{yaml_file}时出错: {str(e)}")
-
-    # 列出config目录中的文件
-    try:
-        print("\nconfig目录中的文件:")
-        for file in os.listdir(config_dir):
-            file_path = os.path.join(config_dir, file)
-            print(f"- {file} ({os.path.getsize(file_path)} 字节)")
-    except Exception as e:
-        print(f"列出目录内容时出错: {str(e)}")
+            print(f"生成{yaml_file}时出错: {str(e)}")
 
     # 打印统计信息
     print(f"\n统计信息:")
-    print(f"总行数: {len(df)}")
-    print(f"成功处理: {processed_count}")
-    print(f"未知类型: {unknown_count}")
-    if unknown_devices:
+    print(f"总行数: {stats['total']}")
+    print(f"成功处理: {stats['processed']}")
+    print(f"未知类型: {stats['unknown']}")
+    for category in CREDENTIAL_GROUPS:
+        if category in stats:
+            print(f"{category}: {stats[category]}")
+    if stats['unknown_devices']:
         print("\n未能识别的设备:")
-        for device in unknown_devices:
+        for device in stats['unknown_devices'][:50]:
             print(f"- {device}")
+        if len(stats['unknown_devices']) > 50:
+            print(f"... 另有 {len(stats['unknown_devices']) - 50} 台")
+    return stats
+
+
+def iter_inventory_chunks(path: str, sheet_name: str = 'Sheet1', chunk_size: int = 5000) -> Iterator[pd.DataFrame]:
+    """Yield the inventory as DataFrames of at most chunk_size rows, all values as strings"""
+    if path.lower().endswith(('.csv', '.txt')):
+        for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+            _check_columns(chunk.columns)
+            yield chunk
+        return
 
+    from openpyxl import load_workbook
 
-def get_device_type(model: str, mapping: Dict[str, str]) -> str:
-    """Obtain the device type in Netmiko based on the device model"""
-    for key, value in mapping.items():
-        if model.startswith(key):
-            return value
-    return 'unknown'
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name in workbook.sheetnames else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else '' for h in next(rows, [])]
+        _check_columns(header)
+        buffer = []
+        for row in rows:
+            buffer.append(['' if v is None else str(v) for v in row])
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=header)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header)
+    finally:
+        workbook.close()
+
+
+def _check_columns(columns) -> None:
+    # 检查必要的列是否存在
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in columns]
+    if missing_columns:
+        raise ValueError(f"Excel文件缺少必要的列: {missing_columns}")
+
+
+def _process_chunk(df: pd.DataFrame, devices_by_category: Dict[str, List[Dict[str, str]]],
+                   stats: Dict[str, Any]) -> None:
+    stats['total'] += len(df)
+    df = df[REQUIRED_COLUMNS].fillna('').astype(str)
+
+    # 处理IP地址中可能的换行符
+    ip = df['ip'].str.split('\n').str[0].str.strip()
+    name = df['name'].str.strip()
+    vendor = df['vendor'].str.lower().str.strip()
+    model = df['model'].str.strip()
+
+    # classify every distinct model once, then map the results onto the column
+    index = get_model_index()
+    unique_models = model.unique()
+    types = {m: index.device_type(m) for m in unique_models}
+    categories = {m: index.category(m) for m in unique_models}
+    device_type = model.map(types)
+    category = model.map(categories)
+
+    chunk = pd.DataFrame({'name': name, 'ip': ip, 'vendor': vendor, 'model': model,
+                          'type': device_type, 'category': category})
+    known = chunk['category'].isin(list(devices_by_category))
+    unknown = chunk[~known]
+    stats['unknown'] += len(unknown)
+    stats['unknown_devices'].extend(f"{n} ({m})" for n, m in zip(unknown['name'], unknown['model']))
+
+    for cat, group in chunk[known].groupby('category', sort=False):
+        records = group.drop(columns='category').to_dict('records')
+        devices_by_category[cat].extend(records)
+        stats['processed'] += len(records)
+
+
+def merge_devices_into_yaml(yaml_file: str, category: str, devices: List[Dict[str, str]],
+                            replace: bool = False) -> Dict[str, int]:
+    """
+    Merge devices into config/<category>.yaml keyed by IP.
+
+    When the only change is new devices and the file ends with its block-style
+    device list, the new entries are appended to the file at the indentation
+    of the existing items. Otherwise the file is rewritten through a temporary
+    file and an atomic rename.
+
+    Returns:
+        counts of added, updated and removed devices
+    """
+    existing = None
+    text = ''
+    if os.path.exists(yaml_file):
+        with open(yaml_file, 'r', encoding='utf-8') as f:
+            text = f.read()
+        existing = yaml.safe_load(text)
+
+    section = (existing or {}).get(category) or {}
+    credential_group = section.get('credential_group') or CREDENTIAL_GROUPS[category]
+    current = [d for d in (section.get('devices') or []) if d and d.get('ip')]
+    placeholders = len(section.get('devices') or []) - len(current)
+    by_ip = {str(d['ip']): i for i, d in enumerate(current)}
+
+    # a later row for the same IP wins, also for IPs new to the file
+    new_devices: Dict[str, Dict[str, str]] = {}
+    updated_ips = set()
+    incoming_ips = set()
+    for device in devices:
+        ip = str(device['ip'])
+        incoming_ips.add(ip)
+        i = by_ip.get(ip)
+        if i is None:
+            new_devices[ip] = {**new_devices.get(ip, {}), **device}
+            continue
+        # keep keys added by hand, such as port or jump_host
+        merged = {**current[i], **device}
+        if current[i] != merged:
+            current[i] = merged
+            updated_ips.add(ip)
+    added = list(new_devices.values())
+    updated = len(updated_ips)
+
+    removed = 0
+    if replace:
+        kept = [d for d in current if str(d['ip']) in incoming_ips]
+        removed = len(current) - len(kept)
+        current = kept
+
+    result = {'added': len(added), 'updated': updated, 'removed': removed}
+    if not added and not updated and not removed and not placeholders and existing is not None:
+        return result
+
+    items = _DEVICES_ITEM.findall(text)
+    can_append = (
+        existing is not None
+        and not updated and not removed and not placeholders
+        and list(existing) == [category]
+        and list(section)[-1:] == ['devices']
+        and current
+        and items
+    )
+    if can_append:
+        indent = items[-1]
+        dumped = yaml.safe_dump(added, allow_unicode=True, sort_keys=False)
+        with open(yaml_file, 'a', encoding='utf-8') as f:
+            if text and not text.endswith('\n'):
+                f.write('\n')
+            f.write(''.join(f"{indent}{line}\n" for line in dumped.splitlines()))
+        return result
+
+    data = {category: {'credential_group': credential_group, 'devices': current + added}}
+    tmp_file = f"{yaml_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(data, f, allow_unicode=True, sort_keys=False)
+    os.replace(tmp_file, yaml_file)
+    return result
+
+
+def get_device_type(model: str, mapping: Optional[Dict[str, str]] = None) -> str:
+    """Obtain the device type in Netmiko based on the device model (longest prefix wins)"""
+    if mapping is not None:
+        return ModelIndex.from_mapping(mapping).device_type(model)
+    return get_model_index().device_type(model)
 
 
 def get_device_category(model: str) -> str:
-    """Determine the device category based on the device model"""
-    model = model.upper()
-    # 检查完整的型号匹配
-    if any(model.startswith(prefix) for prefix in [
-        'CE16808', 'CE6881', 'S12700', 'S5735', 'S5560', 'S7510',
-        'S5700', 'S5720', 'S6720', # 添加S6720
-        'S5700EI', 'S5720EI'  # 添加EI系列
-    ]):
-        return 'switch'
-    elif model.startswith(('USG', 'FW')):
-        return 'firewall'
-    elif model.startswith(('AC', 'AP')):
-        return 'wireless'
-    return 'unknown'
+    """Determine the device category based on the device model (longest prefix wins)"""
+    return get_model_index().category(model)
+
 
 # 使用示例
 if __name__ == '__main__':
-    excel_to_yaml('devices.xlsx')
\ No newline at end of file
+    excel_to_yaml('devices.xlsx')
@@ -0,0 +1,119 @@
+# utils/inventory_cache.py
+
+import hashlib
+import os
+import pickle
+import threading
+from typing import Dict, Any, Tuple
+
+import yaml
+
+from utils.settings import BASE_DIR
+
+CACHE_DIR = os.path.join(BASE_DIR, 'output', 'cache')
+CACHE_VERSION = 1
+
+# the C LibYAML loader is several times faster than the pure-Python one
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+_memory_cache: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+_index_cache: Dict[Tuple[str, str], Tuple[Tuple[int, int], Dict[str, Dict[str, Any]]]] = {}
+_lock = threading.Lock()
+
+
+def load_yaml(path: str) -> Any:
+    """
+    Load a YAML file through a two-level cache.
+
+    The parsed data is memoized in-process and persisted as a pickle under
+    output/cache/. Both levels are keyed on the file's mtime and size; when
+    those change but the SHA-256 of the content does not, the cached data is
+    still reused. The returned object is shared, so treat it as read-only.
+
+    Raises:
+        FileNotFoundError / yaml.YAMLError, as yaml.safe_load would
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _memory_cache.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    with _lock:
+        cached = _memory_cache.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        data = _load_with_disk_cache(path, stamp)
+        _memory_cache[path] = (stamp, data)
+        return data
+
+
+def get_device_index(path: str, device_type: str) -> Dict[str, Dict[str, Any]]:
+    """Return ip -> device entry for config/<device_type>.yaml, rebuilt only when the file changes"""
+    path = os.path.abspath(path)
+    config = load_yaml(path)
+    stamp = _memory_cache[path][0]
+    key = (path, device_type)
+    cached = _index_cache.get(key)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    index = {}
+    for device in config[device_type]['devices'] or []:
+        if device and device.get('ip') is not None:
+            index.setdefault(str(device['ip']), device)
+    _index_cache[key] = (stamp, index)
+    return index
+
+
+def _cache_file(path: str) -> str:
+    digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, f"{os.path.basename(path)}.{digest}.pickle")
+
+
+def _file_hash(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _load_with_disk_cache(path: str, stamp: Tuple[int, int]) -> Any:
+    cache_file = _cache_file(path)
+    entry = None
+    try:
+        with open(cache_file, 'rb') as f:
+            entry = pickle.load(f)
+        if entry.get('version') != CACHE_VERSION:
+            entry = None
+    except Exception:
+        # missing, truncated or from an incompatible version: rebuild it
+        entry = None
+
+    if entry and entry['stamp'] == stamp:
+        return entry['data']
+
+    content_hash = _file_hash(path)
+    if entry and entry['sha256'] == content_hash:
+        entry['stamp'] = stamp
+        _write_cache(cache_file, entry)
+        return entry['data']
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = yaml.load(f, Loader=YamlLoader)
+    _write_cache(cache_file, {'version': CACHE_VERSION, 'stamp': stamp, 'sha256': content_hash, 'data': data})
+    return data
+
+
+def _write_cache(cache_file: str, entry: Dict[str, Any]) -> None:
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # the cache is an optimization; a read-only tree still works without it
+        pass
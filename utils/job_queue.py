@@ -0,0 +1,221 @@
+# utils/job_queue.py
+
+import os
+import json
+import time
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import closing
+from typing import Dict, Any, List, Callable, Iterable, Optional, Tuple
+
+from utils.settings import BASE_DIR, WORKER_SETTINGS
+
+
+class JobQueue(ABC):
+    """
+    Interface of the job queue shared by the coordinator and its workers.
+
+    Jobs belong to a run and a shard. A worker claims jobs with a lease: its
+    own shard first, then any other shard (work stealing), including jobs
+    whose lease expired because their worker died. Backends other than SQLite
+    (for workers on several hosts) register through register_queue_backend.
+    """
+
+    @abstractmethod
+    def enqueue(self, run_id: str, payloads: Iterable[Dict[str, Any]], shards: int = 1) -> int:
+        """Queue one job per payload, spread round-robin over the shards; returns how many were queued"""
+
+    @abstractmethod
+    def claim(self, run_id: str, worker: str, shard: int, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Lease up to limit jobs, preferring the worker's own shard; returns (job id, payload) pairs"""
+
+    @abstractmethod
+    def renew(self, job_ids: Iterable[int], worker: str) -> None:
+        """Extend the leases the worker holds on these jobs"""
+
+    @abstractmethod
+    def complete(self, job_id: int, worker: str, result: Dict[str, Any]) -> None:
+        """Record the result of a leased job"""
+
+    @abstractmethod
+    def fail(self, job_id: int, worker: str, error: str, result: Optional[Dict[str, Any]] = None) -> None:
+        """Requeue a leased job, or record result (default: the error) once it has used up its attempts"""
+
+    @abstractmethod
+    def outstanding(self, run_id: str) -> int:
+        """Number of queued or leased jobs of a run"""
+
+    @abstractmethod
+    def finished(self, run_id: str) -> List[Dict[str, Any]]:
+        """Finished jobs of a run as dicts with id, payload, status, worker and result"""
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    shard INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    finished REAL,
+    not_before REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_run_status ON jobs (run_id, status);
+"""
+
+
+class SQLiteJobQueue(JobQueue):
+    """Job queue in a local SQLite database (WAL mode, claims under BEGIN IMMEDIATE)"""
+
+    def __init__(self, db_path: str, lease_seconds: Optional[int] = None, max_attempts: Optional[int] = None,
+                 retry_backoff: Optional[float] = None):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds or WORKER_SETTINGS['lease_seconds']
+        self.max_attempts = max_attempts or WORKER_SETTINGS['max_attempts']
+        self.retry_backoff = WORKER_SETTINGS['retry_backoff'] if retry_backoff is None else retry_backoff
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            # databases created before retries were delayed
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'not_before' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN not_before REAL")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(self, run_id: str, payloads: Iterable[Dict[str, Any]], shards: int = 1) -> int:
+        rows = [(run_id, i % max(shards, 1), json.dumps(payload, ensure_ascii=False))
+                for i, payload in enumerate(payloads)]
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("INSERT INTO jobs (run_id, shard, payload) VALUES (?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        return len(rows)
+
+    def claim(self, run_id: str, worker: str, shard: int, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Lease up to limit jobs, preferring the worker's own shard"""
+        if limit <= 0:
+            return []
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # expired leases that used up their attempts are given up on
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished = ?, result = ? "
+                "WHERE run_id = ? AND status = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, json.dumps({'status': 'failed', 'error': 'worker lease expired'}), run_id, now, self.max_attempts)
+            )
+            rows = conn.execute(
+                "SELECT id, payload FROM jobs WHERE run_id = ? "
+                "AND ((status = 'queued' AND (not_before IS NULL OR not_before <= ?)) "
+                "OR (status = 'leased' AND lease_until < ?)) "
+                "ORDER BY shard != ?, id LIMIT ?",
+                (run_id, now, now, shard, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                [(worker, now + self.lease_seconds, row['id']) for row in rows]
+            )
+            conn.execute("COMMIT")
+        return [(row['id'], json.loads(row['payload'])) for row in rows]
+
+    def renew(self, job_ids: Iterable[int], worker: str) -> None:
+        lease_until = time.time() + self.lease_seconds
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                [(lease_until, job_id, worker) for job_id in job_ids]
+            )
+
+    def complete(self, job_id: int, worker: str, result: Dict[str, Any]) -> None:
+        # a job stolen after its lease expired may finish twice; the first result wins
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', worker = ?, result = ?, finished = ? "
+                "WHERE id = ? AND status = 'leased'",
+                (worker, json.dumps(result, ensure_ascii=False, default=str), time.time(), job_id)
+            )
+
+    def fail(self, job_id: int, worker: str, error: str, result: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Requeue the job, or mark it failed once it has used up its attempts.
+
+        A requeued job is not claimed again before retry_backoff seconds,
+        doubled for every attempt already made, have passed.
+        """
+        result = result or {'status': 'failed', 'error': error}
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ? AND status = 'leased'", (job_id,)).fetchone()
+            if row and row['attempts'] >= self.max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', worker = ?, result = ?, finished = ? WHERE id = ?",
+                    (worker, json.dumps(result, ensure_ascii=False, default=str), time.time(), job_id)
+                )
+            elif row:
+                not_before = time.time() + self.retry_backoff * 2 ** (row['attempts'] - 1)
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', worker = NULL, lease_until = NULL, not_before = ? WHERE id = ?",
+                    (not_before, job_id)
+                )
+            conn.execute("COMMIT")
+
+    def outstanding(self, run_id: str) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE run_id = ? AND status IN ('queued', 'leased')", (run_id,)
+            ).fetchone()[0]
+
+    def finished(self, run_id: str) -> List[Dict[str, Any]]:
+        """Finished jobs of a run as dicts with id, payload, status, worker and result"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT id, payload, status, worker, result FROM jobs "
+                "WHERE run_id = ? AND status IN ('done', 'failed') ORDER BY finished",
+                (run_id,)
+            ).fetchall()
+        return [{
+            'id': row['id'],
+            'payload': json.loads(row['payload']),
+            'status': row['status'],
+            'worker': row['worker'],
+            'result': json.loads(row['result']) if row['result'] else {},
+        } for row in rows]
+
+
+QUEUE_BACKENDS: Dict[str, Callable[[str], JobQueue]] = {
+    'sqlite': SQLiteJobQueue,
+}
+
+
+def register_queue_backend(scheme: str, factory: Callable[[str], JobQueue]) -> None:
+    """Make a queue backend available under scheme:// URLs (e.g. a network queue for multi-host runs)"""
+    QUEUE_BACKENDS[scheme] = factory
+
+
+def get_job_queue(url: Optional[str] = None) -> JobQueue:
+    """
+    Open a job queue from a URL.
+
+    Args:
+        url: scheme://location. SQLite URLs follow the usual convention:
+             sqlite:///output/state/job_queue.db is relative to the project
+             root, sqlite:////shared/job_queue.db is absolute
+    """
+    url = url or WORKER_SETTINGS['queue_url']
+    scheme, _, location = url.partition('://')
+    if scheme not in QUEUE_BACKENDS:
+        raise ValueError(f"Unknown job queue backend: {scheme}")
+    if scheme == 'sqlite':
+        location = location[1:] if location.startswith('/') else location
+        if not os.path.isabs(location):
+            location = os.path.join(BASE_DIR, location)
+    return QUEUE_BACKENDS[scheme](location)
@@ -0,0 +1,243 @@
+# utils/metrics_store.py
+
+import glob
+import math
+import os
+import re
+import struct
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from utils.settings import BASE_DIR, METRICS_SETTINGS
+
+METRICS_DIR = os.path.join(BASE_DIR, 'output', 'metrics')
+
+# raw sample: timestamp (epoch seconds), value
+_RAW = struct.Struct('<dd')
+# rollup bucket: bucket start, count, sum, min, max
+_ROLLUP = struct.Struct('<dIddd')
+
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.\-]')
+
+
+class MetricsStore:
+    """
+    Append-only time-series store for device health metrics.
+
+    Samples are kept per device and metric in daily segment files of packed
+    (timestamp, value) doubles, so appends are a single write and a query
+    only reads the days it covers. Segments older than the raw retention are
+    downsampled into fixed-size rollup buckets (count/sum/min/max) and
+    removed; rollups older than their own retention are dropped.
+
+    Layout: <root>/<device>/<metric>/<YYYYMMDD>.raw and rollup_<seconds>.bin
+    """
+
+    def __init__(self, root: str = METRICS_DIR):
+        self.root = root
+
+    # ---- writing ----------------------------------------------------------
+
+    def append(self, device: str, metric: str, value: float, timestamp: Optional[float] = None) -> None:
+        timestamp = time.time() if timestamp is None else timestamp
+        path = self._segment_path(device, metric, timestamp)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as f:
+            f.write(_RAW.pack(timestamp, float(value)))
+
+    def append_many(self, device: str, values: Dict[str, float], timestamp: Optional[float] = None) -> None:
+        timestamp = time.time() if timestamp is None else timestamp
+        for metric, value in values.items():
+            if value is not None:
+                self.append(device, metric, value, timestamp)
+
+    # ---- reading ----------------------------------------------------------
+
+    def devices(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(os.listdir(self.root))
+
+    def metrics(self, device: str) -> List[str]:
+        path = os.path.join(self.root, _safe(device))
+        if not os.path.isdir(path):
+            return []
+        return sorted(os.listdir(path))
+
+    def query(self, device: str, metric: str, start: Optional[float] = None,
+              end: Optional[float] = None) -> Tuple[array, array]:
+        """
+        Return raw samples in [start, end] as (timestamps, values) arrays.
+
+        When the range reaches back past the raw retention, rollup buckets are
+        included as one sample per bucket carrying the bucket average.
+        """
+        end = time.time() if end is None else end
+        start = 0.0 if start is None else start
+        timestamps, values = array('d'), array('d')
+
+        first_raw = None
+        for path in self._segments(device, metric):
+            day_start = _day_start(os.path.basename(path)[:8])
+            if day_start > end or day_start + 86400 <= start:
+                continue
+            first_raw = day_start if first_raw is None else min(first_raw, day_start)
+            data = array('d')
+            with open(path, 'rb') as f:
+                data.frombytes(f.read())
+            # interleaved (timestamp, value) pairs
+            for ts, value in zip(data[0::2], data[1::2]):
+                if start <= ts <= end:
+                    timestamps.append(ts)
+                    values.append(value)
+
+        if first_raw is None or start < first_raw:
+            limit = end if first_raw is None else min(end, first_raw)
+            rolled = [(ts, value) for ts, value in self._rollup_averages(device, metric) if start <= ts < limit]
+            if rolled:
+                merged = sorted(rolled + list(zip(timestamps, values)))
+                timestamps = array('d', (ts for ts, _ in merged))
+                values = array('d', (value for _, value in merged))
+        return timestamps, values
+
+    def latest(self, device: str, metric: str) -> Optional[Tuple[float, float]]:
+        segments = self._segments(device, metric)
+        if not segments:
+            return None
+        with open(segments[-1], 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size < _RAW.size:
+                return None
+            f.seek(size - size % _RAW.size - _RAW.size)
+            return _RAW.unpack(f.read(_RAW.size))
+
+    def percentile(self, device: str, metric: str, q: float, start: Optional[float] = None,
+                   end: Optional[float] = None) -> Optional[float]:
+        """Return the q-th percentile (0-100, linear interpolation) of samples in range"""
+        _, values = self.query(device, metric, start, end)
+        return percentile(values, q)
+
+    def trend(self, device: str, metric: str, start: Optional[float] = None,
+              end: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """
+        Fit a least-squares line through the samples in range.
+
+        Returns:
+            dict with count, mean, min, max and slope_per_day, or None without samples
+        """
+        timestamps, values = self.query(device, metric, start, end)
+        n = len(values)
+        if not n:
+            return None
+        mean_t = sum(timestamps) / n
+        mean_v = sum(values) / n
+        var_t = sum((t - mean_t) ** 2 for t in timestamps)
+        cov = sum((t - mean_t) * (v - mean_v) for t, v in zip(timestamps, values))
+        slope = cov / var_t if var_t else 0.0
+        return {
+            'count': n,
+            'mean': mean_v,
+            'min': min(values),
+            'max': max(values),
+            'slope_per_day': slope * 86400,
+        }
+
+    # ---- downsampling and retention --------------------------------------
+
+    def compact(self, now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Downsample raw segments past the raw retention and drop expired rollups.
+
+        Returns:
+            counts of segments rolled up and rollup buckets dropped
+        """
+        now = time.time() if now is None else now
+        raw_cutoff = now - METRICS_SETTINGS['raw_retention_days'] * 86400
+        rollup_cutoff = now - METRICS_SETTINGS['rollup_retention_days'] * 86400
+        bucket = METRICS_SETTINGS['rollup_interval']
+        stats = {'segments_rolled_up': 0, 'buckets_dropped': 0}
+
+        for device in self.devices():
+            for metric in self.metrics(device):
+                buckets = {ts: list(entry) for ts, *entry in self._read_rollups(device, metric)}
+                changed = False
+                for path in self._segments(device, metric):
+                    if _day_start(os.path.basename(path)[:8]) + 86400 > raw_cutoff:
+                        continue
+                    data = array('d')
+                    with open(path, 'rb') as f:
+                        data.frombytes(f.read())
+                    for ts, value in zip(data[0::2], data[1::2]):
+                        key = ts - ts % bucket
+                        entry = buckets.setdefault(key, [0, 0.0, math.inf, -math.inf])
+                        entry[0] += 1
+                        entry[1] += value
+                        entry[2] = min(entry[2], value)
+                        entry[3] = max(entry[3], value)
+                    os.remove(path)
+                    stats['segments_rolled_up'] += 1
+                    changed = True
+
+                expired = [ts for ts in buckets if ts < rollup_cutoff]
+                for ts in expired:
+                    del buckets[ts]
+                stats['buckets_dropped'] += len(expired)
+                if changed or expired:
+                    self._write_rollups(device, metric, buckets)
+        return stats
+
+    # ---- internals --------------------------------------------------------
+
+    def _metric_dir(self, device: str, metric: str) -> str:
+        return os.path.join(self.root, _safe(device), _safe(metric))
+
+    def _segment_path(self, device: str, metric: str, timestamp: float) -> str:
+        day = datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y%m%d')
+        return os.path.join(self._metric_dir(device, metric), f"{day}.raw")
+
+    def _segments(self, device: str, metric: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(self._metric_dir(device, metric), '*.raw')))
+
+    def _rollup_path(self, device: str, metric: str) -> str:
+        return os.path.join(self._metric_dir(device, metric), f"rollup_{METRICS_SETTINGS['rollup_interval']}.bin")
+
+    def _read_rollups(self, device: str, metric: str) -> List[Tuple[float, int, float, float, float]]:
+        path = self._rollup_path(device, metric)
+        if not os.path.exists(path):
+            return []
+        with open(path, 'rb') as f:
+            data = f.read()
+        return [_ROLLUP.unpack_from(data, offset) for offset in range(0, len(data) - _ROLLUP.size + 1, _ROLLUP.size)]
+
+    def _rollup_averages(self, device: str, metric: str) -> List[Tuple[float, float]]:
+        return [(ts, total / count) for ts, count, total, _, _ in self._read_rollups(device, metric) if count]
+
+    def _write_rollups(self, device: str, metric: str, buckets: Dict[float, list]) -> None:
+        path = self._rollup_path(device, metric)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            for ts in sorted(buckets):
+                count, total, low, high = buckets[ts]
+                f.write(_ROLLUP.pack(ts, count, total, low, high))
+        os.replace(tmp_path, path)
+
+
+def percentile(values, q: float) -> Optional[float]:
+    if not len(values):
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _safe(name: str) -> str:
+    return _SAFE_NAME.sub('_', str(name))
+
+
+def _day_start(day: str) -> float:
+    return datetime.strptime(day, '%Y%m%d').replace(tzinfo=timezone.utc).timestamp()
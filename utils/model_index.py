@@ -0,0 +1,77 @@
+# utils/model_index.py
+
+import json
+import os
+from functools import lru_cache
+from typing import Dict, Any, Optional
+
+from utils.settings import BASE_DIR
+
+MODEL_INDEX_FILE = os.path.join(BASE_DIR, 'templates', 'models', 'model_index.json')
+
+FIELDS = ('type', 'category', 'profile')
+
+
+class ModelIndex:
+    """
+    Compiled model classification index with longest-prefix semantics.
+
+    Model prefixes are compiled into a character trie. A lookup walks the
+    model string once, so it costs O(len(model)), and every field is taken
+    from the longest prefix that defines it: "CE16808-X" gets CE16808's
+    entry, while "AC6805" falls back to the category of "AC".
+    """
+
+    def __init__(self, entries: Dict[str, Dict[str, Any]]):
+        self.root: Dict[str, Any] = {}
+        for prefix, entry in entries.items():
+            node = self.root
+            for char in prefix.upper():
+                node = node.setdefault(char, {})
+            node[None] = {field: entry.get(field) for field in FIELDS}
+
+    @classmethod
+    def from_file(cls, path: str = MODEL_INDEX_FILE) -> 'ModelIndex':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_mapping(cls, mapping: Dict[str, str], field: str = 'type') -> 'ModelIndex':
+        """Build an index from a plain prefix -> value mapping for one field"""
+        return cls({prefix: {field: value} for prefix, value in mapping.items()})
+
+    def lookup(self, model: Optional[str]) -> Dict[str, Optional[str]]:
+        """
+        Classify a model.
+
+        Returns:
+            dict with 'type' (Netmiko device type), 'category' (config file) and
+            'profile' (inspection profile); a field is None when no prefix sets it
+        """
+        result = {field: None for field in FIELDS}
+        node = self.root
+        for char in str(model or '').strip().upper():
+            node = node.get(char)
+            if node is None:
+                break
+            entry = node.get(None)
+            if entry:
+                for field, value in entry.items():
+                    if value is not None:
+                        result[field] = value
+        return result
+
+    def device_type(self, model: Optional[str], default: str = 'unknown') -> str:
+        return self.lookup(model)['type'] or default
+
+    def category(self, model: Optional[str], default: str = 'unknown') -> str:
+        return self.lookup(model)['category'] or default
+
+    def profile(self, model: Optional[str], default: Optional[str] = None) -> Optional[str]:
+        return self.lookup(model)['profile'] or default
+
+
+@lru_cache(maxsize=1)
+def get_model_index() -> ModelIndex:
+    """Return the shared index loaded from templates/models/model_index.json"""
+    return ModelIndex.from_file()
@@ -0,0 +1,249 @@
+# utils/report_renderer.py
+
+import os
+import re
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import markdown
+
+from utils.settings import BASE_DIR, REPORT_SETTINGS
+from utils.tracing import span
+
+REPORTS_DIR = os.path.join(BASE_DIR, 'output', 'reports')
+
+# an explicit level label wins over words elsewhere in the line, e.g. "严重程度：低" or "Severity: High"
+_LABELLED_LEVEL = re.compile(
+    r'(?:严重程度|风险等级|风险级别|等级|级别|\bseverity|\brisk level|\brisk|\bpriority)\s*[:：]\s*'
+    r'(critical|urgent|high|medium|low|严重|紧急|高|中|低)',
+    re.IGNORECASE
+)
+_LEVEL_NAMES = {
+    'critical': 'critical', 'urgent': 'critical', '严重': 'critical', '紧急': 'critical',
+    'high': 'high', '高': 'high',
+    'medium': 'medium', '中': 'medium',
+    'low': 'low', '低': 'low',
+}
+# severity -> whole words that mark an unlabelled finding line; checked from the most severe down
+SEVERITY_PATTERNS = {
+    'critical': re.compile(r'\bcritical\b|严重风险|严重漏洞|紧急', re.IGNORECASE),
+    'high': re.compile(r'\bhigh\b|高危|高风险', re.IGNORECASE),
+    'medium': re.compile(r'\bmedium\b|中危|中风险', re.IGNORECASE),
+    'low': re.compile(r'\blow\b|低危|低风险', re.IGNORECASE),
+}
+# phrases that contain a level word without naming a severity
+_NEUTRAL_PHRASES = re.compile(r'\bhigh[- ]availability\b', re.IGNORECASE)
+# section headings of templates/prompts/usg12004_prompt.txt, which the model repeats as list items
+SECTION_HEADINGS = frozenset({
+    'high availability status',
+    'high-risk configuration items',
+    'critical priority items',
+    'medium priority optimizations',
+    'low priority suggestions',
+})
+SEVERITY_WEIGHTS = {'critical': 10, 'high': 5, 'medium': 2, 'low': 1}
+
+_FINDING_LINE = re.compile(r'^\s*(?:[-*+]|\d+\.)\s+(.*)$')
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; max-width: 1100px; margin: 2em auto; line-height: 1.5; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; }}
+pre {{ background: #f6f8fa; padding: 8px; overflow-x: auto; }}
+</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+def render_html(markdown_text: str, title: str) -> str:
+    body = markdown.markdown(markdown_text, extensions=['tables', 'fenced_code'])
+    return HTML_TEMPLATE.format(title=title, body=body)
+
+
+def extract_findings(markdown_text: str) -> Dict[str, Any]:
+    """
+    Pull structured findings out of an analysis report.
+
+    Every list item is classified by its level label (风险等级：高, Severity: High)
+    or else by the most severe level it names as a whole word (high, not
+    highest). Section headings repeated from the prompt are not findings.
+
+    Returns:
+        dict with counts per severity, a weighted risk score and the top findings
+    """
+    counts = {severity: 0 for severity in SEVERITY_PATTERNS}
+    top = []
+    for line in markdown_text.splitlines():
+        match = _FINDING_LINE.match(line)
+        if not match:
+            continue
+        text = match.group(1).strip()
+        severity = _severity(text)
+        if severity is None:
+            continue
+        counts[severity] += 1
+        if severity in ('critical', 'high') and len(top) < 5:
+            top.append(text[:200])
+    score = sum(SEVERITY_WEIGHTS[severity] * n for severity, n in counts.items())
+    return {'counts': counts, 'risk_score': score, 'top_findings': top}
+
+
+def _severity(text: str) -> Optional[str]:
+    if text.strip('*_ :：').lower() in SECTION_HEADINGS:
+        return None
+    labelled = _LABELLED_LEVEL.search(text)
+    if labelled:
+        return _LEVEL_NAMES[labelled.group(1).lower()]
+    text = _NEUTRAL_PHRASES.sub(' ', text)
+    for severity, pattern in SEVERITY_PATTERNS.items():
+        if pattern.search(text):
+            return severity
+    return None
+
+
+def render_report(report_path: str, html: bool = True) -> Dict[str, Any]:
+    """
+    Extract the findings of one markdown report and render it to HTML next to it.
+
+    Runs in a worker process, so it only takes and returns plain data.
+    """
+    with open(report_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    findings = extract_findings(text)
+    findings['html'] = None
+    if html:
+        html_path = os.path.splitext(report_path)[0] + '.html'
+        with open(html_path, 'w', encoding='utf-8') as f:
+            f.write(render_html(text, os.path.basename(report_path)))
+        findings['html'] = html_path
+    return findings
+
+
+class FleetSummary:
+    """
+    Fleet-level summary rebuilt each time a device finishes.
+
+    Devices are ranked by risk score; the markdown and HTML summary files are
+    rewritten after every update, so the summary is usable while the run is
+    still in progress.
+    """
+
+    def __init__(self, reports_dir: str = REPORTS_DIR):
+        os.makedirs(reports_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.markdown_path = os.path.join(reports_dir, f"fleet_summary_{timestamp}.md")
+        self.html_path = os.path.join(reports_dir, f"fleet_summary_{timestamp}.html")
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, device_ip: str, result: Dict[str, Any], findings: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            self.entries[device_ip] = {'result': result, 'findings': findings}
+            self.write()
+
+    def ranked(self) -> List[Dict[str, Any]]:
+        rows = []
+        for device_ip, entry in self.entries.items():
+            findings = entry['findings'] or {}
+            health = entry['result'].get('health') or {}
+            rows.append({
+                'ip': device_ip,
+                'status': entry['result'].get('status'),
+                'risk_score': findings.get('risk_score', 0),
+                'counts': findings.get('counts', {}),
+                'top_findings': findings.get('top_findings', []),
+                'cpu': health.get('cpu_usage'),
+                'memory': health.get('memory_usage'),
+                'changes': (entry['result'].get('metrics') or {}).get('config_changes'),
+                'report': entry['result'].get('report'),
+                'html': findings.get('html'),
+                'error': entry['result'].get('error'),
+            })
+        return sorted(rows, key=lambda row: (row['status'] != 'success', -row['risk_score'], row['ip']))
+
+    def render(self) -> str:
+        rows = self.ranked()
+        success = sum(1 for row in rows if row['status'] == 'success')
+        lines = [
+            "# Fleet Inspection Summary\n",
+            f"- Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            f"- Devices: {len(rows)} (success {success}, failed {len(rows) - success})\n",
+            "## Risk Ranking\n",
+            "| Rank | Device | Risk score | Critical | High | Medium | Low | CPU % | Memory % | Config changes | Report |",
+            "|---|---|---|---|---|---|---|---|---|---|---|",
+        ]
+        for rank, row in enumerate((r for r in rows if r['status'] == 'success'), 1):
+            counts = row['counts']
+            report = os.path.basename(row['html'] or row['report'] or '')
+            lines.append(
+                f"| {rank} | {row['ip']} | {row['risk_score']} | {counts.get('critical', 0)} | "
+                f"{counts.get('high', 0)} | {counts.get('medium', 0)} | {counts.get('low', 0)} | "
+                f"{_cell(row['cpu'])} | {_cell(row['memory'])} | {_cell(row['changes'])} | {report} |"
+            )
+
+        top = [row for row in rows if row['top_findings']]
+        if top:
+            lines.append("\n## Top Findings\n")
+            for row in top[:20]:
+                lines.append(f"### {row['ip']}")
+                lines.extend(f"- {finding}" for finding in row['top_findings'])
+                lines.append("")
+
+        failed = [row for row in rows if row['status'] != 'success']
+        if failed:
+            lines.append("\n## Failed Devices\n")
+            lines.extend(f"- {row['ip']}: {row['error']}" for row in failed)
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> None:
+        text = self.render()
+        outputs = [(self.markdown_path, text)]
+        if REPORT_SETTINGS['render_html']:
+            outputs.append((self.html_path, render_html(text, "Fleet Inspection Summary")))
+        for path, content in outputs:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+
+class ReportRenderer:
+    """Render device reports in a process pool and feed the fleet summary as they finish"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        # spawn: forking a process full of SSH and HTTP threads can copy held locks into the child
+        self.pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+        self.summary = FleetSummary()
+
+    async def add_result(self, result: Dict[str, Any]) -> None:
+        findings = None
+        if result.get('status') == 'success' and result.get('report'):
+            loop = asyncio.get_running_loop()
+            try:
+                with span('render', device=result['ip']):
+                    findings = await loop.run_in_executor(
+                        self.pool, render_report, result['report'], REPORT_SETTINGS['render_html']
+                    )
+            except Exception as e:
+                result = {**result, 'render_error': str(e)}
+        self.summary.add(result['ip'], result, findings)
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
+
+
+def _cell(value: Any) -> str:
+    return '-' if value is None else str(value)
@@ -0,0 +1,119 @@
+# utils/run_journal.py
+
+import glob
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from utils.settings import BASE_DIR
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: appends are only serialized within one process
+    fcntl = None
+
+JOURNAL_DIR = os.path.join(BASE_DIR, 'output', 'journal')
+
+
+class RunJournal:
+    """
+    Append-only journal of per-device stage completion for one fleet run.
+
+    Every state change is written as one JSON line and flushed immediately, so
+    a crashed run can be resumed from the journal: stages that completed are
+    skipped and their references (snapshot, raw config, analysis, report
+    paths) are reused. Writes hold an exclusive file lock, so worker processes
+    sharing a journal do not interleave their lines.
+    """
+
+    STAGES = ('collected', 'saved', 'analyzed', 'reported')
+
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            os.makedirs(JOURNAL_DIR, exist_ok=True)
+            path = os.path.join(JOURNAL_DIR, f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+        self.path = path
+        self.state: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def latest(cls) -> Optional['RunJournal']:
+        """Open the most recent journal, or return None if there is none"""
+        journals = sorted(glob.glob(os.path.join(JOURNAL_DIR, 'run_*.jsonl')))
+        if not journals:
+            return None
+        return cls(journals[-1])
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # a torn last line from a crash is ignored
+                    continue
+                self._apply(record)
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        stages = self.state.setdefault(record['device'], {})
+        stages[record['stage']] = {
+            'status': record['status'],
+            'ref': record.get('ref'),
+            'error': record.get('error'),
+            'time': record.get('time'),
+        }
+
+    def mark(self, device: str, stage: str, status: str = 'done',
+             ref: Optional[str] = None, error: Optional[str] = None) -> None:
+        """Record the outcome of a stage for a device"""
+        if stage not in self.STAGES:
+            raise ValueError(f"Unknown stage: {stage}")
+        record = {
+            'device': device,
+            'stage': stage,
+            'status': status,
+            'ref': ref,
+            'error': error,
+            'time': datetime.now().isoformat(),
+        }
+        with self._lock:
+            self._apply(record)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                finally:
+                    if fcntl:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def is_done(self, device: str, stage: str) -> bool:
+        return self.state.get(device, {}).get(stage, {}).get('status') == 'done'
+
+    def ref(self, device: str, stage: str) -> Optional[str]:
+        return self.state.get(device, {}).get(stage, {}).get('ref')
+
+    def is_complete(self, device: str) -> bool:
+        return self.is_done(device, 'reported')
+
+    def summary(self) -> Dict[str, int]:
+        """Count devices by the last stage they completed"""
+        counts = {stage: 0 for stage in ('pending',) + self.STAGES}
+        for device in self.state:
+            last = 'pending'
+            for stage in self.STAGES:
+                if self.is_done(device, stage):
+                    last = stage
+            counts[last] += 1
+        return counts
@@ -0,0 +1,264 @@
+# utils/search_index.py
+
+import os
+import re
+import sys
+import glob
+import sqlite3
+import argparse
+import ipaddress
+from contextlib import closing
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+from utils.settings import BASE_DIR
+
+INDEX_DB = os.path.join(BASE_DIR, 'output', 'index', 'config_index.db')
+RAW_CONFIGS_DIR = os.path.join(BASE_DIR, 'output', 'raw_configs')
+
+_RAW_FILE = re.compile(r'raw_config_(.+)_\d{8}_\d{6}\.txt$')
+_COMMAND_HEADER = re.compile(r'^-{10} (.+) -{10}$')
+_TOKEN = re.compile(r'[A-Za-z0-9_][A-Za-z0-9_\-./:]*[A-Za-z0-9_]')
+_IPV4 = re.compile(r'(?<![\d.])(\d{1,3}(?:\.\d{1,3}){3})(?:/(\d{1,2})|\s+(\d{1,3}(?:\.\d{1,3}){3})|\s+mask\s+(\d{1,2}))?(?![\d.])')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    device TEXT NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    token TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    command TEXT NOT NULL,
+    line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_postings_token ON postings (token);
+CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings (doc_id);
+CREATE TABLE IF NOT EXISTS networks (
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    prefixlen INTEGER NOT NULL,
+    doc_id INTEGER NOT NULL,
+    command TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_networks_start ON networks (start);
+CREATE INDEX IF NOT EXISTS idx_networks_prefix ON networks (prefixlen, start);
+CREATE INDEX IF NOT EXISTS idx_networks_doc ON networks (doc_id);
+"""
+
+
+class ConfigSearchIndex:
+    """
+    Inverted index over collected raw configuration files.
+
+    Tokens (IP addresses, object, rule and interface names, ...) map to
+    (device, command, line). IPv4 addresses and networks are also stored as
+    integer ranges, so "which configs reference something inside 10.1.0.0/16"
+    is a range scan, and "which networks contain 10.1.2.3" is 33 indexed
+    lookups, one per prefix length. Only the latest file of each device is
+    kept in the index.
+    """
+
+    def __init__(self, db_path: str = INDEX_DB):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # ---- building ---------------------------------------------------------
+
+    def index_file(self, path: str, device: Optional[str] = None) -> bool:
+        """
+        Index one raw config file, replacing older files of the same device.
+
+        Returns:
+            False if the file was already indexed and has not changed
+        """
+        path = os.path.abspath(path)
+        mtime = os.path.getmtime(path)
+        if device is None:
+            match = _RAW_FILE.search(os.path.basename(path))
+            device = match.group(1) if match else os.path.basename(path)
+
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT id, mtime FROM documents WHERE path = ?", (path,)).fetchone()
+            if row and row['mtime'] == mtime:
+                return False
+            newer = conn.execute(
+                "SELECT 1 FROM documents WHERE device = ? AND path > ?", (device, path)
+            ).fetchone()
+            if newer and _RAW_FILE.search(os.path.basename(path)):
+                # an older collection of a device already indexed with newer data
+                return False
+
+            for old in conn.execute("SELECT id FROM documents WHERE device = ?", (device,)).fetchall():
+                self._delete_document(conn, old['id'])
+            doc_id = conn.execute(
+                "INSERT INTO documents (device, path, mtime) VALUES (?, ?, ?)", (device, path, mtime)
+            ).lastrowid
+
+            postings, networks = [], []
+            for command, line_no, line in _iter_lines(path):
+                for token in set(_TOKEN.findall(line)):
+                    postings.append((token.lower(), doc_id, command, line_no))
+                for network in _iter_networks(line):
+                    networks.append((int(network.network_address), int(network.broadcast_address),
+                                     network.prefixlen, doc_id, command, line_no, str(network)))
+            conn.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)", postings)
+            conn.executemany("INSERT INTO networks VALUES (?, ?, ?, ?, ?, ?, ?)", networks)
+        return True
+
+    def index_directory(self, directory: str = RAW_CONFIGS_DIR) -> int:
+        """Index new or changed raw config files; returns the number of files indexed"""
+        indexed = 0
+        for path in sorted(glob.glob(os.path.join(directory, 'raw_config_*.txt'))):
+            if self.index_file(path):
+                indexed += 1
+        return indexed
+
+    @staticmethod
+    def _delete_document(conn: sqlite3.Connection, doc_id: int) -> None:
+        conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        conn.execute("DELETE FROM networks WHERE doc_id = ?", (doc_id,))
+        conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+    # ---- querying ---------------------------------------------------------
+
+    def search(self, term: str, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Find lines containing a token (case-insensitive exact token match)"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT d.device, p.command, p.line, d.path FROM postings p "
+                "JOIN documents d ON d.id = p.doc_id WHERE p.token = ? "
+                "ORDER BY d.device, p.line LIMIT ?",
+                (term.lower(), limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def search_cidr(self, cidr: str, containing: bool = False, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Find IPv4 addresses and networks by containment.
+
+        Args:
+            cidr: address or network, e.g. 10.1.0.0/16 or 10.1.2.3
+            containing: False finds references inside cidr; True finds networks that contain it
+        """
+        query = ipaddress.ip_network(cidr, strict=False)
+        start, end = int(query.network_address), int(query.broadcast_address)
+        select = (
+            "SELECT d.device, n.command, n.line, n.text, d.path FROM networks n "
+            "JOIN documents d ON d.id = n.doc_id "
+        )
+        with closing(self._connect()) as conn:
+            if not containing:
+                rows = conn.execute(
+                    select + "WHERE n.start >= ? AND n.start <= ? AND n.end <= ? ORDER BY d.device, n.line LIMIT ?",
+                    (start, end, end, limit)
+                ).fetchall()
+            else:
+                rows = []
+                for prefixlen in range(query.prefixlen + 1):
+                    mask = (0xFFFFFFFF << (32 - prefixlen)) & 0xFFFFFFFF
+                    rows.extend(conn.execute(
+                        select + "WHERE n.prefixlen = ? AND n.start = ? LIMIT ?",
+                        (prefixlen, start & mask, limit)
+                    ).fetchall())
+        return [dict(row) for row in rows[:limit]]
+
+    def stats(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            return {
+                'documents': conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0],
+                'postings': conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0],
+                'networks': conn.execute("SELECT COUNT(*) FROM networks").fetchone()[0],
+            }
+
+
+def _iter_lines(path: str) -> Iterator[Tuple[str, int, str]]:
+    """Yield (command, line number, line) for the command output lines of a raw config file"""
+    command = ''
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.rstrip('\n')
+            header = _COMMAND_HEADER.match(line)
+            if header:
+                command = header.group(1)
+                continue
+            if command and line.strip():
+                yield command, line_no, line
+
+
+def _iter_networks(line: str) -> Iterator[ipaddress.IPv4Network]:
+    """Yield the networks a line references; an address inside its network (ip address A MASK) also yields A/32"""
+    for address, prefixlen, mask, mask_len in _IPV4.findall(line):
+        try:
+            if prefixlen:
+                network = ipaddress.IPv4Network(f"{address}/{prefixlen}", strict=False)
+            elif mask_len:
+                network = ipaddress.IPv4Network(f"{address}/{mask_len}", strict=False)
+            elif address == mask == '0.0.0.0':
+                # default route
+                network = ipaddress.IPv4Network('0.0.0.0/0')
+            elif mask and _is_netmask(mask):
+                network = ipaddress.IPv4Network(f"{address}/{mask}", strict=False)
+            elif mask and _is_netmask(_invert(mask)):
+                # wildcard mask, as in ACL rules
+                network = ipaddress.IPv4Network(f"{address}/{_invert(mask)}", strict=False)
+            else:
+                yield ipaddress.IPv4Network(f"{address}/32")
+                if mask:
+                    yield ipaddress.IPv4Network(f"{mask}/32")
+                continue
+        except ValueError:
+            continue
+        yield network
+        if str(network.network_address) != address and network.prefixlen < 32:
+            yield ipaddress.IPv4Network(f"{address}/32")
+
+
+def _is_netmask(mask: str) -> bool:
+    try:
+        value = int(ipaddress.IPv4Address(mask))
+    except ValueError:
+        return False
+    inverted = ~value & 0xFFFFFFFF
+    return value != 0 and (inverted & (inverted + 1)) == 0
+
+
+def _invert(mask: str) -> str:
+    try:
+        return str(ipaddress.IPv4Address(~int(ipaddress.IPv4Address(mask)) & 0xFFFFFFFF))
+    except ValueError:
+        return mask
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search collected configurations")
+    sub = parser.add_subparsers(dest='action', required=True)
+    build = sub.add_parser('build', help="index new or changed files in output/raw_configs")
+    build.add_argument('--dir', default=RAW_CONFIGS_DIR)
+    query = sub.add_parser('query', help="find a token (object, rule or interface name, IP)")
+    query.add_argument('term')
+    cidr_parser = sub.add_parser('cidr', help="find addresses and networks inside a CIDR")
+    cidr_parser.add_argument('cidr')
+    cidr_parser.add_argument('--containing', action='store_true', help="find networks that contain the CIDR instead")
+    args = parser.parse_args()
+
+    index = ConfigSearchIndex()
+    if args.action == 'build':
+        print(f"Indexed {index.index_directory(args.dir)} files: {index.stats()}")
+    else:
+        results = index.search(args.term) if args.action == 'query' else index.search_cidr(args.cidr, args.containing)
+        for result in results:
+            text = f"  {result['text']}" if 'text' in result else ''
+            print(f"{result['device']}  [{result['command']}]  {result['path']}:{result['line']}{text}")
+        print(f"{len(results)} matches")
+    sys.exit(0)
@@ -27,6 +27,127 @@ COMMAND_TIMEOUT = 120
 RETRY_TIMES = 3
 RETRY_INTERVAL = 10
 
+# fast-fail settings for unreachable devices
+REACHABILITY_SETTINGS = {
+    'probe_timeout': 3,           # seconds for the pre-flight TCP probe
+    'probe_concurrency': 500,     # probes in flight at once
+    'breaker_threshold': 2,       # consecutive failures before a host is skipped
+    'breaker_cooldown': 1800,     # seconds a host stays skipped
+}
+
+# devices behind bastions (config/jump_hosts.yaml)
+JUMP_HOST_SETTINGS = {
+    'max_sessions': 64,           # device sessions open through one bastion, unless set per bastion
+    'channels_per_transport': 32, # device sessions multiplexed over one SSH connection to the bastion
+    'acquire_timeout': 600,       # seconds a session waits for a free slot on its bastion
+    'connect_timeout': 15,        # seconds to connect to the bastion
+    'keepalive': 30,              # seconds between keepalives on bastion connections
+    # bastion host keys are checked against this file (and the system known_hosts); unknown keys are
+    # rejected unless the bastion sets trust_unknown_host_key: true in config/jump_hosts.yaml
+    'known_hosts': '~/.ssh/known_hosts',
+}
+
+# batched command execution
+COMMAND_BATCH_SETTINGS = {
+    'enabled': True,
+    'max_batch_size': 8,          # commands written to the channel in one go
+    # large outputs are still read one command at a time
+    'exclude': ['display current-configuration', 'display ip routing-table'],
+}
+
+# health metrics time-series store
+METRICS_SETTINGS = {
+    'enabled': True,
+    'raw_retention_days': 14,     # raw samples kept this long, then downsampled
+    'rollup_interval': 3600,      # seconds per downsampled bucket
+    'rollup_retention_days': 365,
+}
+
+# lightweight health polling
+POLL_SETTINGS = {
+    'interval': 60,               # seconds between polling cycles
+    'max_workers': 256,           # devices polled in parallel
+    'command_timeout': 20,
+    'compact_every': 60,          # cycles between metrics store compactions, 0 to disable
+    'breaker_threshold': 5,       # consecutive failed polls before a device is skipped
+    'breaker_cooldown': 300,      # seconds a failing device is skipped (the poller keeps its own breaker state)
+    'thresholds': {               # metric -> alert when value >= threshold
+        'cpu_usage': 80,
+        'memory_usage': 85,
+    },
+}
+
+# fleet-wide search index over raw configurations
+SEARCH_INDEX_SETTINGS = {
+    'enabled': True,              # index each raw config right after it is saved
+}
+
+# bulk configuration transfer
+CONFIG_TRANSFER_SETTINGS = {
+    # save the running config to flash and download it instead of reading the CLI; off by default as it
+    # writes to flash and needs SFTP/SCP on the device. Opt in per device with `config_transfer: true`
+    # in config/firewall.yaml, or for a run with --config-transfer
+    'enabled': False,
+    'protocol': 'sftp',           # 'sftp' or 'scp'; the device must have the service enabled for the user
+    'remote_file': 'netinspector_running.cfg',   # temporary file on flash, deleted after download
+}
+
+# routing table analysis
+ROUTING_SETTINGS = {
+    'save_tables': True,          # keep each device's parsed routing table for fleet lookups
+}
+
+# coordinator / worker mode
+WORKER_SETTINGS = {
+    'queue_url': 'sqlite:///output/state/job_queue.db',   # other schemes via utils.job_queue.register_queue_backend
+    'workers': 4,                 # local worker processes started by the coordinator
+    'concurrency': 8,             # devices inspected at once by each worker
+    'lease_seconds': 900,         # a job is stolen by another worker if its lease is not renewed in time
+    'max_attempts': 2,            # attempts per device before it is reported as failed
+    'retry_kinds': ('timeout', 'unreachable', 'error'),   # failure kinds requeued for another attempt
+    'retry_backoff': 30,          # seconds before a requeued job is claimed again, doubled per attempt
+    'poll_interval': 2,           # seconds between queue polls
+}
+
+# report rendering
+REPORT_SETTINGS = {
+    'render_html': True,          # render an HTML copy of each device report
+    'render_workers': 4,          # processes rendering reports and extracting findings
+}
+
+# bulk VLAN push to switches
+VLAN_PUSH_SETTINGS = {
+    'max_concurrency': 64,        # switches changed at once
+    'command_timeout': 120,       # seconds per configuration command (large vlan batch ranges are slow)
+    'save_config': True,          # save the configuration after a verified change
+}
+
+# CPU-bound parsing, diff and compaction offload
+CPU_EXECUTOR_SETTINGS = {
+    'enabled': True,
+    'workers': 4,                 # processes running large parse, diff and compaction steps
+    'offload_threshold': 262144,  # characters of input above which a step leaves the calling thread
+    'handoff': 'shared_memory',   # how large outputs reach the workers: 'shared_memory' or 'file'
+    'handoff_threshold': 65536,   # characters above which a single output is passed by reference
+}
+
+# inspection daemon (warm state + local job API)
+DAEMON_SETTINGS = {
+    'host': '127.0.0.1',          # the job API has no authentication, keep it on loopback
+    'port': 8765,
+    'unix_socket': None,          # path of a Unix socket to listen on instead of host:port
+    'session_idle_timeout': 300,  # seconds an idle SSH session is kept open for the next job
+    'max_jobs': 200,              # finished jobs kept for GET /jobs
+}
+
+# per-stage tracing and profiling (output/traces)
+TRACING_SETTINGS = {
+    'enabled': True,
+    'formats': ['chrome'],        # written per run: 'chrome' (chrome://tracing, Perfetto) and/or 'otlp' (OTLP/JSON)
+    'profile': False,             # sample stacks of CPU stages into folded stacks for flame graphs
+    'profile_interval': 0.005,    # seconds between profiler samples
+}
+
 # log settings
 ENABLE_CONSOLE_OUTPUT = True
 
@@ -45,6 +166,14 @@ AI_SETTINGS = {
     }
 }
 
+# Analysis settings
+ANALYSIS_SETTINGS = {
+    'streaming': False,           # append tokens to the report file as they arrive
+    'max_prompt_length': 80000,   # characters of formatted config sent to the model
+    'checkpoint_interval': 2,     # seconds between fsync of partial reports
+    'compact_prompt': True,       # summarize outputs locally before sending them to the model
+}
+
 # Log settings
 LOG_SETTINGS = {
     'log_dir': 'logs',
@@ -0,0 +1,239 @@
+# utils/tracing.py
+
+import os
+import sys
+import json
+import time
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional
+
+from utils.logger import get_logger
+from utils.settings import BASE_DIR, TRACING_SETTINGS
+
+TRACE_DIR = os.path.join(BASE_DIR, 'output', 'traces')
+SERVICE_NAME = 'netinspector'
+
+
+class Span:
+    """One timed stage; spans nest through a context variable, across threads when the context is copied"""
+
+    def __init__(self, name: str, parent: Optional['Span'], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        # the device a span belongs to is inherited, so every stage lands in its device's lane
+        self.device = attributes.pop('device', None) or (parent.device if parent else None)
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+        self.thread_id = threading.get_ident()
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar('current_span', default=None)
+_traces: Dict[str, List[Span]] = {}
+_samples: Dict[str, Counter] = {}
+_profiled: Dict[int, Span] = {}
+_lock = threading.Lock()
+_sampler: Optional[threading.Thread] = None
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, profile: bool = False, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time a stage as a span nested under the current one.
+
+    A span without a parent starts a new trace, which is exported when that
+    root span ends (see export_trace). Failing stages are recorded with the
+    error and the exception is re-raised.
+
+    Args:
+        name: stage name, e.g. 'connect', 'command', 'llm'
+        profile: sample this thread's stack while the span is open, when
+            TRACING_SETTINGS['profile'] is on (for CPU stages)
+        attributes: extra fields; 'device' sets the device lane
+    """
+    if not TRACING_SETTINGS['enabled']:
+        yield None
+        return
+    parent = _current.get()
+    current = Span(name, parent, attributes)
+    token = _current.set(current)
+    profiling = profile and TRACING_SETTINGS['profile']
+    if profiling:
+        _start_sampler()
+        with _lock:
+            previous = _profiled.get(current.thread_id)
+            _profiled[current.thread_id] = current
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {str(e)}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current.reset(token)
+        with _lock:
+            if profiling:
+                if previous:
+                    _profiled[current.thread_id] = previous
+                else:
+                    _profiled.pop(current.thread_id, None)
+            _traces.setdefault(current.trace_id, []).append(current)
+        if parent is None:
+            export_trace(current.trace_id, root=current)
+
+
+def export_trace(trace_id: str, formats: Optional[List[str]] = None, root: Optional[Span] = None) -> List[str]:
+    """
+    Write the spans of a finished trace and forget them.
+
+    Formats:
+        'chrome': Trace Event JSON for chrome://tracing or ui.perfetto.dev,
+                  one lane per device
+        'otlp':   OTLP/JSON (ExportTraceServiceRequest) for OpenTelemetry collectors
+    Profiler samples taken during the trace are written as folded stacks
+    (flamegraph.pl, speedscope).
+
+    Returns:
+        paths of the files written
+    """
+    with _lock:
+        spans = _traces.pop(trace_id, [])
+        samples = _samples.pop(trace_id, None)
+    if not spans:
+        return []
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    name = root.name if root else spans[-1].name
+    prefix = os.path.join(TRACE_DIR, f"trace_{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{trace_id[:8]}")
+    outputs = []
+    for fmt in formats or TRACING_SETTINGS['formats']:
+        if fmt == 'chrome':
+            outputs.append((f"{prefix}.json", json.dumps(to_chrome_trace(spans), ensure_ascii=False, default=str)))
+        elif fmt == 'otlp':
+            outputs.append((f"{prefix}.otlp.json", json.dumps(to_otlp(spans), ensure_ascii=False, default=str)))
+    if samples:
+        outputs.append((f"{prefix}.folded", "".join(f"{stack} {count}\n" for stack, count in samples.most_common())))
+
+    paths = []
+    for path, content in outputs:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        paths.append(path)
+    get_logger('tracing').info(f"Trace of {name} ({len(spans)} spans) written to: {', '.join(paths)}")
+    return paths
+
+
+def to_chrome_trace(spans: List[Span]) -> Dict[str, Any]:
+    pid = os.getpid()
+    lanes: Dict[Optional[str], int] = {None: 0}
+    events = []
+    for item in sorted(spans, key=lambda s: (s.start_ns, -(s.end_ns or 0))):
+        lane = lanes.setdefault(item.device, len(lanes))
+        args = dict(item.attributes)
+        if item.error:
+            args['error'] = item.error
+        events.append({
+            'name': item.name,
+            'cat': item.device or 'run',
+            'ph': 'X',
+            'ts': item.start_ns / 1000,
+            'dur': ((item.end_ns or item.start_ns) - item.start_ns) / 1000,
+            'pid': pid,
+            'tid': lane,
+            'args': args,
+        })
+    for device, lane in lanes.items():
+        events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': lane,
+                       'args': {'name': device or 'run'}})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def to_otlp(spans: List[Span]) -> Dict[str, Any]:
+    otlp_spans = []
+    for item in spans:
+        attributes = dict(item.attributes)
+        if item.device:
+            attributes['device'] = item.device
+        otlp_span = {
+            'traceId': item.trace_id,
+            'spanId': item.span_id,
+            'name': item.name,
+            'kind': 1,
+            'startTimeUnixNano': str(item.start_ns),
+            'endTimeUnixNano': str(item.end_ns or item.start_ns),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items()],
+            # 1 = OK, 2 = ERROR
+            'status': {'code': 2, 'message': item.error} if item.error else {'code': 1},
+        }
+        if item.parent_id:
+            otlp_span['parentSpanId'] = item.parent_id
+        otlp_spans.append(otlp_span)
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+        'scopeSpans': [{'scope': {'name': 'utils.tracing'}, 'spans': otlp_spans}],
+    }]}
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _start_sampler() -> None:
+    global _sampler
+    with _lock:
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_loop, name='trace-profiler', daemon=True)
+            _sampler.start()
+
+
+def _sample_loop() -> None:
+    """
+    Sample the stacks of threads inside profiled spans.
+
+    Work handed to the CPU process pool shows up as the calling thread
+    waiting on its result; disable CPU_EXECUTOR_SETTINGS to profile it here.
+    """
+    interval = TRACING_SETTINGS['profile_interval']
+    me = threading.get_ident()
+    while True:
+        time.sleep(interval)
+        with _lock:
+            profiled = dict(_profiled)
+        if not profiled:
+            continue
+        frames = sys._current_frames()
+        for thread_id, owner in profiled.items():
+            frame = frames.get(thread_id)
+            if frame is None or thread_id == me:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                frame = frame.f_back
+            folded = ";".join([f"{owner.device or 'run'}", owner.name] + stack[::-1])
+            with _lock:
+                _samples.setdefault(owner.trace_id, Counter())[folded] += 1